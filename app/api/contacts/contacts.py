@@ -1,60 +1,349 @@
-from fastapi import APIRouter, HTTPException, status, Response, Depends
-from app.application_services.contacts.schemas.response import ContactResponse
-from app.application_services.contacts.schemas.request import ContactRequest
+from fastapi import APIRouter, HTTPException, status, Response, Depends, Query, Request, Header
+from fastapi.responses import StreamingResponse
+from app.application_services.contacts.schemas.response import ContactResponse, ContactPageResponse, BulkImportResponse, ContactBatchResponse, CONTACT_ADAPTER, CONTACT_PAGE_ADAPTER, CONTACT_LOOKUP_ADAPTER, ContactLookupRows
+from app.application_services.contacts.schemas.response import CONTACT_CHANGES_ADAPTER, ContactChangePage, ContactChangePruneResponse
+from app.application_services.contacts.schemas.response import ContactStatsResponse, CountsReconcileResponse
+from app.application_services.contacts.schemas.response import DuplicateClusterPage, DuplicateMergeResponse, DuplicateScanResponse
+from app.application_services.contacts.schemas.request import ContactRequest, ContactBatchIdsRequest, ContactBatchUpdateRequest, ContactLookupRequest, DuplicateMergeRequest
 from app.application_services.contacts.contacts import add_contact, get_contacts, get_contact_details, update_contact_details, delete_contact, search_contacts as search_contacts_service
-from app.application_services.users.users import get_current_active_user
+from app.application_services.contacts.contacts import get_contacts_batch, update_contacts_batch, delete_contacts_batch, get_contacts_validator
+from app.application_services.contacts.contacts import CONTACT_COLUMNS, check_mergeable_sort, get_all_contacts, get_all_contacts_validator, get_contact_group_commit_stats, lookup_contacts
+from app.application_services.contacts.duplicates import get_duplicate_clusters, merge_duplicates, scan_all_duplicates
+from app.application_services.contacts.changes import CONTACT_CHANGES_PAGE_SIZE, get_contact_changes, prune_all_contact_changes
+from app.application_services.contacts.stats import COUNT_MAX_STALENESS_SECONDS, get_all_contact_stats, get_contact_stats, reconcile_all_contact_counts
+from app.application_services.contacts.bulk import BULK_IMPORT_BATCH_SIZE, CSV_MEDIA_TYPES, NDJSON_MEDIA_TYPES, import_contacts, iter_lines
+from app.application_services.contacts.export import EXPORT_MEDIA_TYPES, export_contacts
+from app.application_services.users.users import get_current_active_user, get_admin_user, get_user_counts, reconcile_user_counts
 from app.application_services.users.schemas.response import UserResponse
-from app.models import DB_session
-from sqlalchemy.orm import Session
-from typing import List
+from app.models import AsyncSessionLocal, ContactReaderSessionLocal, ContactSessionLocal, ReaderSessionLocal, contact_shard_session_factories, pin_recent_writer
+from app.exceptions.exceptions import GoneException, NotFoundException, PreconditionFailedException
+from app.utils.auth import UserRole
+from app.utils.conditional import entity_etag, collection_etag, is_not_modified, validator_headers, variant_etag
+from app.utils.fieldsets import parse_fields, project
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.pagination import DEFAULT_PAGE_SIZE
+from typing import List, Literal, Optional
 
 router = APIRouter()
 
+async def DB_contacts_writer_session(request: Request, current_user: UserResponse = Depends(get_current_active_user)):
+    """Writer session on the database holding the current user's contacts."""
+    async with ContactSessionLocal(current_user.id) as db:
+        try:
+            yield db
+        finally:
+            pin_recent_writer(request, db)
+
+async def DB_contacts_reader_session(request: Request, current_user: UserResponse = Depends(get_current_active_user)):
+    """Reader session on the database (or replica) holding the current user's contacts."""
+    async with ContactReaderSessionLocal(request, current_user.id) as db:
+        yield db
+
 @router.post("/", response_model=ContactResponse, status_code=status.HTTP_201_CREATED)
 async def create_contact(
     contact: ContactRequest, 
     current_user: UserResponse = Depends(get_current_active_user),
-    db: Session = Depends(DB_session)
+    db: AsyncSession = Depends(DB_contacts_writer_session)
 ):
     """Create a new contact - Authenticated users only"""
     try:
-        return add_contact(contact, db)
+        return await add_contact(contact, current_user.id, db)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-@router.get("/", response_model=List[ContactResponse])
+@router.post("/bulk", response_model=BulkImportResponse)
+async def bulk_import_contacts(
+    request: Request,
+    batch_size: int = Query(BULK_IMPORT_BATCH_SIZE, ge=1),
+    current_user: UserResponse = Depends(get_current_active_user),
+    db: AsyncSession = Depends(DB_contacts_writer_session)
+):
+    """Import contacts from a streamed CSV (with a header row) or NDJSON body - Authenticated users only"""
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type not in CSV_MEDIA_TYPES + NDJSON_MEDIA_TYPES:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Send text/csv or application/x-ndjson")
+    try:
+        return await import_contacts(iter_lines(request.stream()), media_type, current_user.id, db, batch_size=batch_size)
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Body is not valid UTF-8: {e}")
+
+@router.post("/batch/get", response_model=ContactBatchResponse)
+async def get_contacts_batch_endpoint(
+    batch: ContactBatchIdsRequest,
+    current_user: UserResponse = Depends(get_current_active_user),
+    db: AsyncSession = Depends(DB_contacts_reader_session)
+):
+    """Get many contacts by id, with a status per id - Authenticated users only"""
+    try:
+        return await get_contacts_batch(batch.ids, current_user.id, db)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.patch("/batch", response_model=ContactBatchResponse)
+async def update_contacts_batch_endpoint(
+    batch: ContactBatchUpdateRequest,
+    current_user: UserResponse = Depends(get_current_active_user),
+    db: AsyncSession = Depends(DB_contacts_writer_session)
+):
+    """Update many contacts in one transaction, with a status per id - Authenticated users only"""
+    try:
+        return await update_contacts_batch(batch.items, current_user.id, db)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.post("/batch/delete", response_model=ContactBatchResponse)
+async def delete_contacts_batch_endpoint(
+    batch: ContactBatchIdsRequest,
+    current_user: UserResponse = Depends(get_current_active_user),
+    db: AsyncSession = Depends(DB_contacts_writer_session)
+):
+    """Delete many contacts in one transaction, with a status per id - Authenticated users only"""
+    try:
+        return await delete_contacts_batch(batch.ids, current_user.id, db)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/", response_model=ContactPageResponse)
 async def list_contacts(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1),
+    cursor: Optional[str] = None,
+    sort: Literal["id", "name", "created_at"] = "id",
+    all_owners: bool = False,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,name"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: UserResponse = Depends(get_current_active_user),
+    db: AsyncSession = Depends(DB_contacts_reader_session)
+):
+    """List your contacts one page at a time, following next_cursor; admins may list every owner's with all_owners=true"""
+    if all_owners and current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    try:
+        columns = parse_fields(fields, CONTACT_COLUMNS)
+        # Revalidation costs one aggregate over an index instead of the page query
+        if all_owners:
+            check_mergeable_sort(sort)
+            # Every shard is queried at once, so the latency is the slowest shard's, not the sum
+            sessions = contact_shard_session_factories(request)
+            max_updated_at, count = await get_all_contacts_validator(sessions)
+        else:
+            max_updated_at, count = await get_contacts_validator(current_user.id, db)
+        # ETag only: a delete changes the count but not the newest updated_at, so Last-Modified
+        # (and If-Modified-Since) would call a listing that lost a row unchanged
+        headers = validator_headers(collection_etag(max_updated_at, count, limit, cursor, sort, all_owners, columns), None)
+        headers["X-Total-Count"] = str(count)
+        if is_not_modified(headers["ETag"], None, if_none_match, None):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        if all_owners:
+            page = await get_all_contacts(sessions, limit=limit, cursor=cursor, sort=sort, fields=columns)
+        else:
+            page = await get_contacts(current_user.id, db, limit=limit, cursor=cursor, sort=sort, fields=columns)
+        return Response(content=CONTACT_PAGE_ADAPTER.dump_json(page), media_type="application/json", headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except SQLAlchemyError:
+        # The statement and its parameters stay out of the response
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+@router.get("/search", response_model=ContactPageResponse)
+async def search_contacts_endpoint(
+    query: str = Query(..., min_length=1),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,name"),
     current_user: UserResponse = Depends(get_current_active_user),
-    db: Session = Depends(DB_session)
+    db: AsyncSession = Depends(DB_contacts_reader_session)
 ):
-    """List all contacts - Authenticated users only"""
+    """Search contacts by name, email or phone, best matches first - Authenticated users only"""
     try:
-        return get_contacts(db)
+        page = await search_contacts_service(query, current_user.id, db, limit=limit, cursor=cursor, fields=parse_fields(fields, CONTACT_COLUMNS))
+        return Response(content=CONTACT_PAGE_ADAPTER.dump_json(page), media_type="application/json")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
+@router.get("/lookup", response_model=ContactLookupRows)
+async def lookup_contacts_endpoint(
+    phone: List[str] = Query([]),
+    email: List[str] = Query([]),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,name"),
+    current_user: UserResponse = Depends(get_current_active_user),
+    db: AsyncSession = Depends(DB_contacts_reader_session)
+):
+    """Find your contacts by exact phone number or email (repeat phone=/email= for several) - Authenticated users only"""
+    if not phone and not email:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Pass phone= or email=")
+    try:
+        results = await lookup_contacts(phone, email, current_user.id, db, fields=parse_fields(fields, CONTACT_COLUMNS))
+        return Response(content=CONTACT_LOOKUP_ADAPTER.dump_json(results), media_type="application/json")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.post("/lookup", response_model=ContactLookupRows)
+async def lookup_contacts_batch_endpoint(
+    lookup: ContactLookupRequest,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,name"),
+    current_user: UserResponse = Depends(get_current_active_user),
+    db: AsyncSession = Depends(DB_contacts_reader_session)
+):
+    """Find your contacts for up to CONTACT_LOOKUP_MAX_SIZE phone numbers and emails at once - Authenticated users only"""
+    try:
+        results = await lookup_contacts(lookup.phones, lookup.emails, current_user.id, db, fields=parse_fields(fields, CONTACT_COLUMNS))
+        return Response(content=CONTACT_LOOKUP_ADAPTER.dump_json(results), media_type="application/json")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/export")
+async def export_contacts_endpoint(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    current_user: UserResponse = Depends(get_current_active_user)
+):
+    """Stream every contact you own as NDJSON or CSV - Authenticated users only"""
+    return StreamingResponse(
+        export_contacts(format, current_user.id, lambda: ContactReaderSessionLocal(request, current_user.id)),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
+    )
+
+@router.get("/duplicates", response_model=DuplicateClusterPage)
+async def list_duplicate_clusters(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1),
+    cursor: Optional[str] = None,
+    near: bool = False,
+    current_user: UserResponse = Depends(get_current_active_user),
+    db: AsyncSession = Depends(DB_contacts_reader_session)
+):
+    """List your duplicate contacts as of the last scan; near=true also groups similar names - Authenticated users only"""
+    try:
+        return await get_duplicate_clusters(current_user.id, db, limit=limit, cursor=cursor, near=near)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.post("/duplicates/merge", response_model=DuplicateMergeResponse)
+async def merge_duplicate_cluster(
+    merge: DuplicateMergeRequest,
+    current_user: UserResponse = Depends(get_current_active_user),
+    db: AsyncSession = Depends(DB_contacts_writer_session)
+):
+    """Merge contacts into one (keep_id, else the oldest) in one transaction - Authenticated users only"""
+    try:
+        return await merge_duplicates(merge.ids, current_user.id, db, keep_id=merge.keep_id)
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.post("/duplicates/scan", response_model=List[DuplicateScanResponse])
+async def scan_duplicate_contacts(
+    current_user: UserResponse = Depends(get_admin_user)
+):
+    """Refresh duplicate-detection keys for contacts changed since the last scan, on every shard - Admin only"""
+    return await scan_all_duplicates(contact_shard_session_factories())
+
+@router.get("/group-commit")
+async def get_contact_group_commit_stats_endpoint(
+    current_user: UserResponse = Depends(get_admin_user)
+):
+    """Group-commit batch counters for contact creation - Admin only"""
+    return get_contact_group_commit_stats()
+
+@router.get("/changes", response_model=ContactChangePage)
+async def list_contact_changes(
+    since: Optional[str] = None,
+    limit: int = Query(CONTACT_CHANGES_PAGE_SIZE, ge=1),
+    current_user: UserResponse = Depends(get_current_active_user),
+    db: AsyncSession = Depends(DB_contacts_reader_session)
+):
+    """Contacts created, updated or deleted after the since cursor; omit since to get the current cursor - Authenticated users only"""
+    try:
+        page = await get_contact_changes(current_user.id, db, since=since, limit=limit)
+        return Response(content=CONTACT_CHANGES_ADAPTER.dump_json(page), media_type="application/json")
+    except GoneException as e:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=e.message)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.post("/changes/prune", response_model=List[ContactChangePruneResponse])
+async def prune_contact_changes_endpoint(
+    current_user: UserResponse = Depends(get_admin_user)
+):
+    """Delete changes older than CONTACT_CHANGES_RETENTION_DAYS on every shard - Admin only"""
+    return await prune_all_contact_changes(contact_shard_session_factories())
+
+@router.get("/stats", response_model=ContactStatsResponse)
+async def get_contact_stats_endpoint(
+    request: Request,
+    all_owners: bool = False,
+    current_user: UserResponse = Depends(get_current_active_user),
+    db: AsyncSession = Depends(DB_contacts_reader_session)
+):
+    """Your contact total and contacts created per day; admins get every owner's, with active and inactive users, with all_owners=true - Authenticated users only"""
+    if not all_owners:
+        return await get_contact_stats(current_user.id, db)
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    async with ReaderSessionLocal(request) as users_db:
+        users = await get_user_counts(users_db)
+    return await get_all_contact_stats(contact_shard_session_factories(request), users)
+
+@router.post("/stats/reconcile", response_model=CountsReconcileResponse)
+async def reconcile_counts_endpoint(
+    current_user: UserResponse = Depends(get_admin_user)
+):
+    """Recount cached contact and user counts not checked within COUNT_MAX_STALENESS_SECONDS - Admin only"""
+    shards = await reconcile_all_contact_counts(contact_shard_session_factories(), COUNT_MAX_STALENESS_SECONDS)
+    async with AsyncSessionLocal() as db:
+        users = await reconcile_user_counts(db, COUNT_MAX_STALENESS_SECONDS)
+    return CountsReconcileResponse(shards=shards, users=users)
+
 @router.get("/{contact_id}", response_model=ContactResponse)
 async def get_contact(
     contact_id: int, 
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,name"),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
     current_user: UserResponse = Depends(get_current_active_user),
-    db: Session = Depends(DB_session)
+    db: AsyncSession = Depends(DB_contacts_reader_session)
 ):
     """Get contact details - Authenticated users only"""
     try:
-        return get_contact_details(contact_id, db)
+        columns = parse_fields(fields, CONTACT_COLUMNS)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    try:
+        contact = await get_contact_details(contact_id, current_user.id, db, fields=columns)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    etag = entity_etag(contact["id"], contact["updated_at"])
+    if columns is not None:
+        # A subset is a different representation, so it must not share the full contact's strong ETag
+        etag = variant_etag(etag, columns)
+    headers = validator_headers(etag, contact["updated_at"])
+    if is_not_modified(headers["ETag"], contact["updated_at"], if_none_match, if_modified_since):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=CONTACT_ADAPTER.dump_json(project(contact, columns)), media_type="application/json", headers=headers)
 
 @router.put("/{contact_id}", response_model=ContactResponse)
 async def update_contact(
     contact_id: int, 
     contact: ContactRequest, 
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: UserResponse = Depends(get_current_active_user),
-    db: Session = Depends(DB_session)
+    db: AsyncSession = Depends(DB_contacts_writer_session)
 ):
-    """Update contact details - Authenticated users only"""
+    """Update contact details, optionally only If-Match the current ETag - Authenticated users only"""
     try:
-        return update_contact_details(contact_id, contact, db)
+        updated = await update_contact_details(contact_id, contact, current_user.id, db, if_match=if_match)
+        response.headers.update(validator_headers(entity_etag(updated.id, updated.updated_at), updated.updated_at))
+        return updated
+    except PreconditionFailedException as e:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
@@ -62,23 +351,11 @@ async def update_contact(
 async def remove_contact(
     contact_id: int, 
     current_user: UserResponse = Depends(get_current_active_user),
-    db: Session = Depends(DB_session)
+    db: AsyncSession = Depends(DB_contacts_writer_session)
 ):
     """Delete contact - Authenticated users only"""
     try:
-        delete_contact(contact_id, db)
+        await delete_contact(contact_id, current_user.id, db)
         return None
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
-
-@router.get("/search", response_model=List[ContactResponse])
-async def search_contacts_endpoint(
-    query: str, 
-    current_user: UserResponse = Depends(get_current_active_user),
-    db: Session = Depends(DB_session)
-):
-    """Search contacts - Authenticated users only"""
-    try:
-        return search_contacts_service(query, db)
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,44 @@
+import os
+from typing import List
+from app.application_services.users.users import get_admin_user
+from app.application_services.users.schemas.response import UserResponse
+from app.exceptions.exceptions import NotFoundException
+from app.utils.profiling import profile_ring
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+
+router = APIRouter()
+
+# Plain def: the ring is files, so FastAPI reads them in its threadpool instead of on the event loop
+
+@router.get("/")
+def get_profiles_endpoint(
+    current_user: UserResponse = Depends(get_admin_user)
+) -> List[dict]:
+    """Profiled requests in the ring, newest first - Admin only"""
+    return profile_ring.list()
+
+@router.get("/{profile_id}")
+def get_profile_endpoint(
+    profile_id: str,
+    current_user: UserResponse = Depends(get_admin_user)
+) -> dict:
+    """One profile: the request, every SQL statement with its timing and the top functions by cumulative time - Admin only"""
+    try:
+        return profile_ring.get(profile_id)
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
+
+@router.get("/{profile_id}/pstats")
+def get_profile_pstats_endpoint(
+    profile_id: str,
+    current_user: UserResponse = Depends(get_admin_user)
+):
+    """The request's cProfile stats, for python -m pstats or snakeviz - Admin only"""
+    try:
+        path = profile_ring.pstats_path(profile_id)
+        if not os.path.exists(path):
+            raise NotFoundException("No call profile for this request")
+    except NotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
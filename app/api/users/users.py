@@ -1,54 +1,110 @@
 from app.application_services.users.users import (
-    create_user, get_user, get_all_users, update_user, delete_user, search_users, 
-    authenticate_user, get_current_active_user, get_admin_user
+    USER_COLUMNS, create_user, get_user, get_all_users, update_user, delete_user, search_users, 
+    authenticate_user, get_current_active_user, get_admin_user, get_principal_cache_stats, get_login_admission_stats, get_user_counts
 )
 from app.application_services.users.schemas.request import UserRequest, UserAuthenticateRequest
-from app.application_services.users.schemas.response import UserResponse, TokenResponse
-from app.models import DB_session
-from sqlalchemy.orm import Session
-from typing import List
-from fastapi import APIRouter, HTTPException, status, Depends
+from app.application_services.users.schemas.response import UserResponse, UserPageResponse, TokenResponse, USER_PAGE_ADAPTER, USER_ROWS_ADAPTER
+from app.exceptions.exceptions import ServiceUnavailableException, TooManyRequestsException
+from app.utils.auth import UserRole
+from app.utils.fieldsets import parse_fields
+from app.models import DB_async_reader_session, DB_async_writer_session
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.pagination import DEFAULT_PAGE_SIZE
+from typing import List, Literal, Optional
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response
 from fastapi.security import HTTPBearer
 
 router = APIRouter()
 
 security = HTTPBearer()
 
-@router.get("/", response_model=List[UserResponse])
+@router.get("/", response_model=UserPageResponse)
 async def get_all_users_endpoint(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1),
+    cursor: Optional[str] = None,
+    sort: Literal["id", "username", "created_at"] = "id",
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,username"),
     current_user: UserResponse = Depends(get_admin_user),
-    db: Session = Depends(DB_session)
+    db: AsyncSession = Depends(DB_async_reader_session)
 ):
-    """Get all users - Admin only"""
+    """Get active users one page at a time, following next_cursor - Admin only"""
     try:
-        return get_all_users(db)
+        page = await get_all_users(db, limit=limit, cursor=cursor, sort=sort, fields=parse_fields(fields, USER_COLUMNS))
+        counts = await get_user_counts(db)
+        return Response(content=USER_PAGE_ADAPTER.dump_json(page), media_type="application/json", headers={"X-Total-Count": str(counts.active)})
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except SQLAlchemyError:
+        # The statement and its parameters stay out of the response
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Database error")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 @router.get("/search", response_model=List[UserResponse])
 async def search_users_endpoint(
     query: str, 
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,username"),
     current_user: UserResponse = Depends(get_admin_user),
-    db: Session = Depends(DB_session)
+    db: AsyncSession = Depends(DB_async_reader_session)
 ):
     """Search users - Admin only"""
     try:
-        return search_users(query, db)
+        users = await search_users(query, db, fields=parse_fields(fields, USER_COLUMNS))
+        return Response(content=USER_ROWS_ADAPTER.dump_json(users), media_type="application/json")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+@router.get("/profile", response_model=UserResponse)
+async def get_current_user_profile(
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,username"),
+    current_user: UserResponse = Depends(get_current_active_user),
+    db: AsyncSession = Depends(DB_async_reader_session)
+):
+    """Get current user's profile"""
+    try:
+        columns = parse_fields(fields, USER_COLUMNS)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # Claims-only principals carry no timestamps, so resolve the full profile
+    user = await get_user(current_user.id, db)
+    return Response(content=user.model_dump_json(include=set(columns) if columns else None), media_type="application/json")
+
+@router.get("/principal-cache")
+async def get_principal_cache_stats_endpoint(
+    current_user: UserResponse = Depends(get_admin_user)
+):
+    """Principal cache hit/miss counters - Admin only"""
+    return get_principal_cache_stats()
+
+@router.get("/login-admission")
+async def get_login_admission_stats_endpoint(
+    current_user: UserResponse = Depends(get_admin_user)
+):
+    """Login concurrency, queue and rate-limit counters - Admin only"""
+    return get_login_admission_stats()
  
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user_endpoint(
     user_id: int, 
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,username"),
     current_user: UserResponse = Depends(get_current_active_user),
-    db: Session = Depends(DB_session)
+    db: AsyncSession = Depends(DB_async_reader_session)
 ):
     """Get user by ID - Authenticated users can view their own profile, admins can view any profile"""
+    try:
+        columns = parse_fields(fields, USER_COLUMNS)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     try:
         # Users can only view their own profile unless they're admin
-        if current_user.role != "admin" and current_user.id != user_id:
+        if current_user.role != UserRole.ADMIN and current_user.id != user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
-        return get_user(user_id, db)
+        # Profiles come from the principal cache, so a subset saves serialization rather than SQL
+        user = await get_user(user_id, db)
+        return Response(content=user.model_dump_json(include=set(columns) if columns else None), media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     
@@ -57,14 +113,16 @@ async def update_user_endpoint(
     user_id: int, 
     user: UserRequest, 
     current_user: UserResponse = Depends(get_current_active_user),
-    db: Session = Depends(DB_session)
+    db: AsyncSession = Depends(DB_async_writer_session)
 ):
     """Update user - Users can update their own profile, admins can update any profile"""
     try:
         # Users can only update their own profile unless they're admin
-        if current_user.role != "admin" and current_user.id != user_id:
+        if current_user.role != UserRole.ADMIN and current_user.id != user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
-        return update_user(user_id, user, db)
+        return await update_user(user_id, user, db)
+    except ServiceUnavailableException as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
@@ -72,40 +130,40 @@ async def update_user_endpoint(
 async def delete_user_endpoint(
     user_id: int, 
     current_user: UserResponse = Depends(get_admin_user),
-    db: Session = Depends(DB_session)
+    db: AsyncSession = Depends(DB_async_writer_session)
 ):
     """Delete user - Admin only"""
     try:
-        delete_user(user_id, db)
+        await delete_user(user_id, db)
         return None
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 @router.post("/auth", response_model=TokenResponse)
 async def authenticate_user_endpoint(
+    request: Request,
     user: UserAuthenticateRequest, 
-    db: Session = Depends(DB_session)
+    db: AsyncSession = Depends(DB_async_reader_session)
 ):
     """Authenticate user and return JWT token"""
     try:
-        return authenticate_user(user, db)
+        return await authenticate_user(user, db, client_address=request.client.host if request.client else "")
+    except TooManyRequestsException as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ServiceUnavailableException as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def create_user_endpoint(
     user: UserRequest, 
-    db: Session = Depends(DB_session)
+    db: AsyncSession = Depends(DB_async_writer_session)
 ):
     """Register new user - Public endpoint"""
     try:
-        return create_user(user, db)
+        return await create_user(user, db)
+    except ServiceUnavailableException as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
-
-@router.get("/profile", response_model=UserResponse)
-async def get_current_user_profile(
-    current_user: UserResponse = Depends(get_current_active_user)
-):
-    """Get current user's profile"""
-    return current_user
@@ -0,0 +1,135 @@
+import codecs
+import csv
+import json
+import os
+from typing import AsyncIterator, List, Optional
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Contacts, allocate_contact_ids
+from app.application_services.contacts.schemas.request import ContactRequest
+from app.application_services.contacts.schemas.response import BulkImportResponse, BulkImportError
+from app.application_services.contacts.contacts import _lock_contact_feed, _record_changes
+from app.application_services.contacts.search import index_new_contacts
+
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "1000"))
+BULK_IMPORT_MAX_BATCH_SIZE = int(os.getenv("BULK_IMPORT_MAX_BATCH_SIZE", "10000"))
+# Only the first N row errors are reported, so the report stays bounded like the rest of the import
+BULK_IMPORT_MAX_ERRORS = int(os.getenv("BULK_IMPORT_MAX_ERRORS", "1000"))
+
+CSV_MEDIA_TYPES = ("text/csv", "application/csv")
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a streamed UTF-8 body into lines without buffering more than one chunk."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+async def _iter_records(lines: AsyncIterator[str], media_type: str) -> AsyncIterator[tuple]:
+    """Yield (row_number, record, error) per non-blank line; row numbers count data rows from 1."""
+    row_number = 0
+    if media_type in CSV_MEDIA_TYPES:
+        header: Optional[List[str]] = None
+        async for line in lines:
+            if not line.strip():
+                continue
+            # Quoted fields may not span lines: each line is parsed on its own to keep memory flat
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [column.strip().lower() for column in values]
+                continue
+            row_number += 1
+            if len(values) != len(header):
+                yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+                continue
+            yield row_number, {column: value or None for column, value in zip(header, values)}, None
+    else:
+        async for line in lines:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield row_number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield row_number, None, "Expected a JSON object"
+                continue
+            yield row_number, record, None
+
+async def _insert_batch(batch: List[tuple], owner_id: int, db: AsyncSession, report: BulkImportResponse) -> None:
+    ids = await allocate_contact_ids(len(batch))
+    if ids:
+        for (_, values), contact_id in zip(batch, ids):
+            values["id"] = contact_id
+    try:
+        if ids:
+            rows = [(values["id"], values["name"], values["email"], values["phone"]) for _, values in batch]
+        else:
+            # A multi-row INSERT does not report its ids. With the owner's feed row locked, no other
+            # write of this owner commits meanwhile, so the new ids are the ones above the current maximum
+            await _lock_contact_feed(owner_id, db)
+            before = await db.scalar(select(func.max(Contacts.id)).where(Contacts.owner_id == owner_id)) or 0
+        await db.execute(insert(Contacts), [values for _, values in batch])
+        if not ids:
+            result = await db.execute(
+                select(Contacts.id, Contacts.name, Contacts.email, Contacts.phone).where(Contacts.owner_id == owner_id, Contacts.id > before)
+            )
+            rows = result.all()
+        await _record_changes(owner_id, [row[0] for row in rows], "create", db)
+        await db.commit()
+        report.accepted += len(batch)
+        index_new_contacts(owner_id, rows)
+        return
+    except Exception:
+        await db.rollback()
+    # Something in the batch was refused by the database; retry row by row to pin it down
+    for row_number, values in batch:
+        try:
+            result = await db.execute(insert(Contacts).values(values))
+            contact_id = result.inserted_primary_key[0]
+            await _record_changes(owner_id, [contact_id], "create", db)
+            await db.commit()
+            report.accepted += 1
+            index_new_contacts(owner_id, [(contact_id, values["name"], values["email"], values["phone"])])
+        except Exception as e:
+            await db.rollback()
+            _reject(report, row_number, str(e.__cause__ or e))
+
+def _reject(report: BulkImportResponse, row_number: int, error: str) -> None:
+    report.rejected += 1
+    if len(report.errors) < BULK_IMPORT_MAX_ERRORS:
+        report.errors.append(BulkImportError(row=row_number, error=error))
+    else:
+        report.errors_truncated = True
+
+async def import_contacts(lines: AsyncIterator[str], media_type: str, owner_id: int, db: AsyncSession, batch_size: int = BULK_IMPORT_BATCH_SIZE) -> BulkImportResponse:
+    batch_size = max(1, min(batch_size, BULK_IMPORT_MAX_BATCH_SIZE))
+    report = BulkImportResponse()
+    batch: List[tuple] = []
+    async for row_number, record, error in _iter_records(lines, media_type):
+        if error is None:
+            try:
+                contact = ContactRequest.model_validate(record)
+            except ValidationError as e:
+                error = "; ".join(f"{'.'.join(map(str, item['loc']))}: {item['msg']}" for item in e.errors())
+        if error is not None:
+            _reject(report, row_number, error)
+            continue
+        batch.append((row_number, {**contact.model_dump(), "owner_id": owner_id}))
+        if len(batch) >= batch_size:
+            await _insert_batch(batch, owner_id, db, report)
+            batch = []
+    if batch:
+        await _insert_batch(batch, owner_id, db, report)
+    return report
@@ -0,0 +1,99 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import ContactChanges, ContactFeeds, Contacts
+from app.application_services.contacts.contacts import CONTACT_COLUMNS, _chunks, _fan_out
+from app.application_services.contacts.schemas.response import ContactChangePage, ContactChangePruneResponse, ContactRow
+from app.exceptions.exceptions import GoneException
+from app.utils.pagination import decode_cursor, encode_cursor
+
+CONTACT_CHANGES_PAGE_SIZE = int(os.getenv("CONTACT_CHANGES_PAGE_SIZE", "100"))
+CONTACT_CHANGES_MAX_PAGE_SIZE = int(os.getenv("CONTACT_CHANGES_MAX_PAGE_SIZE", "1000"))
+# Changes older than this are pruned; a client that has not synced for longer must download everything again
+CONTACT_CHANGES_RETENTION_DAYS = float(os.getenv("CONTACT_CHANGES_RETENTION_DAYS", "30"))
+# Rows deleted per statement (and commit) while pruning
+CONTACT_CHANGES_PRUNE_CHUNK_ROWS = int(os.getenv("CONTACT_CHANGES_PRUNE_CHUNK_ROWS", "10000"))
+
+
+def _cursor(seq: int) -> str:
+    return encode_cursor("changes", seq, seq)
+
+def _decode(since: str) -> int:
+    seq = decode_cursor(since, "changes")[1]
+    if seq < 0:
+        raise ValueError("Invalid cursor")
+    return seq
+
+async def _pruned_seq(owner_id: int, db: AsyncSession) -> int:
+    return await db.scalar(select(ContactFeeds.pruned_seq).where(ContactFeeds.owner_id == owner_id)) or 0
+
+async def get_contact_changes(owner_id: int, db: AsyncSession, since: Optional[str] = None, limit: int = CONTACT_CHANGES_PAGE_SIZE) -> ContactChangePage:
+    """The owner's creates, updates and deletes after `since`, oldest first.
+
+    Without `since` the page is empty and next_cursor is the feed's current
+    position: take it, download the contacts, then follow the feed from it.
+    Each page is one seek on (owner_id, seq) plus one IN (...) per
+    CONTACT_BATCH_CHUNK_SIZE changed contacts, whatever the address book's size.
+    A contact changed several times within a page appears once, at its last change.
+    """
+    limit = max(1, min(limit, CONTACT_CHANGES_MAX_PAGE_SIZE))
+    if since is None:
+        head = await db.scalar(select(func.max(ContactChanges.seq)).where(ContactChanges.owner_id == owner_id))
+        # An owner whose whole log was pruned starts at the pruned horizon, not at a cursor that is already gone
+        return {"changes": [], "next_cursor": _cursor(head or await _pruned_seq(owner_id, db)), "has_more": False}
+    after = _decode(since)
+    pruned_seq = await _pruned_seq(owner_id, db)
+    if after < pruned_seq:
+        raise GoneException("Changes after this cursor were pruned; download the contacts again and follow the feed from a new cursor")
+    result = await db.execute(
+        select(ContactChanges.seq, ContactChanges.contact_id, ContactChanges.op, ContactChanges.changed_at)
+        .where(ContactChanges.owner_id == owner_id, ContactChanges.seq > after)
+        .order_by(ContactChanges.seq)
+        .limit(limit + 1)
+    )
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest: Dict[int, object] = {}
+    for row in rows:
+        # Re-inserted so the order follows each contact's last change
+        latest.pop(row.contact_id, None)
+        latest[row.contact_id] = row
+    contacts: Dict[int, ContactRow] = {}
+    for chunk in _chunks([contact_id for contact_id, row in latest.items() if row.op != "delete"]):
+        contact_rows = await db.execute(select(*CONTACT_COLUMNS).where(Contacts.owner_id == owner_id, Contacts.id.in_(chunk)))
+        contacts.update((contact.id, contact._asdict()) for contact in contact_rows.all())
+    changes = []
+    for contact_id, row in latest.items():
+        contact = contacts.get(contact_id)
+        # Deleted after this page's change: report the delete now, the later entry repeats it
+        op = row.op if contact is not None or row.op == "delete" else "delete"
+        changes.append({"seq": row.seq, "op": op, "contact_id": contact_id, "changed_at": row.changed_at, "contact": contact})
+    return {"changes": changes, "next_cursor": _cursor(rows[-1].seq if rows else after), "has_more": has_more}
+
+async def prune_contact_changes(db: AsyncSession) -> ContactChangePruneResponse:
+    """Drop changes older than CONTACT_CHANGES_RETENTION_DAYS from this database's log."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=CONTACT_CHANGES_RETENTION_DAYS)
+    horizon = await db.scalar(select(func.max(ContactChanges.seq)).where(ContactChanges.changed_at < cutoff))
+    if horizon is None:
+        pruned_seq = await db.scalar(select(func.max(ContactFeeds.pruned_seq))) or 0
+        return ContactChangePruneResponse(pruned=0, pruned_seq=pruned_seq)
+    # Raise the horizon before deleting, so no reader trusts a cursor whose changes are going away
+    await db.execute(update(ContactFeeds).where(ContactFeeds.pruned_seq < horizon).values(pruned_seq=horizon))
+    await db.commit()
+    pruned = 0
+    start = await db.scalar(select(func.min(ContactChanges.seq))) or horizon
+    while start <= horizon:
+        stop = min(start + CONTACT_CHANGES_PRUNE_CHUNK_ROWS - 1, horizon)
+        result = await db.execute(delete(ContactChanges).where(ContactChanges.seq >= start, ContactChanges.seq <= stop))
+        await db.commit()
+        pruned += result.rowcount
+        start = stop + 1
+    return ContactChangePruneResponse(pruned=pruned, pruned_seq=horizon)
+
+async def prune_all_contact_changes(session_factories: Sequence[Callable[[], AsyncSession]]) -> List[ContactChangePruneResponse]:
+    """Prune the change log of every contact shard at once."""
+    return await _fan_out(session_factories, prune_contact_changes)
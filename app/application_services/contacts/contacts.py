@@ -1,50 +1,431 @@
-from typing import List
-from sqlalchemy.orm import Session
-from app.models import Contacts
-from app.application_services.contacts.schemas.request import ContactRequest
-from app.application_services.contacts.schemas.response import ContactResponse
-from app.exceptions.exceptions import NotFoundException
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import collections
+import heapq
+import itertools
+import os
+from fastapi import status
+from sqlalchemy import Select, case, select, insert, update, delete, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import ContactChanges, ContactDailyCounts, ContactFeeds, ContactMatchKeys, ContactNearMatches, Contacts, ContactSessionLocal, allocate_contact_ids, contact_shards
+from app.application_services.contacts.schemas.request import ContactRequest, ContactBatchUpdateItem
+from app.application_services.contacts.schemas.response import ContactResponse, ContactRow, ContactPageRows, ContactBatchResult, ContactBatchResponse, ContactLookupRows
+from app.exceptions.exceptions import NotFoundException, PreconditionFailedException
+from app.utils.batching import GroupCommit
+from app.utils.conditional import entity_etag, if_match_satisfied
+from app.utils.fieldsets import Fields, project, select_columns
+from app.utils.normalize import email_key, phone_key
+from app.application_services.contacts.search import SEARCH_MAX_RESULTS, search_contact_ids, index_contact, unindex_contact
+from app.utils.pagination import DEFAULT_PAGE_SIZE, clamp_page_size, keyset_select, keyset_page, encode_cursor, decode_cursor
 from datetime import datetime, timezone
 
+# Columns selected by the read fast path instead of hydrating ORM entities
+CONTACT_COLUMNS = (Contacts.id, Contacts.owner_id, Contacts.name, Contacts.email, Contacts.phone, Contacts.created_at, Contacts.updated_at)
 
-def add_contact(contact: ContactRequest, db: Session) -> ContactResponse:
-    db_contact = Contacts(**contact.model_dump())
+CONTACT_FIELD_NAMES = tuple(column.key for column in CONTACT_COLUMNS)
+
+CONTACT_SORT_COLUMNS = {"id": Contacts.id, "name": Contacts.name, "created_at": Contacts.created_at}
+# Sorts whose shard pages can be merged in Python: names come back in the database collation
+# (case- and accent-insensitive on MySQL), which Python's codepoint order would scramble
+MERGEABLE_SORTS = ("id", "created_at")
+
+# Most ids one batch request may carry, and how many go into a single IN (...) / UPDATE round-trip
+CONTACT_BATCH_MAX_SIZE = int(os.getenv("CONTACT_BATCH_MAX_SIZE", "1000"))
+CONTACT_BATCH_CHUNK_SIZE = int(os.getenv("CONTACT_BATCH_CHUNK_SIZE", "500"))
+# Most phone numbers plus emails one lookup request may carry
+CONTACT_LOOKUP_MAX_SIZE = int(os.getenv("CONTACT_LOOKUP_MAX_SIZE", "5000"))
+# Group commit: concurrent creates are inserted and committed together, up to MAX_BATCH at once. Creates
+# arriving while a batch commits form the next one; MAX_DELAY_MS makes each batch wait that much longer
+# for company, trading latency for fewer commits when arrivals are spread out
+CONTACT_GROUP_COMMIT = os.getenv("CONTACT_GROUP_COMMIT", "false").lower() == "true"
+CONTACT_GROUP_COMMIT_MAX_BATCH = int(os.getenv("CONTACT_GROUP_COMMIT_MAX_BATCH", "100"))
+CONTACT_GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("CONTACT_GROUP_COMMIT_MAX_DELAY_MS", "0"))
+
+
+def _owned(stmt: Select, owner_id: Optional[int]) -> Select:
+    """Scope `stmt` to one owner's contacts; None (admin listings only) means every owner."""
+    return stmt if owner_id is None else stmt.where(Contacts.owner_id == owner_id)
+
+async def _fan_out(session_factories: Sequence[Callable[[], AsyncSession]], query: Callable[[AsyncSession], Awaitable]) -> list:
+    """Run `query` on every contact shard at once, each with its own session."""
+    async def run(session_factory):
+        async with session_factory() as db:
+            return await query(db)
+    return await asyncio.gather(*(run(session_factory) for session_factory in session_factories))
+
+async def _lock_contact_feed(owner_id: int, db: AsyncSession, delta: int = 0) -> None:
+    """Lock the owner's change-feed row (creating it on first use) until the transaction ends, adding `delta` to its contact count."""
+    lock = update(ContactFeeds).where(ContactFeeds.owner_id == owner_id).values(pruned_seq=ContactFeeds.pruned_seq, contact_count=ContactFeeds.contact_count + delta)
+    result = await db.execute(lock)
+    if result.rowcount:
+        return
+    try:
+        async with db.begin_nested():
+            # Owners with contacts got their row in migration 0007, so a new row starts from zero;
+            # rows written around the API are picked up by the next reconciliation (counted_at is unset)
+            await db.execute(insert(ContactFeeds).values(owner_id=owner_id, pruned_seq=0, contact_count=delta))
+    except IntegrityError:
+        # Another writer created it first; wait for its lock instead
+        await db.execute(lock)
+
+async def _count_created(created: Dict[int, int], db: AsyncSession) -> None:
+    """Add today's creates per owner to contact_daily_counts; the caller holds the owners' feed locks."""
+    day = datetime.now(timezone.utc).date()
+    result = await db.execute(
+        update(ContactDailyCounts)
+        .where(ContactDailyCounts.owner_id.in_(created), ContactDailyCounts.day == day)
+        .values(created=ContactDailyCounts.created + case(created, value=ContactDailyCounts.owner_id, else_=0))
+    )
+    if result.rowcount < len(created):
+        # Nobody else writes these owners' rows until we commit, so the first create of the day can insert safely
+        existing = await db.scalars(select(ContactDailyCounts.owner_id).where(ContactDailyCounts.owner_id.in_(created), ContactDailyCounts.day == day))
+        missing = set(created).difference(existing)
+        await db.execute(insert(ContactDailyCounts), [{"owner_id": owner_id, "day": day, "created": created[owner_id]} for owner_id in sorted(missing)])
+
+async def _record_changes(owner_id: int, contact_ids: List[int], op: str, db: AsyncSession) -> None:
+    """Log `op` for `contact_ids` in the caller's transaction, for the change feed.
+
+    The owner's feed row is locked first, so the owner's changes get their
+    sequence numbers in commit order and a reader never skips one still in flight.
+    """
+    if not contact_ids:
+        return
+    # The owner's contact count moves under the same lock, in the same statement
+    await _lock_contact_feed(owner_id, db, {"create": len(contact_ids), "delete": -len(contact_ids)}.get(op, 0))
+    if op == "create":
+        await _count_created({owner_id: len(contact_ids)}, db)
+    changed_at = datetime.now(timezone.utc)
+    await db.execute(insert(ContactChanges), [
+        {"owner_id": owner_id, "contact_id": contact_id, "op": op, "changed_at": changed_at} for contact_id in contact_ids
+    ])
+
+async def add_contact(contact: ContactRequest, owner_id: int, db: AsyncSession) -> ContactResponse:
+    if CONTACT_GROUP_COMMIT:
+        created = await contact_group_commit.submit(contact_shards.shard_for(owner_id), (contact, owner_id))
+        # Committed on this request's behalf by the group's own session
+        db.info["committed"] = True
+        return created
+    db_contact = Contacts(**contact.model_dump(), owner_id=owner_id)
+    ids = await allocate_contact_ids(1)
+    if ids:
+        db_contact.id = ids[0]
     db.add(db_contact)
-    db.commit()
+    await db.flush()
+    await _record_changes(owner_id, [db_contact.id], "create", db)
+    await db.commit()
+    index_contact(db_contact)
     return ContactResponse.from_domain(db_contact)
 
-def get_contacts(db: Session, limit: int = 10, offset: int = 0) -> List[ContactResponse]:
-    contacts = db.query(Contacts).limit(limit).offset(offset).all()
-    if not contacts:
-        raise NotFoundException("No contacts found")
-    return [ContactResponse.from_domain(contact) for contact in contacts]
+async def _lock_contact_feeds(owner_ids: List[int], db: AsyncSession, deltas: Dict[int, int]) -> None:
+    """_lock_contact_feed for several owners, in one statement once their feed rows exist."""
+    result = await db.execute(
+        update(ContactFeeds)
+        .where(ContactFeeds.owner_id.in_(owner_ids))
+        .values(pruned_seq=ContactFeeds.pruned_seq, contact_count=ContactFeeds.contact_count + case(deltas, value=ContactFeeds.owner_id, else_=0))
+    )
+    if result.rowcount < len(owner_ids):
+        existing = set(await db.scalars(select(ContactFeeds.owner_id).where(ContactFeeds.owner_id.in_(owner_ids))))
+        # In owner order, like the IN (...) above, so two groups never wait on each other in a cycle
+        for owner_id in owner_ids:
+            if owner_id not in existing:
+                await _lock_contact_feed(owner_id, db, deltas.get(owner_id, 0))
+
+async def _insert_contact_rows(rows: List[dict], db: AsyncSession) -> None:
+    """Insert `rows` (several owners at once) with one multi-row INSERT, setting each row's id, and log them."""
+    created = collections.Counter(row["owner_id"] for row in rows)
+    owner_ids = sorted(created)
+    ids = await allocate_contact_ids(len(rows))
+    if ids:
+        for row, contact_id in zip(rows, ids):
+            row["id"] = contact_id
+    if ids or len(rows) == 1:
+        result = await db.execute(insert(Contacts), rows) if ids else await db.execute(insert(Contacts).values(rows[0]))
+        if not ids:
+            rows[0]["id"] = result.inserted_primary_key[0]
+        await _lock_contact_feeds(owner_ids, db, created)
+    else:
+        # As in bulk import: with the owners' feed rows locked none of their other writes
+        # commits meanwhile, so the new ids are the ones above the current maximum
+        await _lock_contact_feeds(owner_ids, db, created)
+        before = await db.scalar(select(func.max(Contacts.id))) or 0
+        await db.execute(insert(Contacts), rows)
+        result = await db.execute(
+            select(Contacts.id, Contacts.owner_id).where(Contacts.id > before, Contacts.owner_id.in_(owner_ids)).order_by(Contacts.id)
+        )
+        # Auto-increment hands out ids in VALUES order, so each owner's ids match its rows in turn
+        new_ids = collections.defaultdict(collections.deque)
+        for contact_id, owner_id in result.all():
+            new_ids[owner_id].append(contact_id)
+        for row in rows:
+            row["id"] = new_ids[row["owner_id"]].popleft()
+    await _count_created(created, db)
+    changed_at = datetime.now(timezone.utc)
+    await db.execute(insert(ContactChanges), [
+        {"owner_id": row["owner_id"], "contact_id": row["id"], "op": "create", "changed_at": changed_at} for row in rows
+    ])
+
+async def _create_contact_group(shard: int, requests: List[Tuple[ContactRequest, int]]) -> list:
+    """Insert one group of queued creates in one transaction; a ContactResponse or an exception per request."""
+    created_at = datetime.now(timezone.utc)
+    rows = [{**contact.model_dump(), "owner_id": owner_id, "created_at": created_at, "updated_at": created_at} for contact, owner_id in requests]
+    results: list = []
+    async with ContactSessionLocal(requests[0][1]) as db:
+        try:
+            await _insert_contact_rows(rows, db)
+            await db.commit()
+            results = rows
+        except Exception:
+            await db.rollback()
+            # One bad row must not fail its neighbours: retry one per transaction to give each its own answer
+            for row in rows:
+                row.pop("id", None)
+                try:
+                    await _insert_contact_rows([row], db)
+                    await db.commit()
+                    results.append(row)
+                except Exception as e:
+                    await db.rollback()
+                    results.append(e)
+    created = []
+    for result in results:
+        if isinstance(result, Exception):
+            created.append(result)
+            continue
+        db_contact = Contacts(**result)
+        index_contact(db_contact)
+        created.append(ContactResponse.from_domain(db_contact))
+    return created
+
+contact_group_commit = GroupCommit(_create_contact_group, CONTACT_GROUP_COMMIT_MAX_BATCH, CONTACT_GROUP_COMMIT_MAX_DELAY_MS / 1000)
+
+def get_contact_group_commit_stats() -> dict:
+    return {"enabled": CONTACT_GROUP_COMMIT, **contact_group_commit.stats()}
+
+async def _contact_page_rows(owner_id: Optional[int], db: AsyncSession, limit: int, cursor: Optional[str], sort: str, fields: Fields = None) -> list:
+    # The sort key and id are fetched even when not asked for: the cursor is built from them
+    stmt = keyset_select(_owned(select(*select_columns(CONTACT_COLUMNS, fields, "id", sort)), owner_id), CONTACT_SORT_COLUMNS[sort], Contacts.id, sort, limit, cursor)
+    result = await db.execute(stmt)
+    return result.all()
+
+async def get_contacts(owner_id: int, db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None, sort: str = "id", fields: Fields = None) -> ContactPageRows:
+    limit = clamp_page_size(limit)
+    rows, next_cursor = keyset_page(await _contact_page_rows(owner_id, db, limit, cursor, sort, fields), limit, sort)
+    return {"items": [project(row, fields) for row in rows], "next_cursor": next_cursor}
+
+def check_mergeable_sort(sort: str) -> None:
+    if sort not in MERGEABLE_SORTS:
+        raise ValueError(f"Listing every owner's contacts supports sort={' or sort='.join(MERGEABLE_SORTS)} only")
 
-def get_contact_details(contact_id: int, db: Session) -> ContactResponse:
-    contact = _get_contact_by_id(contact_id, db)
-    return ContactResponse.from_domain(contact)
+async def get_all_contacts(session_factories: Sequence[Callable[[], AsyncSession]], limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None, sort: str = "id", fields: Fields = None) -> ContactPageRows:
+    """Every owner's contacts, one page per call: each shard returns its next page and the pages are merged."""
+    check_mergeable_sort(sort)
+    limit = clamp_page_size(limit)
+    pages = await _fan_out(session_factories, lambda db: _contact_page_rows(None, db, limit, cursor, sort, fields))
+    # Ids are unique across shards, so (sort value, id) stays a total order after the merge
+    merged = heapq.merge(*pages, key=lambda row: (getattr(row, sort), row.id))
+    rows, next_cursor = keyset_page(itertools.islice(merged, limit + 1), limit, sort)
+    return {"items": [project(row, fields) for row in rows], "next_cursor": next_cursor}
 
-def update_contact_details(contact_id: int, contact: ContactRequest, db: Session) -> ContactResponse:
-    db_contact = _get_contact_by_id(contact_id, db)
+async def get_contact_count(owner_id: int, db: AsyncSession) -> Tuple[int, Optional[datetime]]:
+    """The owner's cached contact count and when it was last reconciled: one primary-key probe."""
+    row = (await db.execute(select(ContactFeeds.contact_count, ContactFeeds.counted_at).where(ContactFeeds.owner_id == owner_id))).first()
+    if row is None:
+        # No write through the API since counts were introduced; their contacts (if any) must be counted
+        return await db.scalar(select(func.count()).select_from(Contacts).where(Contacts.owner_id == owner_id)), None
+    return row.contact_count, row.counted_at
+
+async def get_contacts_validator(owner_id: int, db: AsyncSession) -> Tuple[Optional[datetime], int]:
+    """Newest updated_at and row count, the inputs of the collection ETag and X-Total-Count."""
+    # The cached count moves with every create and delete, so it validates as well as COUNT(*) without the scan
+    max_updated_at = await db.scalar(_owned(select(func.max(Contacts.updated_at)), owner_id))
+    count, _ = await get_contact_count(owner_id, db)
+    return max_updated_at, count
+
+async def _shard_validator(db: AsyncSession) -> Tuple[Optional[datetime], int]:
+    # MAX is a single probe of the updated_at index; the count is a sum over one feed row per owner, as in the stats
+    result = await db.execute(select(
+        select(func.max(Contacts.updated_at)).scalar_subquery(),
+        select(func.sum(ContactFeeds.contact_count)).scalar_subquery(),
+    ))
+    max_updated_at, count = result.one()
+    return max_updated_at, int(count or 0)
+
+async def get_all_contacts_validator(session_factories: Sequence[Callable[[], AsyncSession]]) -> Tuple[Optional[datetime], int]:
+    validators = await _fan_out(session_factories, _shard_validator)
+    stamps = [max_updated_at for max_updated_at, _ in validators if max_updated_at is not None]
+    return max(stamps, default=None), sum(count for _, count in validators)
+
+async def get_contact_details(contact_id: int, owner_id: int, db: AsyncSession, fields: Fields = None) -> ContactRow:
+    """The contact's requested fields, plus id and updated_at for its validators; the caller projects the rest away."""
+    result = await db.execute(_owned(select(*select_columns(CONTACT_COLUMNS, fields, "id", "updated_at")).where(Contacts.id == contact_id), owner_id))
+    row = result.first()
+    if not row:
+        raise NotFoundException("No contacts found")
+    return row._asdict()
+
+async def update_contact_details(contact_id: int, contact: ContactRequest, owner_id: int, db: AsyncSession, if_match: Optional[str] = None) -> ContactResponse:
+    # With If-Match the row stays locked between the check and the write
+    db_contact = await _get_contact_by_id(contact_id, owner_id, db, for_update=if_match is not None)
+    if not if_match_satisfied(if_match, entity_etag(db_contact.id, db_contact.updated_at)):
+        raise PreconditionFailedException("Contact was modified since it was fetched")
     db_contact.name = contact.name
     db_contact.email = contact.email
     db_contact.phone = contact.phone
+    db_contact.email_normalized = email_key(contact.email)
+    db_contact.phone_normalized = phone_key(contact.phone)
     db_contact.updated_at = datetime.now(timezone.utc)
-    db.commit()
+    await _record_changes(owner_id, [contact_id], "update", db)
+    await db.commit()
+    index_contact(db_contact)
     return ContactResponse.from_domain(db_contact)
 
-def delete_contact(contact_id: int, db: Session) -> None:
-    db_contact = _get_contact_by_id(contact_id, db)
-    db.delete(db_contact)
-    db.commit()
+async def _forget_match_keys(contact_ids: List[int], db: AsyncSession) -> None:
+    # Deleted contacts leave the duplicate index with them instead of waiting for the next scan
+    await db.execute(delete(ContactMatchKeys).where(ContactMatchKeys.contact_id.in_(contact_ids)))
+    await db.execute(delete(ContactNearMatches).where(
+        ContactNearMatches.contact_id.in_(contact_ids) | ContactNearMatches.match_id.in_(contact_ids)
+    ))
 
-def search_contacts(query: str, db: Session) -> List[ContactResponse]:
-    contacts = db.query(Contacts).filter(Contacts.name.ilike(f"%{query}%") | Contacts.email.ilike(f"%{query}%")).all()
-    if not contacts:
-        raise NotFoundException("No contacts found")
-    return [ContactResponse.from_domain(contact) for contact in contacts]
+async def delete_contact(contact_id: int, owner_id: int, db: AsyncSession) -> None:
+    db_contact = await _get_contact_by_id(contact_id, owner_id, db)
+    await db.delete(db_contact)
+    await _forget_match_keys([contact_id], db)
+    await _record_changes(owner_id, [contact_id], "delete", db)
+    await db.commit()
+    unindex_contact(contact_id, owner_id)
+
+async def search_contacts(query: str, owner_id: int, db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None, fields: Fields = None) -> ContactPageRows:
+    limit = clamp_page_size(limit)
+    # Relevance order has no stable seek key, so the cursor carries an offset bounded by SEARCH_MAX_RESULTS
+    offset = decode_cursor(cursor, "relevance")[0] if cursor else 0
+    if not isinstance(offset, int) or not 0 <= offset < SEARCH_MAX_RESULTS:
+        raise ValueError("Invalid cursor")
+    limit = min(limit, SEARCH_MAX_RESULTS - offset)
+    contact_ids = await search_contact_ids(query, owner_id, db, limit + 1, offset)
+    page_ids = contact_ids[:limit]
+    result = await db.execute(_owned(select(*select_columns(CONTACT_COLUMNS, fields, "id")).where(Contacts.id.in_(page_ids)), owner_id))
+    rows_by_id = {row.id: project(row, fields) for row in result.all()}
+    # Ids come back ranked; rows removed since they were indexed are skipped
+    rows = [rows_by_id[contact_id] for contact_id in page_ids if contact_id in rows_by_id]
+    next_offset = offset + limit
+    next_cursor = None
+    if len(contact_ids) > limit and next_offset < SEARCH_MAX_RESULTS:
+        next_cursor = encode_cursor("relevance", next_offset, page_ids[-1])
+    return {"items": rows, "next_cursor": next_cursor}
+
+async def get_contacts_batch(contact_ids: List[int], owner_id: int, db: AsyncSession) -> ContactBatchResponse:
+    _check_batch(contact_ids)
+    contacts = await _get_contacts_by_ids(contact_ids, owner_id, db)
+    return ContactBatchResponse(results=[
+        ContactBatchResult(id=contact_id, status=status.HTTP_200_OK, contact=ContactResponse.from_domain(contacts[contact_id]))
+        if contact_id in contacts else _not_found(contact_id)
+        for contact_id in contact_ids
+    ])
+
+async def update_contacts_batch(items: List[ContactBatchUpdateItem], owner_id: int, db: AsyncSession) -> ContactBatchResponse:
+    _check_batch([item.id for item in items])
+    # Only the owner's rows are found, so the UPDATE by primary key below never touches anyone else's
+    contacts = await _get_contacts_by_ids([item.id for item in items], owner_id, db)
+    updated_at = datetime.now(timezone.utc)
+    updates = [
+        {"id": item.id, "name": item.name, "email": item.email, "phone": item.phone,
+         "email_normalized": email_key(item.email), "phone_normalized": phone_key(item.phone), "updated_at": updated_at}
+        for item in items if item.id in contacts
+    ]
+    # Bulk UPDATE by primary key, all chunks in one transaction
+    for start in range(0, len(updates), CONTACT_BATCH_CHUNK_SIZE):
+        await db.execute(update(Contacts), updates[start:start + CONTACT_BATCH_CHUNK_SIZE])
+    await _record_changes(owner_id, [values["id"] for values in updates], "update", db)
+    await db.commit()
+    results = []
+    for item in items:
+        if item.id not in contacts:
+            results.append(_not_found(item.id))
+            continue
+        contact = ContactResponse(
+            id=item.id, owner_id=owner_id, name=item.name, email=item.email, phone=item.phone,
+            created_at=contacts[item.id].created_at, updated_at=updated_at,
+        )
+        index_contact(contact)
+        results.append(ContactBatchResult(id=item.id, status=status.HTTP_200_OK, contact=contact))
+    return ContactBatchResponse(results=results)
+
+async def delete_contacts_batch(contact_ids: List[int], owner_id: int, db: AsyncSession) -> ContactBatchResponse:
+    _check_batch(contact_ids)
+    existing_ids = set()
+    for chunk in _chunks(contact_ids):
+        result = await db.execute(select(Contacts.id).where(Contacts.owner_id == owner_id, Contacts.id.in_(chunk)))
+        existing_ids.update(result.scalars().all())
+    for chunk in _chunks(list(existing_ids)):
+        await db.execute(delete(Contacts).where(Contacts.owner_id == owner_id, Contacts.id.in_(chunk)))
+        await _forget_match_keys(chunk, db)
+    await _record_changes(owner_id, sorted(existing_ids), "delete", db)
+    await db.commit()
+    for contact_id in existing_ids:
+        unindex_contact(contact_id, owner_id)
+    return ContactBatchResponse(results=[
+        ContactBatchResult(id=contact_id, status=status.HTTP_204_NO_CONTENT) if contact_id in existing_ids else _not_found(contact_id)
+        for contact_id in contact_ids
+    ])
+
+async def lookup_contacts(phones: List[str], emails: List[str], owner_id: int, db: AsyncSession, fields: Fields = None) -> ContactLookupRows:
+    """Contacts by exact phone number or email, one result per value asked for, in request order.
+
+    Values are normalized like the stored lookup columns, so "+1 (555) 010-0199"
+    finds "15550100199" and "Ann@Example.com" finds "ann@example.com"; each
+    CONTACT_BATCH_CHUNK_SIZE distinct values cost one IN (...) seek on the
+    owner-leading lookup index.
+    """
+    if len(phones) + len(emails) > CONTACT_LOOKUP_MAX_SIZE:
+        raise ValueError(f"At most {CONTACT_LOOKUP_MAX_SIZE} phone numbers and emails per lookup")
+    phone_matches = await _lookup(Contacts.phone_normalized, {phone_key(phone) for phone in phones} - {None}, owner_id, db, fields)
+    email_matches = await _lookup(Contacts.email_normalized, {email_key(email) for email in emails} - {""}, owner_id, db, fields)
+    return {"results": [
+        {"phone": phone, "email": None, "contacts": phone_matches.get(phone_key(phone), [])} for phone in phones
+    ] + [
+        {"phone": None, "email": email, "contacts": email_matches.get(email_key(email), [])} for email in emails
+    ]}
+
+async def _lookup(column, keys: set, owner_id: int, db: AsyncSession, fields: Fields = None) -> Dict[str, List[ContactRow]]:
+    matches: Dict[str, list] = {}
+    for chunk in _chunks(sorted(keys)):
+        result = await db.execute(
+            select(*select_columns(CONTACT_COLUMNS, fields, "id"), column.label("lookup_key"))
+            .where(Contacts.owner_id == owner_id, column.in_(chunk))
+        )
+        for row in result.all():
+            matches.setdefault(row.lookup_key, []).append(row)
+    # Ordered here rather than in SQL: ORDER BY id can tempt the planner onto the (owner_id, id) index
+    return {key: [project(row, fields or CONTACT_FIELD_NAMES) for row in sorted(rows, key=lambda row: row.id)] for key, rows in matches.items()}
+
+def _check_batch(contact_ids: List[int]) -> None:
+    if len(contact_ids) > CONTACT_BATCH_MAX_SIZE:
+        raise ValueError(f"At most {CONTACT_BATCH_MAX_SIZE} contacts per batch")
+    if len(set(contact_ids)) != len(contact_ids):
+        raise ValueError("Duplicate contact ids in batch")
+
+def _chunks(contact_ids: List[int]):
+    for start in range(0, len(contact_ids), CONTACT_BATCH_CHUNK_SIZE):
+        yield contact_ids[start:start + CONTACT_BATCH_CHUNK_SIZE]
+
+def _not_found(contact_id: int) -> ContactBatchResult:
+    return ContactBatchResult(id=contact_id, status=status.HTTP_404_NOT_FOUND, error="No contacts found")
+
+async def _get_contacts_by_ids(contact_ids: List[int], owner_id: int, db: AsyncSession) -> Dict[int, Contacts]:
+    contacts = {}
+    for chunk in _chunks(contact_ids):
+        result = await db.execute(select(Contacts).where(Contacts.owner_id == owner_id, Contacts.id.in_(chunk)))
+        contacts.update((contact.id, contact) for contact in result.scalars().all())
+    return contacts
 
-def _get_contact_by_id(contact_id: int, db: Session) -> Contacts:
-    contact = db.query(Contacts).filter(Contacts.id == contact_id).first()
+async def _get_contact_by_id(contact_id: int, owner_id: int, db: AsyncSession, for_update: bool = False) -> Contacts:
+    # Someone else's contact is "not found", never "forbidden": ids do not reveal what exists
+    stmt = select(Contacts).where(Contacts.id == contact_id, Contacts.owner_id == owner_id)
+    if for_update:
+        stmt = stmt.with_for_update()
+    result = await db.execute(stmt)
+    contact = result.scalars().first()
     if not contact:
         raise NotFoundException("No contacts found")
-    return contact
\ No newline at end of file
+    return contact
@@ -0,0 +1,338 @@
+import os
+import re
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from difflib import SequenceMatcher
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+from sqlalchemy import and_, delete, func, insert, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import ContactDedupState, ContactMatchKeys, ContactNearMatches, Contacts
+from app.application_services.contacts.contacts import CONTACT_COLUMNS, _check_batch, _fan_out, _forget_match_keys, _record_changes
+from app.application_services.contacts.schemas.response import ContactResponse, DuplicateCluster, DuplicateClusterPage, DuplicateMergeResponse, DuplicateScanResponse
+from app.application_services.contacts.search import index_contact, unindex_contact
+from app.exceptions.exceptions import NotFoundException
+from app.utils.normalize import email_key, phone_key
+from app.utils.pagination import DEFAULT_PAGE_SIZE, clamp_page_size, decode_cursor, encode_cursor
+
+# Contacts read, keyed and committed per round-trip of the incremental scan
+DEDUP_SCAN_CHUNK_ROWS = int(os.getenv("DEDUP_SCAN_CHUNK_ROWS", "1000"))
+# Each scan re-reads this much before the watermark, so rows committed late with an older updated_at are not missed
+DEDUP_SCAN_OVERLAP_SECONDS = float(os.getenv("DEDUP_SCAN_OVERLAP_SECONDS", "5"))
+# Score near matches during the scan; off leaves only exact email/phone clusters
+DEDUP_NEAR_MATCHES = os.getenv("DEDUP_NEAR_MATCHES", "true").lower() in ("1", "true", "yes")
+# Near matches: two names in one block are the same contact from this similarity up (0..1)
+DEDUP_NEAR_MATCH_THRESHOLD = float(os.getenv("DEDUP_NEAR_MATCH_THRESHOLD", "0.85"))
+# Name blocks larger than this are not scored (a changed contact is compared with its whole block)
+DEDUP_MAX_BLOCK_SIZE = int(os.getenv("DEDUP_MAX_BLOCK_SIZE", "200"))
+
+# Two characters tolerate typos from the third letter on ("Jon" / "John") at the price of larger blocks
+NAME_KEY_PREFIX = 2
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def _name_tokens(name: str) -> List[str]:
+    # Accents are dropped, so "José" and "Jose" land in one block
+    folded = "".join(c for c in unicodedata.normalize("NFKD", name) if not unicodedata.combining(c))
+    return _TOKEN_RE.findall(folded.casefold())
+
+def name_key(name: str) -> str:
+    """Blocking key: prefixes of the first and last name token, in either order ("Smith, John" == "John Smith")."""
+    tokens = _name_tokens(name)
+    if not tokens:
+        return ""
+    return "|".join(sorted({tokens[0][:NAME_KEY_PREFIX], tokens[-1][:NAME_KEY_PREFIX]}))
+
+def _comparable_name(name: str) -> str:
+    return " ".join(sorted(_name_tokens(name)))
+
+def _char_bag(name: str) -> frozenset:
+    # The name's characters as a multiset ("anna" -> a0 n0 n1 a1): the size of a set intersection
+    # of two bags is the number of characters they share, which bounds SequenceMatcher.ratio()
+    seen: Dict[str, int] = {}
+    bag = []
+    for char in name:
+        bag.append((char, seen.get(char, 0)))
+        seen[char] = seen.get(char, 0) + 1
+    return frozenset(bag)
+
+def _comparable(name: str) -> tuple:
+    comparable = _comparable_name(name)
+    return comparable, _char_bag(comparable)
+
+
+class _NameBlocks:
+    """Comparable names of the name blocks one scan has touched, kept across its chunks.
+
+    The first scan of a table touches every block in every chunk; reading each
+    block once instead of once per chunk is what keeps it linear.
+    """
+
+    def __init__(self):
+        # block key -> {contact id: (comparable name, character bag)}
+        self.members: Dict[tuple, Dict[int, tuple]] = {}
+        self.block_of: Dict[int, tuple] = {}
+
+    def move(self, contact_id: int, block_key: tuple, name: str) -> None:
+        old = self.block_of.pop(contact_id, None)
+        if old is not None:
+            self.members[old].pop(contact_id, None)
+        if block_key in self.members:
+            self.members[block_key][contact_id] = _comparable(name)
+            self.block_of[contact_id] = block_key
+
+    async def load(self, block_keys: Iterable[tuple], db: AsyncSession) -> None:
+        missing = [block_key for block_key in block_keys if block_key not in self.members]
+        for start in range(0, len(missing), DEDUP_SCAN_CHUNK_ROWS):
+            chunk = missing[start:start + DEDUP_SCAN_CHUNK_ROWS]
+            for block_key in chunk:
+                self.members[block_key] = {}
+            result = await db.execute(
+                select(Contacts.id, Contacts.name, ContactMatchKeys.owner_id, ContactMatchKeys.name_key)
+                .join(ContactMatchKeys, ContactMatchKeys.contact_id == Contacts.id)
+                .where(tuple_(ContactMatchKeys.owner_id, ContactMatchKeys.name_key).in_(chunk))
+            )
+            for member in result.all():
+                block_key = (member.owner_id, member.name_key)
+                self.members[block_key][member.id] = _comparable(member.name)
+                self.block_of[member.id] = block_key
+
+
+def _near_matches(changed: list, block: Dict[int, tuple], changed_ids: set, threshold: float) -> Iterable[tuple]:
+    """(lower id, higher id, score) for each changed contact and block member at least `threshold` similar."""
+    matcher = SequenceMatcher(autojunk=False)
+    for row in changed:
+        name, bag = block[row.id]
+        # SequenceMatcher caches what it knows about its second sequence
+        matcher.set_seq2(name)
+        for other_id, (other_name, other_bag) in block.items():
+            # Two changed contacts are compared once, from the lower id
+            if other_id == row.id or (other_id < row.id and other_id in changed_ids):
+                continue
+            # Cheap upper bounds first (real_quick_ratio and quick_ratio, without the Python loops):
+            # most pairs in a block are rejected without the full comparison
+            total = len(name) + len(other_name)
+            if 2 * min(len(name), len(other_name)) < threshold * total or 2 * len(bag & other_bag) < threshold * total:
+                continue
+            matcher.set_seq1(other_name)
+            score = matcher.ratio()
+            if score >= threshold:
+                yield min(row.id, other_id), max(row.id, other_id), score
+
+async def _score_near_matches(rows: list, blocks: _NameBlocks, db: AsyncSession) -> None:
+    """Re-pair the changed contacts `rows` with the members of their name blocks."""
+    changed_ids = {row.id for row in rows}
+    await db.execute(delete(ContactNearMatches).where(
+        or_(ContactNearMatches.contact_id.in_(changed_ids), ContactNearMatches.match_id.in_(changed_ids))
+    ))
+    changed_by_block: Dict[tuple, List] = {}
+    for row in rows:
+        blocks.move(row.id, (row.owner_id, row.name_key), row.name)
+        if row.name_key:
+            changed_by_block.setdefault((row.owner_id, row.name_key), []).append(row)
+    await blocks.load(changed_by_block, db)
+    pairs: Dict[tuple, tuple] = {}
+    for block_key, changed in changed_by_block.items():
+        block = blocks.members[block_key]
+        if len(block) > DEDUP_MAX_BLOCK_SIZE:
+            continue
+        for contact_id, match_id, score in _near_matches(changed, block, changed_ids, DEDUP_NEAR_MATCH_THRESHOLD):
+            pairs[(contact_id, match_id)] = (block_key[0], score)
+    if pairs:
+        await db.execute(insert(ContactNearMatches), [
+            {"contact_id": contact_id, "match_id": match_id, "owner_id": owner_id, "score": round(score, 3)}
+            for (contact_id, match_id), (owner_id, score) in pairs.items()
+        ])
+
+
+async def scan_duplicates(db: AsyncSession) -> DuplicateScanResponse:
+    """Refresh the match keys (and near-match pairs) of the contacts changed since the last scan of this database."""
+    state = await db.get(ContactDedupState, "contacts")
+    if state is None:
+        state = ContactDedupState(name="contacts")
+        db.add(state)
+    last = None
+    if state.watermark is not None:
+        last = (state.watermark - timedelta(seconds=DEDUP_SCAN_OVERLAP_SECONDS), 0)
+    scanned = 0
+    blocks = _NameBlocks()
+    while True:
+        # Keyset chunks in (updated_at, id) order: every chunk is an index range and is committed with the watermark
+        stmt = select(Contacts.id, Contacts.owner_id, Contacts.name, Contacts.email, Contacts.phone, Contacts.updated_at)
+        if last is not None:
+            stmt = stmt.where(or_(Contacts.updated_at > last[0], and_(Contacts.updated_at == last[0], Contacts.id > last[1])))
+        result = await db.execute(stmt.order_by(Contacts.updated_at, Contacts.id).limit(DEDUP_SCAN_CHUNK_ROWS))
+        rows = result.all()
+        if not rows:
+            break
+        await db.execute(delete(ContactMatchKeys).where(ContactMatchKeys.contact_id.in_([row.id for row in rows])))
+        keys = [
+            {"contact_id": row.id, "owner_id": row.owner_id, "email_key": email_key(row.email),
+             "phone_key": phone_key(row.phone), "name_key": name_key(row.name)}
+            for row in rows
+        ]
+        await db.execute(insert(ContactMatchKeys), keys)
+        if DEDUP_NEAR_MATCHES:
+            await _score_near_matches([
+                _Changed(row.id, row.owner_id, row.name, key["name_key"]) for row, key in zip(rows, keys)
+            ], blocks, db)
+        last = (rows[-1].updated_at, rows[-1].id)
+        state.watermark = max(state.watermark or last[0], last[0])
+        await db.commit()
+        scanned += len(rows)
+    state.scanned_at = datetime.now(timezone.utc)
+    await db.commit()
+    return DuplicateScanResponse(scanned=scanned, watermark=state.watermark)
+
+async def scan_all_duplicates(session_factories: Sequence[Callable[[], AsyncSession]]) -> List[DuplicateScanResponse]:
+    """Run the incremental scan on every contact shard at once."""
+    return await _fan_out(session_factories, scan_duplicates)
+
+
+class _Changed(NamedTuple):
+    id: int
+    owner_id: int
+    name: str
+    name_key: str
+
+
+class _Clusters:
+    """Union-find over contact ids."""
+
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+        self.reasons: Dict[int, set] = {}
+        self.score: Dict[int, float] = {}
+
+    def find(self, contact_id: int) -> int:
+        parent = self.parent.setdefault(contact_id, contact_id)
+        while parent != self.parent[parent]:
+            self.parent[parent] = self.parent[self.parent[parent]]
+            parent = self.parent[parent]
+        self.parent[contact_id] = parent
+        return parent
+
+    def union(self, a: int, b: int, reason: str, score: float = 1.0) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+            self.reasons.setdefault(root_a, set()).update(self.reasons.pop(root_b, ()))
+            self.score[root_a] = min(self.score.get(root_a, 1.0), self.score.pop(root_b, 1.0))
+        self.reasons.setdefault(root_a, set()).add(reason)
+        self.score[root_a] = min(self.score.get(root_a, 1.0), score)
+
+    def link_bucket(self, contact_ids: Iterable[int], reason: str) -> None:
+        contact_ids = list(contact_ids)
+        for other in contact_ids[1:]:
+            self.union(contact_ids[0], other, reason)
+
+
+def _buckets(rows: list, key: str) -> Dict[str, List]:
+    buckets: Dict[str, List] = {}
+    for row in rows:
+        value = getattr(row, key)
+        if value:
+            buckets.setdefault(value, []).append(row)
+    return buckets
+
+async def get_duplicate_clusters(owner_id: int, db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None, near: bool = False) -> DuplicateClusterPage:
+    """The owner's duplicate clusters as of the last scan, ordered by their lowest contact id.
+
+    Only rows whose email or phone key is shared (or, with `near`, that have a
+    near-match pair stored by the scan) are read: the buckets are found with
+    GROUP BY ... HAVING over the owner-leading key indexes, never by comparing
+    contacts pairwise.
+    """
+    limit = clamp_page_size(limit)
+    after = decode_cursor(cursor, "cluster")[1] if cursor else 0
+
+    def shared(column):
+        return (
+            select(column)
+            .where(ContactMatchKeys.owner_id == owner_id, column.is_not(None))
+            .group_by(column)
+            .having(func.count() > 1)
+        )
+    conditions = [ContactMatchKeys.email_key.in_(shared(ContactMatchKeys.email_key)), ContactMatchKeys.phone_key.in_(shared(ContactMatchKeys.phone_key))]
+    pairs = []
+    if near:
+        pair_result = await db.execute(
+            select(ContactNearMatches.contact_id, ContactNearMatches.match_id, ContactNearMatches.score)
+            .where(ContactNearMatches.owner_id == owner_id)
+        )
+        pairs = pair_result.all()
+        paired = select(ContactNearMatches.contact_id).where(ContactNearMatches.owner_id == owner_id)
+        conditions.append(Contacts.id.in_(paired.union(
+            select(ContactNearMatches.match_id).where(ContactNearMatches.owner_id == owner_id)
+        )))
+    result = await db.execute(
+        select(*CONTACT_COLUMNS, ContactMatchKeys.email_key, ContactMatchKeys.phone_key)
+        .join(ContactMatchKeys, ContactMatchKeys.contact_id == Contacts.id)
+        .where(ContactMatchKeys.owner_id == owner_id, Contacts.owner_id == owner_id, or_(*conditions))
+        .order_by(Contacts.id)
+    )
+    rows = result.all()
+
+    clusters = _Clusters()
+    for bucket in _buckets(rows, "email_key").values():
+        clusters.link_bucket((row.id for row in bucket), "email")
+    for bucket in _buckets(rows, "phone_key").values():
+        clusters.link_bucket((row.id for row in bucket), "phone")
+    for pair in pairs:
+        clusters.union(pair.contact_id, pair.match_id, "name", pair.score)
+
+    members: Dict[int, List] = {}
+    for row in rows:
+        if row.id in clusters.parent:
+            members.setdefault(clusters.find(row.id), []).append(row)
+    # Rows come ordered by id, so each member list is too and starts with the cluster's lowest id
+    ordered = sorted((group for group in members.values() if len(group) > 1 and group[0].id > after), key=lambda group: group[0].id)
+    page = ordered[:limit]
+    items = [
+        DuplicateCluster(
+            contacts=[{column.key: getattr(row, column.key) for column in CONTACT_COLUMNS} for row in group],
+            reasons=sorted(clusters.reasons[clusters.find(group[0].id)]),
+            score=clusters.score.get(clusters.find(group[0].id), 1.0),
+        )
+        for group in page
+    ]
+    next_cursor = encode_cursor("cluster", page[-1][0].id, page[-1][0].id) if len(ordered) > limit else None
+    return DuplicateClusterPage(items=items, next_cursor=next_cursor)
+
+async def merge_duplicates(contact_ids: List[int], owner_id: int, db: AsyncSession, keep_id: Optional[int] = None) -> DuplicateMergeResponse:
+    """Fold a cluster into one contact in a single transaction.
+
+    The survivor (`keep_id`, else the oldest contact) keeps its own fields and
+    takes a phone number from the others if it has none; the rest are deleted.
+    """
+    _check_batch(contact_ids)
+    if len(contact_ids) < 2:
+        raise ValueError("A merge needs at least two contacts")
+    if keep_id is not None and keep_id not in contact_ids:
+        raise ValueError("keep_id must be one of the merged ids")
+    result = await db.execute(
+        select(Contacts)
+        .where(Contacts.owner_id == owner_id, Contacts.id.in_(contact_ids))
+        .order_by(Contacts.created_at, Contacts.id)
+        .with_for_update()
+    )
+    contacts = result.scalars().all()
+    if len(contacts) != len(contact_ids):
+        missing = sorted(set(contact_ids) - {contact.id for contact in contacts})
+        raise NotFoundException(f"No contacts found: {missing}")
+    survivor = next(contact for contact in contacts if contact.id == keep_id) if keep_id is not None else contacts[0]
+    merged = [contact for contact in contacts if contact is not survivor]
+    if not survivor.phone:
+        survivor.phone = next((contact.phone for contact in merged if contact.phone), None)
+        survivor.phone_normalized = phone_key(survivor.phone)
+    survivor.updated_at = datetime.now(timezone.utc)
+    merged_ids = [contact.id for contact in merged]
+    await db.execute(delete(Contacts).where(Contacts.owner_id == owner_id, Contacts.id.in_(merged_ids)))
+    await _forget_match_keys(merged_ids, db)
+    await _record_changes(owner_id, merged_ids, "delete", db)
+    await _record_changes(owner_id, [survivor.id], "update", db)
+    await db.commit()
+    for contact_id in merged_ids:
+        unindex_contact(contact_id, owner_id)
+    index_contact(survivor)
+    return DuplicateMergeResponse(contact=ContactResponse.from_domain(survivor), merged_ids=sorted(merged_ids))
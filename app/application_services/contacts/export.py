@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator, Callable, Sequence
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import AsyncSessionLocal, Contacts
+from app.application_services.contacts.contacts import CONTACT_COLUMNS
+
+# Rows fetched from the server-side cursor, and encoded into one response chunk, at a time
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+# An export holds one owner's contacts, so the owner column would only repeat itself
+EXPORT_COLUMNS = tuple(column for column in CONTACT_COLUMNS if column.key != "owner_id")
+EXPORT_FIELDS = tuple(column.key for column in EXPORT_COLUMNS)
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _encode_ndjson(rows: Sequence) -> bytes:
+    return "".join(
+        json.dumps(
+            {
+                "id": contact_id,
+                "name": name,
+                "email": email,
+                "phone": phone,
+                "created_at": created_at.isoformat(),
+                "updated_at": updated_at.isoformat(),
+            }
+        ) + "\n"
+        for contact_id, name, email, phone, created_at, updated_at in rows
+    ).encode()
+
+def _encode_csv(rows: Sequence) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for contact_id, name, email, phone, created_at, updated_at in rows:
+        writer.writerow((contact_id, name, email, phone or "", created_at.isoformat(), updated_at.isoformat()))
+    return buffer.getvalue().encode()
+
+async def export_contacts(format: str, owner_id: int, session_factory: Callable[[], AsyncSession] = AsyncSessionLocal) -> AsyncIterator[bytes]:
+    """Stream every contact of the owner as NDJSON or CSV, one encoded chunk per cursor batch."""
+    encode = _encode_csv if format == "csv" else _encode_ndjson
+    if format == "csv":
+        yield (",".join(EXPORT_FIELDS) + "\n").encode()
+    # The request's session is closed before a streamed body is sent, so the export owns one
+    async with session_factory() as db:
+        result = await db.stream(
+            select(*EXPORT_COLUMNS).where(Contacts.owner_id == owner_id).order_by(Contacts.id).execution_options(yield_per=EXPORT_CHUNK_ROWS)
+        )
+        async for rows in result.partitions():
+            yield encode(rows)
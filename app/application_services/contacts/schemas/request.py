@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 from app.models import Contacts
 
@@ -13,4 +13,22 @@ class ContactRequest(BaseModel):
             name=contact.name,
             email=contact.email,
             phone=contact.phone,
-        )
\ No newline at end of file
+        )
+
+class ContactBatchIdsRequest(BaseModel):
+    ids: List[int]
+
+class ContactBatchUpdateItem(ContactRequest):
+    id: int
+
+class ContactBatchUpdateRequest(BaseModel):
+    items: List[ContactBatchUpdateItem]
+
+class ContactLookupRequest(BaseModel):
+    phones: List[str] = []
+    emails: List[str] = []
+
+class DuplicateMergeRequest(BaseModel):
+    ids: List[int]
+    # The contact that survives the merge; the oldest one when not given
+    keep_id: Optional[int] = None
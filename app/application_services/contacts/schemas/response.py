@@ -1,10 +1,13 @@
-from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel
+from datetime import date, datetime
+from typing import List, Optional
+from typing_extensions import TypedDict
+from pydantic import BaseModel, TypeAdapter
 from app.models import Contacts
+from app.application_services.users.schemas.response import UserCountsResponse, UserCountsReconcileResponse
 
 class ContactResponse(BaseModel):
     id: int
+    owner_id: int
     name: str
     email: str
     phone: Optional[str] = None
@@ -15,9 +18,123 @@ class ContactResponse(BaseModel):
     def from_domain(cls, contact: Contacts):
         return cls(
             id=contact.id,
+            owner_id=contact.owner_id,
             name=contact.name,
             email=contact.email,
             phone=contact.phone,
             created_at=contact.created_at,
             updated_at=contact.updated_at
-        )
\ No newline at end of file
+        )
+
+class ContactPageResponse(BaseModel):
+    items: List[ContactResponse]
+    next_cursor: Optional[str] = None
+
+# Read fast path: list endpoints select plain columns into these dicts and serialize them
+# in one pass with a cached TypeAdapter, skipping per-row model construction and validation
+class ContactRow(TypedDict):
+    id: int
+    owner_id: int
+    name: str
+    email: str
+    phone: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+class ContactPageRows(TypedDict):
+    items: List[ContactRow]
+    next_cursor: Optional[str]
+
+class ContactLookupResult(TypedDict):
+    # The phone number or email as asked for, and every contact it belongs to
+    phone: Optional[str]
+    email: Optional[str]
+    contacts: List[ContactRow]
+
+class ContactLookupRows(TypedDict):
+    results: List[ContactLookupResult]
+
+class ContactChange(TypedDict):
+    seq: int
+    # "create", "update" or "delete"
+    op: str
+    contact_id: int
+    changed_at: datetime
+    # The contact as it is now; null for deletes
+    contact: Optional[ContactRow]
+
+class ContactChangePage(TypedDict):
+    changes: List[ContactChange]
+    # Pass back as since; always set, so a client can poll with it
+    next_cursor: str
+    has_more: bool
+
+CONTACT_ADAPTER = TypeAdapter(ContactRow)
+CONTACT_PAGE_ADAPTER = TypeAdapter(ContactPageRows)
+CONTACT_LOOKUP_ADAPTER = TypeAdapter(ContactLookupRows)
+CONTACT_CHANGES_ADAPTER = TypeAdapter(ContactChangePage)
+
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportResponse(BaseModel):
+    accepted: int = 0
+    rejected: int = 0
+    errors: List[BulkImportError] = []
+    errors_truncated: bool = False
+
+class ContactBatchResult(BaseModel):
+    id: int
+    # HTTP status the single-contact endpoint would have answered with
+    status: int
+    contact: Optional[ContactResponse] = None
+    error: Optional[str] = None
+
+class ContactBatchResponse(BaseModel):
+    results: List[ContactBatchResult]
+
+class DuplicateCluster(BaseModel):
+    contacts: List[ContactRow]
+    # What linked the cluster: "email", "phone" and/or "name" (near match)
+    reasons: List[str]
+    # Lowest name similarity among the near matches that joined it; 1.0 for exact key matches only
+    score: float
+
+class DuplicateClusterPage(BaseModel):
+    items: List[DuplicateCluster]
+    next_cursor: Optional[str] = None
+
+class DuplicateMergeResponse(BaseModel):
+    contact: ContactResponse
+    merged_ids: List[int]
+
+class DuplicateScanResponse(BaseModel):
+    scanned: int
+    watermark: Optional[datetime] = None
+
+class ContactChangePruneResponse(BaseModel):
+    pruned: int
+    # Cursors at or below this seq now answer 410 Gone
+    pruned_seq: int
+
+class DailyContactCount(BaseModel):
+    day: date
+    created: int
+
+class ContactStatsResponse(BaseModel):
+    contacts: int
+    # When a reconciliation last checked the total (the oldest check across owners for all_owners)
+    counted_at: Optional[datetime] = None
+    # Contacts created per UTC day, oldest first; days without creates are left out
+    created_per_day: List[DailyContactCount]
+    # Admins with all_owners=true only
+    users: Optional[UserCountsResponse] = None
+
+class ContactCountsReconcileResponse(BaseModel):
+    owners_checked: int
+    owners_corrected: int
+
+class CountsReconcileResponse(BaseModel):
+    shards: List[ContactCountsReconcileResponse]
+    users: UserCountsReconcileResponse
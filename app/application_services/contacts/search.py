@@ -0,0 +1,322 @@
+import asyncio
+import heapq
+import os
+import re
+import time
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import ContactChanges, Contacts, contact_shards
+from app.utils.cache import SyncCheck
+from app.utils.normalize import phone_key
+
+# auto: MySQL FULLTEXT (ngram) index on MySQL, in-process index anywhere else
+CONTACT_SEARCH_BACKEND = os.getenv("CONTACT_SEARCH_BACKEND", "auto")
+# Relevance-ranked results are only paged through this many rows deep
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "1000"))
+# A change log sequence number still missing this long after later ones appeared was rolled back
+SEARCH_SYNC_SETTLE_SECONDS = float(os.getenv("SEARCH_SYNC_SETTLE_SECONDS", "10"))
+# Further behind than this many changes, an index is rebuilt instead of patched
+SEARCH_SYNC_MAX_CHANGES = int(os.getenv("SEARCH_SYNC_MAX_CHANGES", "5000"))
+# Query terms shorter than this only match whole tokens, so "a" cannot expand to half the index
+SEARCH_MIN_PREFIX_LENGTH = 2
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_PHONE_QUERY_RE = re.compile(r"[\d\s()+.-]+")
+_NON_DIGIT_RE = re.compile(r"\D")
+
+EXACT_MATCH_WEIGHT = 2
+PREFIX_MATCH_WEIGHT = 1
+
+
+def contact_terms(name: str, email: str, phone: Optional[str]) -> Set[str]:
+    terms = set(_TOKEN_RE.findall(name.lower()))
+    email = email.lower()
+    terms.add(email)
+    terms.update(_TOKEN_RE.findall(email))
+    digits = phone_key(phone)
+    if digits:
+        # Every suffix, so a prefix search finds a run of digits anywhere in the number ("555" in
+        # 15550100199), as MySQL's ngram index does; a trailing run such as the local number ranks as a whole token
+        terms.update(digits[start:] for start in range(len(digits) - SEARCH_MIN_PREFIX_LENGTH + 1))
+        terms.add(digits)
+    return terms
+
+def query_terms(query: str) -> List[str]:
+    # "+1 (555) 010-0199" is one phone number, not four tokens
+    if _PHONE_QUERY_RE.fullmatch(query.strip()):
+        digits = _NON_DIGIT_RE.sub("", query)
+        return [digits] if digits else []
+    return list(dict.fromkeys(_TOKEN_RE.findall(query.lower())))
+
+
+class ContactSearchIndex:
+    """In-process inverted index over contact name, email and phone tokens.
+
+    Terms are kept in a sorted list as well, so a prefix is resolved with a
+    bisect instead of a scan. Contact ids are also grouped by owner, so an
+    owner-scoped search only ranks that owner's matches. Only used from the
+    event loop thread.
+    """
+
+    def __init__(self):
+        # active: accepting writes (set while building), ready: terms sorted and searchable
+        self.active = False
+        self.ready = False
+        self._postings: Dict[str, Set[int]] = {}
+        self._terms: List[str] = []
+        self._documents: Dict[int, Set[str]] = {}
+        self._owner_of: Dict[int, int] = {}
+        self._owned: Dict[int, Set[int]] = {}
+        self._build_lock = asyncio.Lock()
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, contact_id: int, owner_id: int, name: str, email: str, phone: Optional[str]) -> None:
+        self.remove(contact_id)
+        terms = contact_terms(name, email, phone)
+        self._documents[contact_id] = terms
+        self._owner_of[contact_id] = owner_id
+        self._owned.setdefault(owner_id, set()).add(contact_id)
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = set()
+                if self.ready:
+                    insort(self._terms, term)
+            posting.add(contact_id)
+
+    def remove(self, contact_id: int) -> None:
+        terms = self._documents.pop(contact_id, None)
+        if not terms:
+            return
+        owner_id = self._owner_of.pop(contact_id)
+        owned = self._owned[owner_id]
+        owned.discard(contact_id)
+        if not owned:
+            del self._owned[owner_id]
+        for term in terms:
+            posting = self._postings[term]
+            posting.discard(contact_id)
+            if not posting:
+                del self._postings[term]
+                if self.ready:
+                    del self._terms[bisect_left(self._terms, term)]
+
+    def clear(self) -> None:
+        self._generation += 1
+        self.active = False
+        self.ready = False
+        self._postings.clear()
+        self._terms.clear()
+        self._documents.clear()
+        self._owner_of.clear()
+        self._owned.clear()
+
+    def finish_build(self) -> None:
+        self._terms = sorted(self._postings)
+        self.active = True
+        self.ready = True
+
+    async def ensure_built(self, db: AsyncSession) -> None:
+        if self.ready:
+            return
+        async with self._build_lock:
+            while not self.ready:
+                # Writes that land while the table is being read are applied too
+                self.active = True
+                generation = self._generation
+                try:
+                    result = await db.stream(
+                        select(Contacts.id, Contacts.owner_id, Contacts.name, Contacts.email, Contacts.phone).execution_options(yield_per=5000)
+                    )
+                    async for contact_id, owner_id, name, email, phone in result:
+                        self.add(contact_id, owner_id, name, email, phone)
+                except BaseException:
+                    self.clear()
+                    raise
+                if generation == self._generation:
+                    self.finish_build()
+                else:
+                    # Cleared mid-build (the change follower fell too far behind); start over
+                    self.clear()
+
+    async def refresh(self, contact_ids: Set[int], db: AsyncSession) -> None:
+        """Re-read contacts another process changed: current rows are indexed again, deleted ones removed."""
+        generation = self._generation
+        result = await db.execute(
+            select(Contacts.id, Contacts.owner_id, Contacts.name, Contacts.email, Contacts.phone).where(Contacts.id.in_(contact_ids))
+        )
+        if not self.active or generation != self._generation:
+            return
+        found = set()
+        for contact_id, owner_id, name, email, phone in result:
+            self.add(contact_id, owner_id, name, email, phone)
+            found.add(contact_id)
+        for contact_id in contact_ids - found:
+            self.remove(contact_id)
+
+    def _term_range(self, term: str) -> Tuple[int, int]:
+        if len(term) < SEARCH_MIN_PREFIX_LENGTH:
+            position = bisect_left(self._terms, term)
+            found = position < len(self._terms) and self._terms[position] == term
+            return position, position + found
+        return bisect_left(self._terms, term), bisect_left(self._terms, term + "\U0010ffff")
+
+    def _union(self, low: int, high: int) -> Set[int]:
+        postings = [self._postings[term] for term in self._terms[low:high]]
+        if len(postings) == 1:
+            return postings[0]
+        return set().union(*postings)
+
+    def _matches(self, term: str, contact_terms: Set[str]) -> bool:
+        if len(term) < SEARCH_MIN_PREFIX_LENGTH:
+            return term in contact_terms
+        return any(contact_term.startswith(term) for contact_term in contact_terms)
+
+    def search(self, query: str, limit: int, owner_id: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Return up to `limit` (contact_id, score) pairs matching every query term, best first.
+
+        With `owner_id`, only that owner's contacts are considered.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        ranges = {term: self._term_range(term) for term in terms}
+        ordered = sorted(terms, key=lambda term: ranges[term][1] - ranges[term][0])
+        candidates = self._union(*ranges[ordered[0]])
+        if owner_id is not None:
+            # Set intersection iterates the smaller side, so this is cheap for small owners and common terms alike
+            candidates = candidates & self._owned.get(owner_id, set())
+            if not candidates:
+                return []
+        filters = []
+        for term in ordered[1:]:
+            low, high = ranges[term]
+            # A prefix spanning far more index terms than there are candidates is cheaper
+            # to check against each candidate's own handful of terms than to expand
+            if high - low <= 10 * len(candidates):
+                candidates = candidates & self._union(low, high)
+            else:
+                filters.append(term)
+            if not candidates:
+                return []
+        if filters:
+            candidates = [
+                contact_id for contact_id in candidates
+                if all(self._matches(term, self._documents[contact_id]) for term in filters)
+            ]
+        # Whole-token hits outrank prefix hits
+        scored = (
+            (contact_id, sum(EXACT_MATCH_WEIGHT if term in self._documents[contact_id] else PREFIX_MATCH_WEIGHT for term in terms))
+            for contact_id in candidates
+        )
+        return heapq.nsmallest(limit, scored, key=lambda item: (-item[1], item[0]))
+
+
+class ContactChangeFollower:
+    """Where this process last read a shard's contact_changes log, to apply other workers' writes to its index.
+
+    Sequence numbers are taken at insert and become visible at commit, so a
+    number below the newest one seen may still show up: such holes are asked
+    for again on each check until they appear or SEARCH_SYNC_SETTLE_SECONDS
+    pass (a rolled-back write leaves a hole forever). With nothing new, a
+    check is one probe past the end of the log's primary key.
+    """
+
+    def __init__(self):
+        self.last_seq: Optional[int] = None
+        self.holes: Dict[int, float] = {}
+        self.sync = SyncCheck("contact search index")
+
+    async def follow(self, index: ContactSearchIndex, db: AsyncSession) -> None:
+        if self.last_seq is None:
+            self.last_seq = await db.scalar(select(func.coalesce(func.max(ContactChanges.seq), 0)))
+            return
+        now = time.monotonic()
+        condition = ContactChanges.seq > self.last_seq
+        if self.holes:
+            condition = condition | ContactChanges.seq.in_(list(self.holes))
+        result = await db.execute(
+            select(ContactChanges.seq, ContactChanges.contact_id).where(condition).order_by(ContactChanges.seq).limit(SEARCH_SYNC_MAX_CHANGES + 1)
+        )
+        changes = result.all()
+        seen = {seq for seq, _ in changes}
+        newest = max(seen, default=self.last_seq)
+        missing = newest - self.last_seq - len(seen.difference(self.holes))
+        if len(changes) > SEARCH_SYNC_MAX_CHANGES or missing > SEARCH_SYNC_MAX_CHANGES:
+            # Too far behind to patch (a bulk import elsewhere): rebuild on the next search and follow from the end
+            index.clear()
+            self.last_seq = await db.scalar(select(func.coalesce(func.max(ContactChanges.seq), 0)))
+            self.holes.clear()
+            return
+        for seq in seen:
+            self.holes.pop(seq, None)
+        for seq in range(self.last_seq + 1, newest):
+            if seq not in seen:
+                self.holes[seq] = now
+        self.holes = {seq: found_at for seq, found_at in self.holes.items() if now - found_at < SEARCH_SYNC_SETTLE_SECONDS}
+        self.last_seq = newest
+        if changes and index.active:
+            await index.refresh({contact_id for _, contact_id in changes}, db)
+
+
+# One index per contact shard, each built from and kept in step with its own database
+contact_search_indexes = [ContactSearchIndex() for _ in range(max(1, len(contact_shards)))]
+contact_change_followers = [ContactChangeFollower() for _ in contact_search_indexes]
+
+def _index_for(db: AsyncSession) -> ContactSearchIndex:
+    return contact_search_indexes[db.info.get("shard", 0)]
+
+
+def use_fulltext(db: AsyncSession) -> bool:
+    if CONTACT_SEARCH_BACKEND == "auto":
+        return db.bind.dialect.name == "mysql"
+    return CONTACT_SEARCH_BACKEND == "fulltext"
+
+def index_contact(contact: Contacts) -> None:
+    index = contact_search_indexes[contact_shards.shard_for(contact.owner_id)]
+    if index.active:
+        index.add(contact.id, contact.owner_id, contact.name, contact.email, contact.phone)
+
+def unindex_contact(contact_id: int, owner_id: int) -> None:
+    index = contact_search_indexes[contact_shards.shard_for(owner_id)]
+    if index.active:
+        index.remove(contact_id)
+
+def index_new_contacts(owner_id: int, rows: Iterable[Tuple[int, str, str, Optional[str]]]) -> None:
+    """Index (id, name, email, phone) rows the owner just created in bulk."""
+    index = contact_search_indexes[contact_shards.shard_for(owner_id)]
+    if index.active:
+        for contact_id, name, email, phone in rows:
+            index.add(contact_id, owner_id, name, email, phone)
+
+def _boolean_mode_query(terms: List[str]) -> str:
+    # Every term is required and may match as a prefix, except those shorter than SEARCH_MIN_PREFIX_LENGTH,
+    # as in the in-process index; operators in user input were stripped by query_terms
+    return " ".join(f"+{term}*" if len(term) >= SEARCH_MIN_PREFIX_LENGTH else f"+{term}" for term in terms)
+
+async def search_contact_ids(query: str, owner_id: int, db: AsyncSession, limit: int, offset: int) -> List[int]:
+    """Ids of the owner's matching contacts ranked by relevance, `limit` rows after `offset`."""
+    if use_fulltext(db):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        result = await db.execute(
+            text(
+                "SELECT id FROM contacts "
+                "WHERE MATCH (name, email, phone_normalized) AGAINST (:query IN BOOLEAN MODE) AND owner_id = :owner_id "
+                "ORDER BY MATCH (name, email, phone_normalized) AGAINST (:query IN BOOLEAN MODE) DESC, id "
+                "LIMIT :limit OFFSET :offset"
+            ),
+            {"query": _boolean_mode_query(terms), "owner_id": owner_id, "limit": limit, "offset": offset},
+        )
+        return list(result.scalars().all())
+    index = _index_for(db)
+    follower = contact_change_followers[db.info.get("shard", 0)]
+    await follower.sync.run(lambda: follower.follow(index, db))
+    await index.ensure_built(db)
+    return [contact_id for contact_id, _ in index.search(query, offset + limit, owner_id)[offset:]]
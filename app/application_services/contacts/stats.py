@@ -0,0 +1,110 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Sequence
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import ContactDailyCounts, ContactFeeds, Contacts
+from app.application_services.contacts.contacts import _fan_out, _lock_contact_feed, get_contact_count
+from app.application_services.contacts.schemas.response import ContactCountsReconcileResponse, ContactStatsResponse, DailyContactCount
+from app.application_services.users.schemas.response import UserCountsResponse
+
+# Days of created-per-day history /contacts/stats returns
+CONTACT_STATS_DAYS = int(os.getenv("CONTACT_STATS_DAYS", "30"))
+# Reconciliation recounts only counters not checked for this long; run it more often than this
+COUNT_MAX_STALENESS_SECONDS = float(os.getenv("COUNT_MAX_STALENESS_SECONDS", "3600"))
+# Owners recounted per transaction; their writes wait for that transaction
+COUNT_RECONCILE_CHUNK_OWNERS = int(os.getenv("COUNT_RECONCILE_CHUNK_OWNERS", "100"))
+
+
+def _since() -> datetime:
+    return (datetime.now(timezone.utc) - timedelta(days=CONTACT_STATS_DAYS - 1)).date()
+
+async def get_contact_stats(owner_id: int, db: AsyncSession) -> ContactStatsResponse:
+    count, counted_at = await get_contact_count(owner_id, db)
+    result = await db.execute(
+        select(ContactDailyCounts.day, ContactDailyCounts.created)
+        .where(ContactDailyCounts.owner_id == owner_id, ContactDailyCounts.day >= _since())
+        .order_by(ContactDailyCounts.day)
+    )
+    return ContactStatsResponse(
+        contacts=count,
+        counted_at=counted_at,
+        created_per_day=[DailyContactCount(day=day, created=created) for day, created in result.all()],
+    )
+
+async def _shard_stats(db: AsyncSession) -> tuple:
+    totals = (await db.execute(select(func.sum(ContactFeeds.contact_count), func.min(ContactFeeds.counted_at)))).one()
+    result = await db.execute(
+        select(ContactDailyCounts.day, func.sum(ContactDailyCounts.created))
+        .where(ContactDailyCounts.day >= _since())
+        .group_by(ContactDailyCounts.day)
+    )
+    return totals, result.all()
+
+async def get_all_contact_stats(session_factories: Sequence[Callable[[], AsyncSession]], users: UserCountsResponse) -> ContactStatsResponse:
+    """Every owner's totals: a sum over one feed row per owner and one day-index range per shard, never the contacts table."""
+    count, counted_at, per_day = 0, None, {}
+    for (shard_count, shard_counted_at), days in await _fan_out(session_factories, _shard_stats):
+        count += shard_count or 0
+        if shard_counted_at is not None:
+            counted_at = shard_counted_at if counted_at is None else min(counted_at, shard_counted_at)
+        for day, created in days:
+            per_day[day] = per_day.get(day, 0) + int(created)
+    return ContactStatsResponse(
+        contacts=count,
+        counted_at=counted_at,
+        created_per_day=[DailyContactCount(day=day, created=created) for day, created in sorted(per_day.items())],
+        users=users,
+    )
+
+async def reconcile_contact_counts(db: AsyncSession, max_age: float = COUNT_MAX_STALENESS_SECONDS) -> ContactCountsReconcileResponse:
+    """Recount the contacts of every owner whose count was not checked within `max_age` seconds.
+
+    Counts only drift through writes that bypass the API (imports straight into
+    the table, manual fixes). Each chunk of owners is locked like a write, so no
+    create or delete lands between the COUNT and the correction.
+    """
+    # Owners whose contacts were written around the API get a feed row to hold their count.
+    # The one full pass over the owner index; everything after works a chunk of owners at a time
+    orphans = await db.scalars(select(Contacts.owner_id).where(~exists().where(ContactFeeds.owner_id == Contacts.owner_id)).distinct())
+    for owner_id in sorted(orphans):
+        await _lock_contact_feed(owner_id, db)
+    await db.commit()
+
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(seconds=max_age)
+    checked = corrected = 0
+    after = -1
+    while True:
+        owner_ids = list(await db.scalars(
+            select(ContactFeeds.owner_id)
+            .where(ContactFeeds.owner_id > after, (ContactFeeds.counted_at == None) | (ContactFeeds.counted_at < stale_before))
+            .order_by(ContactFeeds.owner_id)
+            .limit(COUNT_RECONCILE_CHUNK_OWNERS)
+        ))
+        if not owner_ids:
+            break
+        after = owner_ids[-1]
+        # Start the recount's transaction at the lock: a snapshot taken by the read above could miss
+        # creates and deletes that commit before the lock is granted
+        await db.commit()
+        await db.execute(update(ContactFeeds).where(ContactFeeds.owner_id.in_(owner_ids)).values(counted_at=now))
+        cached: Dict[int, int] = dict((await db.execute(
+            select(ContactFeeds.owner_id, ContactFeeds.contact_count).where(ContactFeeds.owner_id.in_(owner_ids))
+        )).all())
+        actual: Dict[int, int] = dict((await db.execute(
+            select(Contacts.owner_id, func.count()).where(Contacts.owner_id.in_(owner_ids)).group_by(Contacts.owner_id)
+        )).all())
+        corrections = [
+            {"owner_id": owner_id, "contact_count": actual.get(owner_id, 0)}
+            for owner_id in owner_ids if cached.get(owner_id) != actual.get(owner_id, 0)
+        ]
+        if corrections:
+            await db.execute(update(ContactFeeds), corrections)
+        await db.commit()
+        checked += len(owner_ids)
+        corrected += len(corrections)
+    return ContactCountsReconcileResponse(owners_checked=checked, owners_corrected=corrected)
+
+async def reconcile_all_contact_counts(session_factories: Sequence[Callable[[], AsyncSession]], max_age: float = COUNT_MAX_STALENESS_SECONDS) -> List[ContactCountsReconcileResponse]:
+    return await _fan_out(session_factories, lambda db: reconcile_contact_counts(db, max_age))
@@ -1,5 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from datetime import datetime
+from typing import List, Optional
+from typing_extensions import TypedDict
 from app.models import Users
 from app.utils.auth import UserRole
 
@@ -39,6 +41,37 @@ class UserAuthenticateResponse(BaseModel):
             role=user.role
         )
 
+class UserPageResponse(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
+
+# Read fast path, see ContactRow
+class UserRow(TypedDict):
+    id: int
+    username: str
+    email: str
+    role: str
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+class UserPageRows(TypedDict):
+    items: List[UserRow]
+    next_cursor: Optional[str]
+
+USER_ROWS_ADAPTER = TypeAdapter(List[UserRow])
+USER_PAGE_ADAPTER = TypeAdapter(UserPageRows)
+
+class UserCountsResponse(BaseModel):
+    active: int
+    inactive: int
+    # When a reconciliation last recounted them; the counters move with every write in between
+    counted_at: Optional[datetime] = None
+
+class UserCountsReconcileResponse(BaseModel):
+    checked: bool
+    corrected: bool
+
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str
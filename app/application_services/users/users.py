@@ -1,18 +1,74 @@
-from app.models import Users, DB_session
-from sqlalchemy.orm import Session
+from app.models import CacheGenerations, CacheInvalidations, StatCounters, Users, DB_async_reader_session
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.application_services.users.schemas.request import UserRequest, UserRole, UserAuthenticateRequest
-from app.application_services.users.schemas.response import UserResponse
-from app.exceptions.exceptions import NotFoundException, UnauthorizedException
-from typing import List
-from datetime import datetime, timezone
-from app.utils.auth import verify_password, get_password_hash, create_access_token, verify_token
+from app.application_services.users.schemas.response import UserCountsReconcileResponse, UserCountsResponse, UserResponse, UserPageRows, UserRow
+from app.exceptions.exceptions import NotFoundException, TooManyRequestsException, UnauthorizedException
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+import logging
+import math
+import os
+from app.utils.auth import PASSWORD_HASH_WORKERS, verify_password_async, get_password_hash_async, password_hash_needs_update, create_access_token, verify_token
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.utils.admission import AdmissionLimiter, TokenBuckets
+from app.utils.cache import SyncCheck, TTLCache
+from app.utils.fieldsets import Fields, project, select_columns
+from app.utils.normalize import email_key
+from app.utils.pagination import DEFAULT_PAGE_SIZE, clamp_page_size, keyset_select, keyset_page
+
+logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
 
-def create_user(user: UserRequest, db: Session) -> UserResponse:
-    existing_user = _get_user(user.username, user.email, db)
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "10000"))
+# Principal invalidations kept for workers to catch up on; one further behind empties its whole cache
+PRINCIPAL_INVALIDATIONS_KEPT = int(os.getenv("PRINCIPAL_INVALIDATIONS_KEPT", "1000"))
+# Trust the id/email/role signed into the token instead of looking the user up.
+# Role changes and deletions then only take effect once the token expires.
+AUTH_CLAIMS_ONLY = os.getenv("AUTH_CLAIMS_ONLY", "false").lower() in ("1", "true", "yes")
+
+# Logins verifying a password at once, and how many more may wait (and for how long) before
+# the rest are refused with 503; the default keeps every password worker busy without a backlog
+LOGIN_MAX_CONCURRENCY = int(os.getenv("LOGIN_MAX_CONCURRENCY", str(PASSWORD_HASH_WORKERS * 2)))
+LOGIN_QUEUE_SIZE = int(os.getenv("LOGIN_QUEUE_SIZE", str(PASSWORD_HASH_WORKERS * 4)))
+LOGIN_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LOGIN_QUEUE_TIMEOUT_SECONDS", "1"))
+# Login attempts per second (and burst) per client address before 429; off by default, since behind a
+# proxy the address is the proxy's unless FORWARDED_ALLOW_IPS names it (see app/context/server.py)
+LOGIN_IP_RATE = float(os.getenv("LOGIN_IP_RATE", "0"))
+LOGIN_IP_BURST = float(os.getenv("LOGIN_IP_BURST", "20"))
+# Failed logins per second (and burst) per email and client address before that address gets 429 for that
+# email; only failures are charged and a success clears the bucket, so nobody else's guesses lock a user out
+LOGIN_FAILURE_RATE = float(os.getenv("LOGIN_FAILURE_RATE", "0.1"))
+LOGIN_FAILURE_BURST = float(os.getenv("LOGIN_FAILURE_BURST", "5"))
+# Buckets kept per kind, least recently used evicted first
+LOGIN_RATE_LIMIT_KEYS = int(os.getenv("LOGIN_RATE_LIMIT_KEYS", "100000"))
+
+# Authenticated principals keyed by user id
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_MAX_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+# Other workers' user updates and deletes bump the "principals" generation; seeing it move evicts the users they changed
+principal_sync = SyncCheck("principal cache")
+_principal_generation: Optional[int] = None
+
+login_admission = AdmissionLimiter(LOGIN_MAX_CONCURRENCY, LOGIN_QUEUE_SIZE, LOGIN_QUEUE_TIMEOUT_SECONDS)
+login_address_buckets = TokenBuckets(LOGIN_IP_RATE, LOGIN_IP_BURST, LOGIN_RATE_LIMIT_KEYS)
+login_failure_buckets = TokenBuckets(LOGIN_FAILURE_RATE, LOGIN_FAILURE_BURST, LOGIN_RATE_LIMIT_KEYS)
+
+# Columns selected by the read fast path; the password hash is never read for listings
+USER_COLUMNS = (Users.id, Users.username, Users.email, Users.role, Users.is_active, Users.created_at, Users.updated_at)
+
+# cache_generations row of the principal cache
+PRINCIPALS = "principals"
+# stat_counters rows kept in step with users.is_active
+USERS_ACTIVE = "users_active"
+USERS_INACTIVE = "users_inactive"
+
+USER_SORT_COLUMNS = {"id": Users.id, "username": Users.username, "created_at": Users.created_at}
+
+async def create_user(user: UserRequest, db: AsyncSession) -> UserResponse:
+    existing_user = await _get_user(user.username, user.email, db)
     if existing_user:
         raise NotFoundException("User already exists")
     
@@ -22,28 +78,64 @@ def create_user(user: UserRequest, db: Session) -> UserResponse:
         user_data['role'] = user_data['role'].value
     
     db_user = Users(**user_data)
-    db_user.password = get_password_hash(user.password)
+    db_user.password = await get_password_hash_async(user.password)
     db_user.created_at = datetime.now(timezone.utc)
     db_user.updated_at = datetime.now(timezone.utc)
     db.add(db_user)
-    db.commit()
+    await _count_user(USERS_ACTIVE, 1, db)
+    await db.commit()
     return UserResponse.from_domain(db_user)
 
-def get_user(user_id: int, db: Session) -> UserResponse:
-    db_user = _get_user_by_id(user_id, db)
-    return UserResponse.from_domain(db_user)
+async def _bump_principal_generation(db: AsyncSession, user_id: Optional[int] = None) -> None:
+    """Tell every worker `user_id`'s principal is stale; None for a change that affects every user."""
+    await db.execute(update(CacheGenerations).where(CacheGenerations.name == PRINCIPALS).values(generation=CacheGenerations.generation + 1))
+    # The update holds the row until commit, so generations commit in order and this one is ours
+    generation = await db.scalar(select(CacheGenerations.generation).where(CacheGenerations.name == PRINCIPALS))
+    await db.execute(insert(CacheInvalidations).values(name=PRINCIPALS, generation=generation, entry_key=user_id))
+    await db.execute(delete(CacheInvalidations).where(CacheInvalidations.name == PRINCIPALS, CacheInvalidations.generation <= generation - PRINCIPAL_INVALIDATIONS_KEPT))
 
-def get_all_users(db: Session) -> List[UserResponse]:
-    users = db.query(Users).filter(Users.is_active == True).all()
-    if not users:
-        raise NotFoundException("No users found")
-    return [UserResponse.from_domain(user) for user in users]
+async def _sync_principal_cache(db: AsyncSession) -> None:
+    global _principal_generation
+    generation = await db.scalar(select(CacheGenerations.generation).where(CacheGenerations.name == PRINCIPALS))
+    if _principal_generation is not None and generation != _principal_generation:
+        stale = (await db.scalars(select(CacheInvalidations.entry_key).where(
+            CacheInvalidations.name == PRINCIPALS,
+            CacheInvalidations.generation > _principal_generation,
+            CacheInvalidations.generation <= generation,
+        ))).all()
+        if len(stale) != generation - _principal_generation or None in stale:
+            # Behind the kept invalidations, or a change to every user
+            principal_cache.clear()
+        else:
+            for user_id in stale:
+                principal_cache.invalidate(user_id)
+    _principal_generation = generation
 
-def update_user(user_id: int, user: UserRequest, db: Session) -> UserResponse:
-    db_user = _get_user_by_id(user_id, db)
+async def get_user(user_id: int, db: AsyncSession) -> UserResponse:
+    await principal_sync.run(lambda: _sync_principal_cache(db))
+    cached_user = principal_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
+    db_user = await _get_user_by_id(user_id, db)
+    user = UserResponse.from_domain(db_user)
+    principal_cache.set(user_id, user)
+    return user
+
+async def get_all_users(db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None, sort: str = "id", fields: Fields = None) -> UserPageRows:
+    limit = clamp_page_size(limit)
+    columns = select_columns(USER_COLUMNS, fields, "id", sort)
+    stmt = keyset_select(select(*columns).where(Users.is_active == True), USER_SORT_COLUMNS[sort], Users.id, sort, limit, cursor)
+    result = await db.execute(stmt)
+    rows, next_cursor = keyset_page(result.all(), limit, sort)
+    return {"items": [project(row, fields) for row in rows], "next_cursor": next_cursor}
+
+async def update_user(user_id: int, user: UserRequest, db: AsyncSession) -> UserResponse:
+    db_user = await _get_user_by_id(user_id, db)
     db_user.username = user.username
     db_user.email = user.email
-    db_user.password = get_password_hash(user.password)
+    # Keep the stored hash when the password did not change
+    if password_hash_needs_update(db_user.password) or not await verify_password_async(user.password, db_user.password):
+        db_user.password = await get_password_hash_async(user.password)
     
     # Convert role enum to string for database storage
     if isinstance(user.role, UserRole):
@@ -52,56 +144,139 @@ def update_user(user_id: int, user: UserRequest, db: Session) -> UserResponse:
         db_user.role = user.role
     
     db_user.updated_at = datetime.now(timezone.utc)
-    db.commit()
+    await _bump_principal_generation(db, user_id)
+    await db.commit()
+    principal_cache.invalidate(user_id)
     return UserResponse.from_domain(db_user)
 
-def delete_user(user_id: int, db: Session) -> None:
-    db_user = _get_user_by_id(user_id, db)
-    db.delete(db_user)
-    db.commit()
+async def delete_user(user_id: int, db: AsyncSession) -> None:
+    # Deactivated users can be deleted too, and come off the inactive counter
+    db_user = await _get_user_by_id(user_id, db, active_only=False)
+    await db.delete(db_user)
+    await _count_user(USERS_ACTIVE if db_user.is_active else USERS_INACTIVE, -1, db)
+    await _bump_principal_generation(db, user_id)
+    await db.commit()
+    principal_cache.invalidate(user_id)
     return None
 
-def search_users(query: str, db: Session) -> List[UserResponse]:
-    users = db.query(Users).filter(Users.username.ilike(f"%{query}%"), Users.is_active == True).all()
+async def _count_user(counter: str, delta: int, db: AsyncSession) -> None:
+    # In the caller's transaction, so the counter commits (or rolls back) with the row it counts
+    await db.execute(update(StatCounters).where(StatCounters.name == counter).values(value=StatCounters.value + delta))
+
+async def get_user_counts(db: AsyncSession) -> UserCountsResponse:
+    """Active and inactive users from their counters: two primary-key probes instead of a COUNT over users."""
+    result = await db.execute(select(StatCounters.name, StatCounters.value, StatCounters.counted_at).where(StatCounters.name.in_((USERS_ACTIVE, USERS_INACTIVE))))
+    counters = {row.name: row for row in result.all()}
+    if len(counters) < 2:
+        # Counters not created yet (a database migrated around 0007): count instead
+        by_state = dict((await db.execute(select(Users.is_active, func.count()).group_by(Users.is_active))).all())
+        return UserCountsResponse(active=by_state.get(True, 0), inactive=by_state.get(False, 0))
+    counted_at = min((row.counted_at for row in counters.values() if row.counted_at is not None), default=None)
+    return UserCountsResponse(active=counters[USERS_ACTIVE].value, inactive=counters[USERS_INACTIVE].value, counted_at=counted_at)
+
+async def reconcile_user_counts(db: AsyncSession, max_age: float) -> UserCountsReconcileResponse:
+    """Recount active and inactive users if their counters were not checked within `max_age` seconds."""
+    now = datetime.now(timezone.utc)
+    counted_at = await db.scalar(select(func.min(StatCounters.counted_at)).where(StatCounters.name.in_((USERS_ACTIVE, USERS_INACTIVE))))
+    if counted_at is not None and counted_at.replace(tzinfo=timezone.utc) >= now - timedelta(seconds=max_age):
+        return UserCountsReconcileResponse(checked=False, corrected=False)
+    # A fresh transaction that starts at the lock, as in the contact recount
+    await db.commit()
+    locked = await db.execute(update(StatCounters).where(StatCounters.name.in_((USERS_ACTIVE, USERS_INACTIVE))).values(counted_at=now))
+    if locked.rowcount < 2:
+        existing = set(await db.scalars(select(StatCounters.name).where(StatCounters.name.in_((USERS_ACTIVE, USERS_INACTIVE)))))
+        await db.execute(insert(StatCounters), [
+            {"name": name, "value": 0, "counted_at": now} for name in (USERS_ACTIVE, USERS_INACTIVE) if name not in existing
+        ])
+    cached = dict((await db.execute(select(StatCounters.name, StatCounters.value).where(StatCounters.name.in_((USERS_ACTIVE, USERS_INACTIVE))))).all())
+    by_state = dict((await db.execute(select(Users.is_active, func.count()).group_by(Users.is_active))).all())
+    actual = {USERS_ACTIVE: by_state.get(True, 0), USERS_INACTIVE: by_state.get(False, 0)}
+    corrected = cached != actual
+    if corrected:
+        await db.execute(update(StatCounters), [{"name": name, "value": value} for name, value in actual.items()])
+    await db.commit()
+    return UserCountsReconcileResponse(checked=True, corrected=corrected)
+
+def get_principal_cache_stats() -> dict:
+    return {**principal_cache.stats(), "claims_only": AUTH_CLAIMS_ONLY, "sync_checks": principal_sync.checks, "generation": _principal_generation}
+
+def get_login_admission_stats() -> dict:
+    return {
+        "admission": login_admission.stats(),
+        "address_buckets": login_address_buckets.stats(),
+        "failure_buckets": login_failure_buckets.stats(),
+    }
+
+async def search_users(query: str, db: AsyncSession, fields: Fields = None) -> List[UserRow]:
+    result = await db.execute(select(*select_columns(USER_COLUMNS, fields)).where(Users.username.ilike(f"%{query}%"), Users.is_active == True))
+    users = result.all()
     if not users:
         raise NotFoundException("No users found")
-    return [UserResponse.from_domain(user) for user in users]
+    return [project(user, fields) for user in users]
 
-def authenticate_user(user: UserAuthenticateRequest, db: Session) -> dict:
-    db_user = _get_user_by_email(user.email, db)
-    if not db_user:
-        raise UnauthorizedException("Incorrect email or password")
-    if not verify_password(user.password, db_user.password):
-        raise UnauthorizedException("Incorrect email or password")
+def _check_login_rate(failure_key: tuple, client_address: str) -> None:
+    # A failure token is reserved up front, not charged after the verify: concurrent guesses
+    # would all pass a check made before any of them failed
+    failure_wait = login_failure_buckets.take(failure_key)
+    wait = max(login_address_buckets.take(client_address), failure_wait)
+    if wait:
+        if not failure_wait:
+            login_failure_buckets.refund(failure_key)
+        raise TooManyRequestsException("Too many login attempts, try again later", retry_after=math.ceil(wait))
+
+async def authenticate_user(user: UserAuthenticateRequest, db: AsyncSession, client_address: str = "") -> dict:
+    # Rate limits first: a refused attempt costs neither a query nor a bcrypt verification
+    failure_key = (email_key(user.email), client_address)
+    _check_login_rate(failure_key, client_address)
+    try:
+        async with login_admission.admit():
+            db_user = await _get_user_by_email(user.email, db)
+            # Give the connection back before the slow part, so queued logins do not hold the pool
+            await db.commit()
+            if not db_user or not await verify_password_async(user.password, db_user.password):
+                raise UnauthorizedException("Incorrect email or password")
+    except UnauthorizedException:
+        raise
+    except BaseException:
+        # Turned away or failed before the password was checked: not a failed login
+        login_failure_buckets.refund(failure_key)
+        raise
+    login_failure_buckets.discard(failure_key)
     if not db_user.is_active:
         raise UnauthorizedException("User is not active")
     
-    access_token = create_access_token(data={"sub": str(db_user.id), "email": db_user.email, "role": db_user.role})
+    access_token = create_access_token(data={"sub": str(db_user.id), "username": db_user.username, "email": db_user.email, "role": db_user.role})
     return {
         "access_token": access_token,
         "token_type": "bearer",
         "user": UserResponse.from_domain(db_user)
     }
 
-def _get_user_by_id(user_id: int, db: Session) -> Users:
-    db_user = db.query(Users).filter(Users.id == user_id, Users.is_active == True).first()
+async def _get_user_by_id(user_id: int, db: AsyncSession, active_only: bool = True) -> Users:
+    stmt = select(Users).where(Users.id == user_id)
+    if active_only:
+        stmt = stmt.where(Users.is_active == True)
+    result = await db.execute(stmt)
+    db_user = result.scalars().first()
     if not db_user:
         raise NotFoundException("User not found")
     return db_user
 
-def _get_user_by_email(email: str, db: Session) -> Users:
-    db_user = db.query(Users).filter(Users.email == email).first()
+async def _get_user_by_email(email: str, db: AsyncSession) -> Users:
+    result = await db.execute(select(Users).where(Users.email == email))
+    db_user = result.scalars().first()
     if not db_user:
         return None
     return db_user
 
-def _get_user(username: str, email: str, db: Session) -> Users:
-    db_user = db.query(Users).filter((Users.username == username) | (Users.email == email)).first()
+async def _get_user(username: str, email: str, db: AsyncSession) -> Users:
+    result = await db.execute(select(Users).where((Users.username == username) | (Users.email == email)))
+    db_user = result.scalars().first()
     if not db_user:
         return None
     return db_user
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(DB_session)) -> UserResponse:
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(DB_async_reader_session)) -> UserResponse:
     try:
         payload = verify_token(credentials.credentials)
         user_id = payload.get("sub")
@@ -114,20 +289,36 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         except (ValueError, TypeError):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token: invalid user ID")
         
-        user = _get_user_by_id(user_id, db)
-        return UserResponse.from_domain(user)
+        if AUTH_CLAIMS_ONLY:
+            return _get_principal_from_claims(user_id, payload)
+        try:
+            return await get_user(user_id, db)
+        finally:
+            # Hand the connection back before the route takes its own: held through the request, a burst of
+            # cache misses (a cold start, a generation change) could check out every connection and wait forever
+            await db.close()
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Token validation error: {str(e)}")  # Debug logging
+        logger.debug("Token validation error: %s", e)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
 
+def _get_principal_from_claims(user_id: int, payload: dict) -> UserResponse:
+    # Only id, username, email, role and is_active are known; timestamps are left unset
+    return UserResponse.model_construct(
+        id=user_id,
+        username=payload.get("username"),
+        email=payload.get("email"),
+        role=UserRole(payload.get("role")),
+        is_active=True,
+    )
+
 async def get_current_active_user(current_user: UserResponse = Depends(get_current_user)) -> UserResponse:
     if not current_user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
     return current_user
 
 async def get_admin_user(current_user: UserResponse = Depends(get_current_active_user)) -> UserResponse:
-    if current_user.role != "admin":
+    if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
-    return current_user
\ No newline at end of file
+    return current_user
@@ -0,0 +1,64 @@
+"""Serve the API: one uvicorn process, or a gunicorn master forking uvicorn workers.
+
+    python -m app.context.server
+
+The master imports the app before forking, so workers start warm and share
+its read-only pages and the read-your-writes table. Signals go to the master:
+HUP replaces every worker gracefully (code changes need a full restart, since
+workers are forked from the preloaded app), TERM drains in-flight requests for
+up to GRACEFUL_TIMEOUT_SECONDS, TTIN/TTOU add or remove a worker.
+
+Behind a proxy or load balancer, set FORWARDED_ALLOW_IPS (read by uvicorn and
+gunicorn alike) to its addresses so request.client is the address from
+X-Forwarded-For; the login rate limits are keyed on it.
+"""
+import os
+
+# Processes serving requests; each runs its own event loop and database pools
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# The app reads it at import to split the password hashing pool between workers, so set it before importing
+os.environ.setdefault("WEB_CONCURRENCY", str(WEB_CONCURRENCY))
+BIND = os.getenv("BIND", "0.0.0.0:8000")
+# How long a stopping worker may keep serving the requests it accepted
+GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("GRACEFUL_TIMEOUT_SECONDS", "30"))
+# Restart each worker after this many requests (plus up to 10% jitter, so they do not restart together); 0 never
+WORKER_MAX_REQUESTS = int(os.getenv("WORKER_MAX_REQUESTS", "0"))
+
+from app.context.main import LOG_LEVEL, app
+import uvicorn
+
+
+def _gunicorn_application():
+    # Unix only, so imported when several workers are asked for
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for name, value in {
+                "bind": BIND,
+                "workers": WEB_CONCURRENCY,
+                "worker_class": "uvicorn_worker.UvicornWorker",
+                "preload_app": True,
+                "graceful_timeout": GRACEFUL_TIMEOUT_SECONDS,
+                "max_requests": WORKER_MAX_REQUESTS,
+                "max_requests_jitter": WORKER_MAX_REQUESTS // 10,
+                "loglevel": LOG_LEVEL.lower(),
+            }.items():
+                self.cfg.set(name, value)
+
+        def load(self):
+            return app
+
+    return Server()
+
+
+def run() -> None:
+    if WEB_CONCURRENCY <= 1:
+        host, _, port = BIND.rpartition(":")
+        uvicorn.run(app, host=host, port=int(port), timeout_graceful_shutdown=GRACEFUL_TIMEOUT_SECONDS)
+        return
+    _gunicorn_application().run()
+
+
+if __name__ == "__main__":
+    run()
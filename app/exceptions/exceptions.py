@@ -7,4 +7,26 @@ class NotFoundException(Exception):
 class UnauthorizedException(Exception):
     def __init__(self, message: str = "unauthorized"):
         super().__init__(message)
-        self.message = message
\ No newline at end of file
+        self.message = message
+
+class ServiceUnavailableException(Exception):
+    def __init__(self, message: str = "service unavailable", retry_after: int = 1):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = retry_after
+
+class TooManyRequestsException(Exception):
+    def __init__(self, message: str = "too many requests", retry_after: int = 1):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = retry_after
+
+class PreconditionFailedException(Exception):
+    def __init__(self, message: str = "precondition failed"):
+        super().__init__(message)
+        self.message = message
+
+class GoneException(Exception):
+    def __init__(self, message: str = "gone"):
+        super().__init__(message)
+        self.message = message
@@ -1,12 +1,21 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Date, DateTime, Boolean, Index, select, update
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, Engine, make_url, text, event
+from sqlalchemy.dialects.mysql import DATETIME
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from dotenv import load_dotenv
-from typing import Generator
+from typing import Callable, AsyncGenerator, List, Optional
+from fastapi import Request
 from datetime import datetime, timezone
 from app.utils.auth import UserRole
+from app.utils.pool import InstrumentedQueuePool, InstrumentedAsyncQueuePool, pool_status
+from app.utils.metrics import Counter, Gauge, instrument_engine, registry
+from app.utils.cache import SharedExpirySet
+from app.utils.replicas import ReplicaSet
+from app.utils.shards import IdBlockAllocator, ShardSet
+from app.utils.normalize import email_key, phone_key
 
 load_dotenv()
 
@@ -17,23 +26,227 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "Intruder9")
 DB_NAME = os.getenv("DB_NAME", "contactnest")
 
 
-SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# DATABASE_URL / ASYNC_DATABASE_URL override the MySQL settings above, e.g.
+# sqlite:///./contactnest.db and sqlite+aiosqlite:///./contactnest.db for local runs
+SQLALCHEMY_DATABASE_URL = os.getenv(
+    "DATABASE_URL", f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8mb4"
+)
+ASYNC_SQLALCHEMY_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL", f"mysql+aiomysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8mb4"
+)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"charset": "utf8mb4"})
+# Read replicas for GET traffic: comma-separated async URLs. Without any, every session uses the primary.
+ASYNC_DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("ASYNC_DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# round_robin, or lag: the least lagged replica within DB_REPLICA_MAX_LAG_SECONDS
+DB_REPLICA_STRATEGY = os.getenv("DB_REPLICA_STRATEGY", "round_robin")
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+DB_REPLICA_LAG_CHECK_SECONDS = float(os.getenv("DB_REPLICA_LAG_CHECK_SECONDS", "2"))
+# After a write, the same client reads from the primary for this long
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+# Slots in the table of pinned clients; past that, clients share slots and some read the primary needlessly
+READ_YOUR_WRITES_MAX_CLIENTS = int(os.getenv("READ_YOUR_WRITES_MAX_CLIENTS", "100000"))
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sharded contact storage: comma-separated async URLs, each owner's contacts on one of them.
+# Without any, contacts live in the main database next to users.
+CONTACT_SHARD_URLS = [url.strip() for url in os.getenv("CONTACT_SHARD_URLS", "").split(",") if url.strip()]
+# Sharded contact ids are reserved from the main database this many at a time
+CONTACT_ID_BLOCK_SIZE = int(os.getenv("CONTACT_ID_BLOCK_SIZE", "100"))
+
+# Pool settings apply to every engine; the API only uses the async ones
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Kept below MySQL's wait_timeout so the server never drops a connection the pool still holds
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Engines are created on first use, so importing this module never touches the database;
+# the app lifespan disposes of them on shutdown. The schema is managed by Alembic (migrations/).
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+
+# expire_on_commit=False so committed objects can still be read without an implicit (blocking) refresh
+_async_session_factory = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+def _pool_options(url: str, poolclass) -> dict:
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # In-memory SQLite lives in a single connection; keep SQLAlchemy's default pool for it
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        _engine = create_engine(SQLALCHEMY_DATABASE_URL, **_pool_options(SQLALCHEMY_DATABASE_URL, InstrumentedQueuePool))
+        instrument_engine(_engine)
+    return _engine
+
+def _create_async_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(url, **_pool_options(url, InstrumentedAsyncQueuePool))
+    instrument_engine(engine.sync_engine)
+    return engine
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = _create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+    return _async_engine
+
+replica_set = ReplicaSet(
+    ASYNC_DATABASE_REPLICA_URLS, DB_REPLICA_STRATEGY, DB_REPLICA_MAX_LAG_SECONDS, DB_REPLICA_LAG_CHECK_SECONDS, _create_async_engine
+)
+
+contact_shards = ShardSet(CONTACT_SHARD_URLS, _create_async_engine)
+
+async def _reserve_contact_ids(count: int) -> int:
+    async with get_async_engine().begin() as connection:
+        # The UPDATE holds the row lock until commit, so no other process reserves the same range
+        await connection.execute(
+            update(IdBlocks).where(IdBlocks.name == "contacts").values(next_value=IdBlocks.next_value + count)
+        )
+        next_value = await connection.scalar(select(IdBlocks.next_value).where(IdBlocks.name == "contacts"))
+    return next_value - count
+
+contact_ids = IdBlockAllocator(CONTACT_ID_BLOCK_SIZE, _reserve_contact_ids)
+
+async def allocate_contact_ids(count: int) -> Optional[List[int]]:
+    """Ids for `count` new contacts in sharded mode; None when the database assigns them."""
+    if not contact_shards:
+        return None
+    return await contact_ids.allocate(count)
+
+# Clients (bearer token, or address when anonymous) that committed a write within READ_YOUR_WRITES_SECONDS.
+# Created at import, so workers forked from a preloading master share it: a write pins the client in every worker
+recent_writers = SharedExpirySet(slots=READ_YOUR_WRITES_MAX_CLIENTS, ttl=READ_YOUR_WRITES_SECONDS)
+
+async def dispose_engines() -> None:
+    global _engine, _async_engine
+    await replica_set.dispose()
+    await contact_shards.dispose()
+    contact_ids.reset()
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
+
+def get_pool_status() -> dict:
+    """Live statistics of the async engine pool, the one requests check connections out of."""
+    return pool_status(get_async_engine().pool)
+
+def _pool_values(*keys: str, labeled: bool = True):
+    def collect():
+        # Scraping never creates the engine; there is nothing to report before the first request
+        if _async_engine is None:
+            return []
+        status = pool_status(_async_engine.pool)
+        return [((key,) if labeled else (), status[key]) for key in keys if status.get(key) is not None]
+    return collect
+
+registry.register(Gauge(
+    "contactnest_db_pool_connections", "Async engine pool connections by state.", ("state",),
+    collect=_pool_values("size", "capacity", "checked_in", "checked_out", "overflow", "waiting")))
+registry.register(Counter(
+    "contactnest_db_pool_waits_total", "Pool checkouts that found every connection in use.",
+    collect=_pool_values("waits", labeled=False)))
+registry.register(Counter(
+    "contactnest_db_pool_timeouts_total", "Pool checkouts that gave up waiting.",
+    collect=_pool_values("timeouts", labeled=False)))
+registry.register(Counter(
+    "contactnest_db_pool_wait_seconds_total", "Time spent waiting for a pool connection.",
+    collect=_pool_values("wait_seconds_total", labeled=False)))
+
+async def ping_database() -> None:
+    async with get_async_engine().connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+def AsyncSessionLocal() -> AsyncSession:
+    return _async_session_factory(bind=get_async_engine())
 
 Base = declarative_base()
 
-def DB_session() -> Generator[Session, None, None]:
-    db: Session = SessionLocal()
-    try:
+# MySQL DATETIME drops fractional seconds by default; ETags are derived from updated_at, so keep microseconds
+PreciseDateTime = DateTime().with_variant(DATETIME(fsp=6), "mysql")
+
+@event.listens_for(Session, "after_commit")
+def _mark_committed(session: Session) -> None:
+    session.info["committed"] = True
+
+def _client_key(request: Request) -> str:
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return authorization
+    return f"address:{request.client.host if request.client else ''}"
+
+def _reader_engine(request: Request) -> AsyncEngine:
+    if not replica_set or (READ_YOUR_WRITES_SECONDS > 0 and _client_key(request) in recent_writers):
+        return get_async_engine()
+    # Every reader session of one request (principal lookup, contacts) reads the same replica
+    engine = getattr(request.state, "reader_engine", None)
+    if engine is None:
+        engine = request.state.reader_engine = replica_set.choose() or get_async_engine()
+    return engine
+
+def ReaderSessionLocal(request: Request) -> AsyncSession:
+    """Session on a read replica, or on the primary while the client is inside its read-your-writes window."""
+    return _async_session_factory(bind=_reader_engine(request))
+
+def pin_recent_writer(request: Request, db: AsyncSession) -> None:
+    """Send the client's reads to the primary for a while if `db` committed."""
+    if replica_set and READ_YOUR_WRITES_SECONDS > 0 and db.info.get("committed"):
+        recent_writers.add(_client_key(request))
+
+async def DB_async_writer_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        finally:
+            pin_recent_writer(request, db)
+
+async def DB_async_reader_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with ReaderSessionLocal(request) as db:
         yield db
-    finally:
-        db.close()
+
+def _shard_session(shard: int) -> AsyncSession:
+    # info["shard"] tells shard-local state (the search index) which shard a session reads
+    return _async_session_factory(bind=contact_shards.engine(shard), info={"shard": shard})
+
+def ContactSessionLocal(owner_id: int) -> AsyncSession:
+    """Writer session for the owner's contacts: their shard, or the primary when unsharded."""
+    if not contact_shards:
+        return AsyncSessionLocal()
+    return _shard_session(contact_shards.shard_for(owner_id))
+
+def ContactReaderSessionLocal(request: Request, owner_id: int) -> AsyncSession:
+    """Reader session for the owner's contacts; shards have no replicas, so sharded reads use the shard."""
+    if not contact_shards:
+        return ReaderSessionLocal(request)
+    return _shard_session(contact_shards.shard_for(owner_id))
+
+def contact_shard_session_factories(request: Optional[Request] = None) -> List[Callable[[], AsyncSession]]:
+    """One session factory per contact shard, for work across every owner; reader sessions when given the request."""
+    if not contact_shards:
+        return [lambda: ReaderSessionLocal(request)] if request is not None else [AsyncSessionLocal]
+    return [lambda shard=shard: _shard_session(shard) for shard in range(len(contact_shards))]
 
 class Users(Base):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Keyset pagination over active users, see app/utils/pagination.py
+        Index("ix_users_active_id", "is_active", "id"),
+        Index("ix_users_active_username_id", "is_active", "username", "id"),
+        Index("ix_users_active_created_at_id", "is_active", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     username = Column(String(50), unique=True, nullable=False)
@@ -41,19 +254,171 @@ class Users(Base):
     password = Column(String(255), nullable=False)
     role = Column(String(50), nullable=False, default="user")
     is_active = Column(Boolean, nullable=False, default=True)
-    created_at = Column(DateTime, nullable=False, default=datetime.now(timezone.utc))
-    updated_at = Column(DateTime, nullable=False, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
+    created_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     def __repr__(self):
         return f"<Users(id={self.id}, username={self.username}, email={self.email})>"
     
+class IdBlocks(Base):
+    """Shared id counters for rows that are spread over several databases (hi/lo, see app/utils/shards.py)."""
+    __tablename__ = 'id_blocks'
+
+    name = Column(String(50), primary_key=True)
+    next_value = Column(BigInteger, nullable=False)
+
+
+def _normalized_email(context) -> str:
+    return email_key(context.get_current_parameters()["email"])
+
+def _normalized_phone(context) -> Optional[str]:
+    return phone_key(context.get_current_parameters().get("phone"))
+
+
 class Contacts(Base):
     __tablename__ = 'contacts'
+    __table_args__ = (
+        # Every owner-scoped query leads with owner_id: keyset pagination sort orders
+        # (see app/utils/pagination.py), phone/email lookups and MAX(updated_at) for the collection ETag
+        Index("ix_contacts_owner_id_id", "owner_id", "id"),
+        Index("ix_contacts_owner_name_id", "owner_id", "name", "id"),
+        Index("ix_contacts_owner_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_contacts_owner_email_normalized", "owner_id", "email_normalized"),
+        Index("ix_contacts_owner_phone_normalized", "owner_id", "phone_normalized"),
+        Index("ix_contacts_owner_updated_at", "owner_id", "updated_at"),
+        # The same orders across every owner, for the admin listing
+        Index("ix_contacts_name_id", "name", "id"),
+        Index("ix_contacts_created_at_id", "created_at", "id"),
+        Index("ix_contacts_updated_at", "updated_at"),
+        # Contact search on MySQL; other databases use the in-process index in contacts/search.py
+        # Phones are indexed by their digits, which the ngram parser matches anywhere in the number
+        Index("ix_contacts_search", "name", "email", "phone_normalized", mysql_prefix="FULLTEXT", mysql_with_parser="ngram").ddl_if(dialect="mysql"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
+    # No foreign key: with CONTACT_SHARD_URLS set, contacts and users live in different databases
+    owner_id = Column(Integer, nullable=False)
     name = Column(String(100), nullable=False)
     email = Column(String(255), nullable=False)
     phone = Column(String(20), nullable=True)
-    created_at = Column(DateTime, nullable=False, default=datetime.now(timezone.utc))
-    updated_at = Column(DateTime, nullable=False, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
+    # Lookup forms of email and phone (app/utils/normalize.py). Every INSERT fills them in,
+    # ORM or Core; updates that change email or phone must set them too (update_contact_details,
+    # the batch update, merge_duplicates adopting a phone)
+    email_normalized = Column(String(255), nullable=False, default=_normalized_email)
+    phone_normalized = Column(String(20), nullable=True, default=_normalized_phone)
+    created_at = Column(PreciseDateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(PreciseDateTime, nullable=False, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+
+class ContactMatchKeys(Base):
+    """Normalized duplicate-detection keys per contact, refreshed by the incremental scan in contacts/duplicates.py."""
+    __tablename__ = 'contact_match_keys'
+    __table_args__ = (
+        # Duplicate buckets are GROUP BY (owner_id, key) HAVING COUNT(*) > 1 over these
+        Index("ix_contact_match_keys_owner_email", "owner_id", "email_key"),
+        Index("ix_contact_match_keys_owner_phone", "owner_id", "phone_key"),
+        Index("ix_contact_match_keys_owner_name", "owner_id", "name_key"),
+    )
+
+    contact_id = Column(Integer, primary_key=True, autoincrement=False)
+    owner_id = Column(Integer, nullable=False)
+    email_key = Column(String(255), nullable=False)
+    phone_key = Column(String(20), nullable=True)
+    name_key = Column(String(20), nullable=False)
+
+class ContactNearMatches(Base):
+    """Pairs of one owner's contacts whose names are near matches, each stored once as (lower id, higher id)."""
+    __tablename__ = 'contact_near_matches'
+    __table_args__ = (
+        Index("ix_contact_near_matches_owner_id", "owner_id"),
+        # Pairs are dropped by either member when it changes or is deleted
+        Index("ix_contact_near_matches_match_id", "match_id"),
+    )
+
+    contact_id = Column(Integer, primary_key=True, autoincrement=False)
+    match_id = Column(Integer, primary_key=True, autoincrement=False)
+    owner_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+
+class ContactDedupState(Base):
+    """How far the duplicate scan has read contacts, by updated_at; one row per database."""
+    __tablename__ = 'contact_dedup_state'
+
+    name = Column(String(50), primary_key=True)
+    watermark = Column(PreciseDateTime, nullable=True)
+    scanned_at = Column(PreciseDateTime, nullable=True)
+
+
+# 64-bit sequence numbers; SQLite only autoincrements an INTEGER PRIMARY KEY
+ChangeSequence = BigInteger().with_variant(Integer, "sqlite")
+
+class ContactChanges(Base):
+    """Append-only log of contact creates, updates and deletes, read by the change feed."""
+    __tablename__ = 'contact_changes'
+    __table_args__ = (
+        # The feed is WHERE owner_id = ? AND seq > ? ORDER BY seq
+        Index("ix_contact_changes_owner_seq", "owner_id", "seq"),
+        # Pruning finds the newest expired change by time
+        Index("ix_contact_changes_changed_at", "changed_at"),
+    )
+
+    seq = Column(ChangeSequence, primary_key=True, autoincrement=True)
+    owner_id = Column(Integer, nullable=False)
+    contact_id = Column(Integer, nullable=False)
+    # "create", "update" or "delete"
+    op = Column(String(6), nullable=False)
+    changed_at = Column(PreciseDateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+
+class ContactFeeds(Base):
+    """Per-owner change-feed state. Writers update the owner's row before logging a change,
+    so one owner's sequence numbers are assigned and committed in the same order."""
+    __tablename__ = 'contact_feeds'
+
+    owner_id = Column(Integer, primary_key=True, autoincrement=False)
+    # Changes up to this seq have been pruned; older cursors must resync
+    pruned_seq = Column(BigInteger, nullable=False, default=0)
+    # The owner's contacts, adjusted by every create and delete under the same lock;
+    # counted_at is when a reconciliation last checked it against COUNT(*) (None: never)
+    contact_count = Column(BigInteger, nullable=False, default=0, server_default="0")
+    counted_at = Column(PreciseDateTime, nullable=True)
+
+
+class ContactDailyCounts(Base):
+    """Contacts created per owner and UTC day, incremented by every create under the owner's feed lock."""
+    __tablename__ = 'contact_daily_counts'
+    __table_args__ = (
+        # Every owner's days at once, for the admin stats
+        Index("ix_contact_daily_counts_day", "day"),
+    )
+
+    owner_id = Column(Integer, primary_key=True, autoincrement=False)
+    day = Column(Date, primary_key=True)
+    created = Column(Integer, nullable=False, default=0)
+
+
+class StatCounters(Base):
+    """Named totals kept in step with the rows they count, e.g. active and inactive users."""
+    __tablename__ = 'stat_counters'
+
+    name = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    # When a reconciliation last recounted it (None: never)
+    counted_at = Column(PreciseDateTime, nullable=True)
+
+
+class CacheGenerations(Base):
+    """Named counters bumped by every write that makes an in-process cache stale, polled by each worker."""
+    __tablename__ = 'cache_generations'
+
+    name = Column(String(50), primary_key=True)
+    generation = Column(BigInteger, nullable=False, default=0)
+
+
+class CacheInvalidations(Base):
+    """What each cache generation bump made stale, so workers evict those entries instead of everything."""
+    __tablename__ = 'cache_invalidations'
 
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    name = Column(String(50), primary_key=True)
+    generation = Column(BigInteger, primary_key=True, autoincrement=False)
+    # The cache key that went stale; None when the change touches every entry
+    entry_key = Column(BigInteger, nullable=True)
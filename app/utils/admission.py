@@ -0,0 +1,123 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Hashable
+from app.exceptions.exceptions import ServiceUnavailableException
+
+
+class AdmissionLimiter:
+    """Lets `limit` callers in at once and `queue_size` more wait up to `queue_timeout` seconds.
+
+    Anyone beyond that is refused at once with ServiceUnavailableException, so a
+    burst costs the rejected callers nothing and the admitted ones a bounded wait.
+    Meant to be used from the event loop thread only, so it takes no locks.
+    """
+
+    def __init__(self, limit: int, queue_size: int, queue_timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._slots = asyncio.Semaphore(limit)
+
+    def _reject(self, message: str) -> ServiceUnavailableException:
+        self.rejected += 1
+        return ServiceUnavailableException(message, retry_after=max(1, math.ceil(self.queue_timeout)))
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        if self._slots.locked():
+            if self.waiting >= self.queue_size:
+                raise self._reject("Too many requests in progress, try again later")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._reject("Timed out waiting for a free slot, try again later")
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+class TokenBuckets:
+    """One token bucket per key: `burst` tokens, refilled at `rate` per second.
+
+    At most `maxsize` buckets are kept, least recently used evicted first; an
+    evicted key starts over with a full bucket, so `maxsize` should comfortably
+    exceed the keys active within burst / rate seconds. rate <= 0 disables it.
+    """
+
+    def __init__(self, rate: float, burst: float, maxsize: int):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self.limited = 0
+        # key -> (tokens, monotonic time they were counted)
+        self._buckets: OrderedDict = OrderedDict()
+
+    def _tokens(self, key: Hashable, now: float) -> float:
+        tokens, counted_at = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - counted_at) * self.rate)
+
+    def _store(self, key: Hashable, tokens: float, now: float) -> None:
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+
+    def take(self, key: Hashable) -> float:
+        """Spend a token for `key`: 0 if there was one, else the seconds until there will be."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        tokens = self._tokens(key, now)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+            self.limited += 1
+        self._store(key, tokens, now)
+        return wait
+
+    def refund(self, key: Hashable) -> None:
+        """Give back a token spent by `take` for an attempt that turned out not to count."""
+        if self.rate <= 0 or key not in self._buckets:
+            return
+        now = time.monotonic()
+        self._store(key, min(self.burst, self._tokens(key, now) + 1), now)
+
+    def discard(self, key: Hashable) -> None:
+        self._buckets.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._buckets),
+            "maxsize": self.maxsize,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "limited": self.limited,
+        }
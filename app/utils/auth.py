@@ -1,8 +1,12 @@
 from passlib.context import CryptContext
+import asyncio
 import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 import jwt
-from app.exceptions.exceptions import UnauthorizedException
+from app.exceptions.exceptions import UnauthorizedException, ServiceUnavailableException
+from app.utils.metrics import METRICS_ENABLED, password_hash_seconds, password_hash_queue_seconds
 from pydantic import BaseModel
 from typing import Optional
 from enum import Enum
@@ -12,6 +16,16 @@ SECRET_KEY = os.getenv("SECRET_KEY", "a4f1d7fb6fe5183dea6ced6ba9c26bbf0d462b2841
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# bcrypt runs in a bounded worker pool so it never blocks the event loop.
+# "process" spreads hashing over several cores, "thread" avoids the fork.
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "process")
+# Defaults to this worker's share of the cores when WEB_CONCURRENCY processes serve the app
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", "1"))))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
+# Niceness of the "process" workers: when hashing and request handling compete for the CPU,
+# the OS favours the event loop, so a login flood slows logins rather than every other route
+PASSWORD_HASH_NICE = int(os.getenv("PASSWORD_HASH_NICE", "10"))
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -32,6 +46,63 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def password_hash_needs_update(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
+
+_password_executor: Executor | None = None
+_password_jobs_pending = 0
+
+def _lower_priority() -> None:
+    try:
+        os.nice(PASSWORD_HASH_NICE)
+    except (AttributeError, OSError):
+        pass
+
+def _get_password_executor() -> Executor:
+    global _password_executor
+    if _password_executor is None:
+        if PASSWORD_HASH_EXECUTOR == "thread":
+            _password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+        else:
+            _password_executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, initializer=_lower_priority if PASSWORD_HASH_NICE else None)
+    return _password_executor
+
+def shutdown_password_executor() -> None:
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
+
+def _timed(func, *args):
+    # Runs in the worker, so the measured time is bcrypt alone, without the wait for a free worker
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+async def _run_password_job(operation: str, func, *args):
+    # Only touched from the event loop thread, so a plain counter is enough
+    global _password_jobs_pending
+    if _password_jobs_pending >= PASSWORD_HASH_MAX_PENDING:
+        raise ServiceUnavailableException("Too many pending password operations, try again later")
+    _password_jobs_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        if not METRICS_ENABLED:
+            return await loop.run_in_executor(_get_password_executor(), func, *args)
+        started = time.perf_counter()
+        result, seconds = await loop.run_in_executor(_get_password_executor(), _timed, func, *args)
+        password_hash_seconds.observe(seconds, (operation,))
+        password_hash_queue_seconds.observe(max(time.perf_counter() - started - seconds, 0.0), (operation,))
+        return result
+    finally:
+        _password_jobs_pending -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job("verify", verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_password_job("hash", get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,87 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Set, Tuple
+
+
+class GroupCommit:
+    """Coalesces concurrent submissions into batches handed to one `flush` call per batch.
+
+    A key's queue is flushed when it holds `max_batch` items or `max_delay`
+    seconds after its first item arrived, whichever comes first. Only one flush
+    per key runs at a time: what arrives meanwhile waits for it and goes out
+    in the next batch, so batches grow with the load instead of the delay.
+    `flush(key, items)` returns one result or exception per item, in order;
+    each submitter gets its own. Event loop thread only, like AdmissionLimiter.
+    """
+
+    def __init__(self, flush: Callable[[Hashable, List[Any]], Awaitable[List[Any]]], max_batch: int, max_delay: float):
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self.batches = 0
+        self.items = 0
+        self._flush = flush
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._flushing: Set[Hashable] = set()
+        self._due: Set[Hashable] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((item, future))
+        if len(pending) >= self.max_batch:
+            self._ready(key)
+        elif len(pending) == 1:
+            self._timers[key] = loop.call_later(self.max_delay, self._ready, key)
+        # Shielded: a submitter that goes away must not cancel the batch it is part of
+        return await asyncio.shield(future)
+
+    def _ready(self, key: Hashable) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        if key in self._flushing:
+            self._due.add(key)
+            return
+        pending = self._pending.pop(key, None)
+        if not pending:
+            return
+        batch, rest = pending[:self.max_batch], pending[self.max_batch:]
+        if rest:
+            # Already waited their turn: they go out as soon as this batch is done
+            self._pending[key] = rest
+            self._due.add(key)
+        self._flushing.add(key)
+        task = asyncio.get_running_loop().create_task(self._run(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: Hashable, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self._flush(key, [item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        self._flushing.discard(key)
+        if key in self._due or len(self._pending.get(key, ())) >= self.max_batch:
+            self._due.discard(key)
+            self._ready(key)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "max_delay_ms": self.max_delay * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "pending": sum(len(pending) for pending in self._pending.values()),
+            "flushing": len(self._flushing),
+        }
@@ -0,0 +1,119 @@
+import logging
+import mmap
+import os
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+# How often an in-process cache looks for changes other workers made; 0 disables the checks
+CACHE_SYNC_INTERVAL_SECONDS = float(os.getenv("CACHE_SYNC_INTERVAL_SECONDS", "1"))
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after `ttl` seconds.
+
+    Meant to be used from the event loop thread only, so it takes no locks.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class SharedExpirySet:
+    """Keys remembered for `ttl` seconds, shared with every process forked after the set is created.
+
+    Keys hash to one of `slots` deadlines in an anonymous shared mapping, so
+    workers forked from a preloading master see each other's additions at once,
+    without locks or a round-trip. Keys that share a slot share a deadline: a
+    lookup may report a key that was never added, never the other way round.
+    """
+
+    def __init__(self, slots: int, ttl: float):
+        self.slots = max(1, slots)
+        self.ttl = ttl
+        self._mapping = mmap.mmap(-1, 8 * self.slots)
+        self._deadlines = memoryview(self._mapping).cast("d")
+
+    def _slot(self, key: str) -> int:
+        # Not hash(): it must agree across processes whatever their hash seed
+        return zlib.crc32(key.encode()) % self.slots
+
+    def add(self, key: str) -> None:
+        self._deadlines[self._slot(key)] = time.monotonic() + self.ttl
+
+    def __contains__(self, key: str) -> bool:
+        return self._deadlines[self._slot(key)] > time.monotonic()
+
+
+class SyncCheck:
+    """Runs a cache's check for changes made by other processes at most once every `interval` seconds.
+
+    Called on the cache's read path; a caller arriving while another caller's
+    check is still running reads the cache as it is. A failed check is logged
+    and retried after the next interval.
+    """
+
+    def __init__(self, name: str, interval: float = CACHE_SYNC_INTERVAL_SECONDS):
+        self.name = name
+        self.interval = interval
+        self.checks = 0
+        self._next = float("-inf")
+        self._running = False
+
+    async def run(self, check: Callable[[], Awaitable[None]]) -> None:
+        now = time.monotonic()
+        if self.interval <= 0 or self._running or now < self._next:
+            return
+        self._running = True
+        self._next = now + self.interval
+        try:
+            self.checks += 1
+            await check()
+        except Exception as e:
+            logger.warning("%s sync check failed, serving it as cached: %s", self.name, e)
+        finally:
+            self._running = False
@@ -0,0 +1,69 @@
+import hashlib
+from datetime import datetime, timezone, timedelta
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # DateTime columns come back naive; they hold UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def entity_etag(entity_id: int, updated_at: datetime) -> str:
+    """Strong validator for a single row: same id and updated_at means the same representation."""
+    return f'"{entity_id}-{(_as_utc(updated_at) - _EPOCH) // timedelta(microseconds=1)}"'
+
+def variant_etag(etag: str, *variant) -> str:
+    """Weak validator for a partial representation of the entity behind `etag` (e.g. a ?fields= subset)."""
+    digest = hashlib.sha1(repr((_opaque(etag),) + variant).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def collection_etag(max_updated_at: Optional[datetime], count: int, *variant) -> str:
+    """Weak validator for a listing, from the newest updated_at, the row count and the query parameters."""
+    stamp = (_as_utc(max_updated_at) - _EPOCH) // timedelta(microseconds=1) if max_updated_at else 0
+    digest = hashlib.sha1(repr((stamp, count) + variant).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value).replace(microsecond=0), usegmt=True)
+
+def _etag_list(header: str) -> list:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+def none_match(if_none_match: Optional[str], etag: str) -> bool:
+    """True when If-None-Match matches, i.e. the client copy is current (weak comparison)."""
+    if not if_none_match:
+        return False
+    tags = _etag_list(if_none_match)
+    return "*" in tags or _opaque(etag) in {_opaque(tag) for tag in tags}
+
+def is_not_modified(etag: str, last_modified: Optional[datetime], if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110, 13.2.2)
+    if if_none_match:
+        return none_match(if_none_match, etag)
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+def if_match_satisfied(if_match: Optional[str], etag: str) -> bool:
+    """If-Match uses strong comparison; weak tags never match."""
+    if not if_match:
+        return True
+    tags = _etag_list(if_match)
+    return "*" in tags or etag in tags
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
@@ -0,0 +1,33 @@
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+Fields = Optional[Tuple[str, ...]]
+
+
+def parse_fields(fields: Optional[str], columns: Sequence) -> Fields:
+    """Validate a comma-separated ?fields= value against `columns`; None means every column.
+
+    Names come back in column order, so every response lists its keys the same way.
+    """
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    allowed = [column.key for column in columns]
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}; choose from {', '.join(allowed)}")
+    if not requested:
+        raise ValueError("fields is empty")
+    return tuple(name for name in allowed if name in requested)
+
+def select_columns(columns: Sequence, fields: Fields, *required: str) -> tuple:
+    """The columns to SELECT: the requested fields plus those the query itself needs (ids, sort keys, validators)."""
+    if fields is None:
+        return tuple(columns)
+    return tuple(column for column in columns if column.key in fields or column.key in required)
+
+def project(row: Any, fields: Fields) -> Dict[str, Any]:
+    """A result row (or dict) as a dict holding only the requested fields."""
+    values = row if isinstance(row, dict) else row._asdict()
+    if fields is None:
+        return values
+    return {name: values[name] for name in fields}
@@ -0,0 +1,243 @@
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Off switches the middleware and the bcrypt timers off entirely, and the engine hooks unless profiling needs them
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+PASSWORD_HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        # Updated from the event loop and from the sync engine's threads
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), collect: Optional[Callable[[], Iterable[Tuple[tuple, float]]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {} if labelnames else {(): 0}
+        # Metrics with a collect function read their values at scrape time instead
+        self._collect = collect
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        if self._collect is not None:
+            values = list(self._collect())
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(labels, (list(counts), total, count)) for labels, (counts, total, count) in self._values.items()]
+        lines = self.header()
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "contactnest_http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status")))
+http_request_duration_seconds = registry.register(Histogram(
+    "contactnest_http_request_duration_seconds", "HTTP request latency until the response is fully sent.", ("method", "route")))
+http_requests_in_flight = registry.register(Gauge(
+    "contactnest_http_requests_in_flight", "HTTP requests currently being served."))
+http_request_db_queries = registry.register(Histogram(
+    "contactnest_http_request_db_queries", "SQL statements executed per HTTP request.", ("method", "route"), QUERY_COUNT_BUCKETS))
+http_request_db_seconds = registry.register(Histogram(
+    "contactnest_http_request_db_seconds", "Time spent in SQL statements per HTTP request.", ("method", "route")))
+db_queries_total = registry.register(Counter(
+    "contactnest_db_queries_total", "SQL statements executed, in or outside requests."))
+db_query_seconds_total = registry.register(Counter(
+    "contactnest_db_query_seconds_total", "Time spent in SQL statements, in or outside requests."))
+password_hash_seconds = registry.register(Histogram(
+    "contactnest_password_hash_seconds", "bcrypt time in the worker, per operation.", ("operation",), PASSWORD_HASH_BUCKETS))
+password_hash_queue_seconds = registry.register(Histogram(
+    "contactnest_password_hash_queue_seconds", "Time a bcrypt job waited for a free worker.", ("operation",)))
+
+
+class RequestStats:
+    """SQL statements run for one request: counted always, the slowest and the full list when asked for."""
+
+    __slots__ = ("queries", "db_seconds", "started", "keep_slowest", "slowest", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.started = time.perf_counter()
+        # A min-heap of (seconds, statement) holding the keep_slowest slowest
+        self.keep_slowest = 0
+        self.slowest: List[Tuple[float, str]] = []
+        # (offset from the start of the request, seconds, statement, executemany) in execution order
+        self.statements: Optional[List[Tuple[float, float, str, bool]]] = None
+
+    def record(self, statement: str, elapsed: float, executemany: bool) -> None:
+        self.queries += 1
+        self.db_seconds += elapsed
+        if self.keep_slowest:
+            if len(self.slowest) < self.keep_slowest:
+                heapq.heappush(self.slowest, (elapsed, statement))
+            elif elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (elapsed, statement))
+        if self.statements is not None:
+            self.statements.append((time.perf_counter() - elapsed - self.started, elapsed, statement, executemany))
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("contactnest_request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    db_queries_total.inc()
+    db_query_seconds_total.inc(amount=elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed, executemany)
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+def instrument_engine(engine: Engine) -> None:
+    """Count statements and their time, globally and for the request that runs them."""
+    # Imported here: profiling builds on this module
+    from app.utils.profiling import PROFILING_ENABLED
+    if not METRICS_ENABLED and not PROFILING_ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware, so streamed responses pass through untouched and are timed to the last chunk."""
+
+    def __init__(self, app, skip_paths: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            _request_stats.reset(token)
+            # The route template keeps label cardinality bounded; unmatched paths share one series
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else "unmatched")
+            http_requests_total.inc(labels + (str(status_code),))
+            http_request_duration_seconds.observe(elapsed, labels)
+            http_request_db_queries.observe(stats.queries, labels)
+            http_request_db_seconds.observe(stats.db_seconds, labels)
@@ -0,0 +1,14 @@
+import re
+from typing import Optional
+
+_NON_DIGIT_RE = re.compile(r"\D")
+
+
+def email_key(email: str) -> str:
+    """Lookup form of an email address: trimmed and lowercased."""
+    return email.strip().lower()
+
+def phone_key(phone: Optional[str]) -> Optional[str]:
+    """Lookup form of a phone number: its digits, E.164 without the '+' ("+1 (555) 010-0199" -> "15550100199")."""
+    digits = _NON_DIGIT_RE.sub("", phone or "")
+    return digits or None
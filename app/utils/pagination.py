@@ -0,0 +1,69 @@
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from sqlalchemy import Select, and_, or_
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "20"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "100"))
+
+
+def clamp_page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def encode_cursor(sort: str, sort_value: Any, last_id: int) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort, sort_value, last_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+# Sorts whose cursor value is text; created_at carries an ISO timestamp, every other sort an integer
+STRING_SORTS = ("name", "email", "username")
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, sort_value, last_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort:
+        raise ValueError("Cursor does not match the requested sort order")
+    # Cursors come back from clients: a value of the wrong type would reach the database
+    if not _is_int(last_id):
+        raise ValueError("Invalid cursor")
+    if sort == "created_at":
+        try:
+            sort_value = datetime.fromisoformat(sort_value)
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+    elif not (isinstance(sort_value, str) if sort in STRING_SORTS else _is_int(sort_value)):
+        raise ValueError("Invalid cursor")
+    return sort_value, last_id
+
+def keyset_select(stmt: Select, sort_column, id_column, sort: str, limit: int, cursor: Optional[str] = None) -> Select:
+    """Order `stmt` by (sort_column, id) and seek past `cursor`, fetching one extra row to detect a next page."""
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor, sort)
+        if sort_column is id_column:
+            stmt = stmt.where(id_column > last_id)
+        else:
+            # Expanded row comparison; (a, b) > (x, y) is not index-friendly on every MySQL version
+            stmt = stmt.where(or_(sort_column > sort_value, and_(sort_column == sort_value, id_column > last_id)))
+    if sort_column is id_column:
+        stmt = stmt.order_by(id_column)
+    else:
+        stmt = stmt.order_by(sort_column, id_column)
+    return stmt.limit(limit + 1)
+
+def keyset_page(rows: Sequence, limit: int, sort: str) -> Tuple[List, Optional[str]]:
+    """Trim the extra row fetched by keyset_select and build the cursor; `sort` must name a row attribute."""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort, getattr(last, sort), last.id)
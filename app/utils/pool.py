@@ -0,0 +1,92 @@
+import threading
+import time
+from typing import Optional
+from sqlalchemy import exc
+from sqlalchemy.pool import Pool, QueuePool, AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    """Checkout wait counters, carried over when the pool is recreated (engine.dispose())."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def begin_wait(self) -> None:
+        with self._lock:
+            self.waiting += 1
+            self.waits += 1
+
+    def end_wait(self, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.timeouts += timed_out
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+
+class _InstrumentedPoolMixin:
+    """Counts checkouts that found every connection in use and how long they waited for one."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def capacity(self) -> Optional[int]:
+        # max_overflow=-1 means the pool never refuses a checkout
+        return None if self._max_overflow < 0 else self.size() + self._max_overflow
+
+    def saturated(self) -> bool:
+        capacity = self.capacity()
+        return self.stats.waiting > 0 or (capacity is not None and self.checkedout() >= capacity)
+
+    def _do_get(self):
+        if not self.saturated():
+            return super()._do_get()
+        self.stats.begin_wait()
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.stats.end_wait(time.perf_counter() - started, timed_out)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(pool: Pool) -> dict:
+    if not isinstance(pool, _InstrumentedPoolMixin):
+        # e.g. the single-connection pool of an in-memory SQLite database
+        return {"pool": type(pool).__name__, "saturated": False}
+    stats = pool.stats
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "capacity": pool.capacity(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "waiting": stats.waiting,
+        "waits": stats.waits,
+        "timeouts": stats.timeouts,
+        "wait_seconds_total": round(stats.wait_seconds, 6),
+        "max_wait_seconds": round(stats.max_wait_seconds, 6),
+        "saturated": pool.saturated(),
+    }
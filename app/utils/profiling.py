@@ -0,0 +1,283 @@
+import asyncio
+import cProfile
+import json
+import logging
+import marshal
+import os
+import pstats
+import random
+import re
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from app.exceptions.exceptions import NotFoundException
+from app.utils.auth import UserRole, verify_token
+from app.utils.metrics import RequestStats, _request_stats
+
+logger = logging.getLogger(__name__)
+
+# Requests slower than this are logged with their slowest statements; 0 turns the log off
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1"))
+# Statements listed per slow request
+SLOW_REQUEST_TOP_QUERIES = int(os.getenv("SLOW_REQUEST_TOP_QUERIES", "5"))
+# An admin's request carrying this header is profiled; empty turns the header off
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile")
+# Fraction of requests profiled without being asked, e.g. 0.001; health probes are never sampled
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Where profiles are kept and how many; the oldest go first. Workers sharing the directory share the ring
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "contactnest-profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+# Statements and functions written per profile; the .prof download always has every function
+PROFILE_MAX_STATEMENTS = int(os.getenv("PROFILE_MAX_STATEMENTS", "1000"))
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "50"))
+
+PROFILING_ENABLED = SLOW_REQUEST_SECONDS > 0 or bool(PROFILE_HEADER) or PROFILE_SAMPLE_RATE > 0
+
+# Error bodies kept in a profile, where the routes' detail messages end up
+ERROR_BODY_BYTES = 1000
+SLOW_LOG_STATEMENT_CHARS = 500
+
+
+def _summary_path(directory: str, profile_id: str) -> str:
+    return os.path.join(directory, profile_id + ".summary.json")
+
+
+class ProfileRing:
+    """The newest `keep` request profiles, as files in `directory`.
+
+    Each profile is three files named after its id (nanosecond timestamp and
+    pid, so ids sort by age across workers): a small summary for listings, the
+    full record, and the cProfile stats for pstats or snakeviz. Every save
+    deletes whatever falls outside the ring. Blocking: call from a thread.
+    """
+
+    ID_PATTERN = re.compile(r"^\d+-\d+$")
+
+    def __init__(self, directory: str, keep: int):
+        self.directory = directory
+        self.keep = max(1, keep)
+
+    def new_id(self) -> str:
+        return f"{time.time_ns()}-{os.getpid()}"
+
+    def _ids(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted((name[:-len(".summary.json")] for name in names if name.endswith(".summary.json")), reverse=True)
+
+    def _write(self, path: str, write) -> None:
+        # Renamed into place, so readers never see half a file
+        partial = f"{path}.{os.getpid()}.partial"
+        with open(partial, "wb") as f:
+            write(f)
+        os.replace(partial, path)
+
+    def save(self, profile_id: str, summary: dict, record: dict, profiler: Optional[cProfile.Profile]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if profiler is not None:
+            self._write(self.pstats_path(profile_id), lambda f: f.write(_marshal_stats(profiler)))
+        self._write(os.path.join(self.directory, profile_id + ".json"), lambda f: f.write(json.dumps(record).encode()))
+        # The summary goes last: a profile is listed once all of it is there
+        self._write(_summary_path(self.directory, profile_id), lambda f: f.write(json.dumps(summary).encode()))
+        for old_id in self._ids()[self.keep:]:
+            for path in (_summary_path(self.directory, old_id), os.path.join(self.directory, old_id + ".json"), self.pstats_path(old_id)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    # Another worker trimmed it first, or the request ran without the profiler
+                    pass
+
+    def list(self) -> List[dict]:
+        summaries = []
+        for profile_id in self._ids()[:self.keep]:
+            try:
+                with open(_summary_path(self.directory, profile_id), "rb") as f:
+                    summaries.append(json.load(f))
+            except FileNotFoundError:
+                continue
+        return summaries
+
+    def get(self, profile_id: str) -> dict:
+        try:
+            with open(os.path.join(self.directory, self._check_id(profile_id) + ".json"), "rb") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise NotFoundException("Profile not found")
+
+    def pstats_path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, self._check_id(profile_id) + ".prof")
+
+    def _check_id(self, profile_id: str) -> str:
+        # Ids become file names
+        if not self.ID_PATTERN.match(profile_id):
+            raise NotFoundException("Profile not found")
+        return profile_id
+
+
+def _marshal_stats(profiler: cProfile.Profile) -> bytes:
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+def _top_functions(profiler: cProfile.Profile, limit: int) -> List[dict]:
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "primitive_calls": primitive_calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for (filename, line, name), (primitive_calls, calls, own, cumulative, _) in rows
+    ]
+
+
+profile_ring = ProfileRing(PROFILE_DIR, PROFILE_KEEP)
+
+
+class ProfilingMiddleware:
+    """Plain ASGI middleware for the slow-request log and on-demand request profiles.
+
+    Every request keeps its slowest statements, for the log. A profiled request
+    also keeps every statement and runs under cProfile; the result is written
+    to `profile_ring` after the response is sent, and its id returned in
+    X-Profile-Id. cProfile sees the whole event loop thread, so the call
+    profile also holds whatever other requests ran meanwhile, and only one
+    request per worker is under the profiler at a time: the others profiled
+    then get their statements recorded without the call profile.
+    """
+
+    def __init__(self, app, skip_paths: Tuple[str, ...] = ("/metrics",), sample_skip_paths: Tuple[str, ...] = ("/health", "/ready")):
+        self.app = app
+        self.skip_paths = skip_paths
+        self.sample_skip_paths = sample_skip_paths
+        self.header = PROFILE_HEADER.lower().encode("latin-1")
+        self._profiler_busy = False
+        self._saves: set = set()
+
+    def _trigger(self, scope) -> Optional[str]:
+        if self.header:
+            headers = dict(scope["headers"])
+            if self.header in headers and _is_admin(headers.get(b"authorization", b"")):
+                return "header"
+        if PROFILE_SAMPLE_RATE > 0 and scope["path"] not in self.sample_skip_paths and random.random() < PROFILE_SAMPLE_RATE:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+        # MetricsMiddleware, when there, already counts the request's statements; add to its stats
+        stats = _request_stats.get()
+        token = None
+        if stats is None:
+            stats = RequestStats()
+            token = _request_stats.set(stats)
+        if SLOW_REQUEST_SECONDS > 0:
+            stats.keep_slowest = SLOW_REQUEST_TOP_QUERIES
+        trigger = self._trigger(scope)
+        profile_id = profiler = None
+        if trigger is not None:
+            profile_id = profile_ring.new_id()
+            stats.statements = []
+            if not self._profiler_busy:
+                self._profiler_busy = True
+                profiler = cProfile.Profile()
+        status_code = 500
+        error_body = bytearray()
+
+        async def send_with_profile(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if profile_id is not None:
+                    message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]}
+            elif profile_id is not None and status_code >= 400 and len(error_body) < ERROR_BODY_BYTES:
+                error_body.extend(message.get("body", b"")[:ERROR_BODY_BYTES - len(error_body)])
+            await send(message)
+
+        created_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiler_busy = False
+            elapsed = time.perf_counter() - started
+            if token is not None:
+                _request_stats.reset(token)
+            if SLOW_REQUEST_SECONDS > 0 and elapsed >= SLOW_REQUEST_SECONDS:
+                _log_slow_request(scope, status_code, elapsed, stats, profile_id)
+            if profile_id is not None:
+                summary = {
+                    "id": profile_id,
+                    "created_at": created_at.isoformat(),
+                    "trigger": trigger,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "queries": stats.queries,
+                    "db_ms": round(stats.db_seconds * 1000, 3),
+                    "call_profile": profiler is not None,
+                }
+                # Written off the event loop, and after the response: the client does not wait for the disk
+                task = asyncio.get_running_loop().create_task(self._save(scope, summary, stats, bytes(error_body), profiler))
+                self._saves.add(task)
+                task.add_done_callback(self._saves.discard)
+
+    async def _save(self, scope, summary: dict, stats: RequestStats, error_body: bytes, profiler: Optional[cProfile.Profile]) -> None:
+        def save():
+            # Parameters are left out: they hold password hashes and contact details
+            statements = [
+                {"offset_ms": round(offset * 1000, 3), "ms": round(elapsed * 1000, 3), "sql": statement, "executemany": executemany}
+                for offset, elapsed, statement, executemany in stats.statements[:PROFILE_MAX_STATEMENTS]
+            ]
+            record = {
+                **summary,
+                "query_string": scope["query_string"].decode("latin-1"),
+                "route": scope["route"].path if scope.get("route") is not None else None,
+                "error_body": error_body.decode("utf-8", "replace") if error_body else None,
+                "statements": statements,
+                "statements_dropped": max(0, len(stats.statements) - PROFILE_MAX_STATEMENTS),
+                "functions": _top_functions(profiler, PROFILE_TOP_FUNCTIONS) if profiler is not None else None,
+            }
+            profile_ring.save(summary["id"], summary, record, profiler)
+
+        try:
+            await asyncio.to_thread(save)
+        except Exception as e:
+            logger.warning("Could not save profile %s: %s", summary["id"], e)
+
+
+def _is_admin(authorization: bytes) -> bool:
+    # The signed role claim decides, so a demoted admin can profile until the token expires
+    scheme, _, credentials = authorization.decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not credentials:
+        return False
+    try:
+        return verify_token(credentials).get("role") == UserRole.ADMIN.value
+    except Exception:
+        return False
+
+def _log_slow_request(scope, status_code: int, elapsed: float, stats: RequestStats, profile_id: Optional[str]) -> None:
+    route = scope.get("route")
+    lines = [
+        f"Slow request: {scope['method']} {scope['path']} ({route.path if route is not None else 'unmatched'}) -> {status_code} "
+        f"in {elapsed * 1000:.1f} ms, {stats.queries} statements in {stats.db_seconds * 1000:.1f} ms"
+        + (f", profile {profile_id}" if profile_id is not None else "")
+    ]
+    for seconds, statement in sorted(stats.slowest, reverse=True):
+        statement = " ".join(statement.split())
+        if len(statement) > SLOW_LOG_STATEMENT_CHARS:
+            statement = statement[:SLOW_LOG_STATEMENT_CHARS] + "..."
+        lines.append(f"  {seconds * 1000:9.1f} ms  {statement}")
+    logger.warning("\n".join(lines))
@@ -0,0 +1,107 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Callable, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+async def probe_replica_lag(connection: AsyncConnection) -> Optional[float]:
+    """Seconds the replica is behind its source; None when replication is broken."""
+    if connection.dialect.name != "mysql":
+        # Stand-ins such as SQLite files have no replication to lag behind
+        return 0.0
+    result = await connection.execute(text("SHOW REPLICA STATUS"))
+    row = result.mappings().first()
+    if row is None:
+        # Not configured as a replica at all, e.g. the primary itself listed as a reader
+        return 0.0
+    lag = row.get("Seconds_Behind_Source")
+    return None if lag is None else float(lag)
+
+
+class ReplicaSet:
+    """Async engines of the read replicas and the policy that picks one for each reader session.
+
+    round_robin cycles through every replica. lag only considers replicas at most
+    `max_lag` seconds behind, prefers the least lagged and cycles between equals;
+    lag is re-measured in the background every `lag_check_interval` seconds and a
+    replica is not used before its first measurement. With no eligible replica,
+    choose() returns None and the caller reads from the primary.
+    """
+
+    def __init__(self, urls: List[str], strategy: str, max_lag: float, lag_check_interval: float,
+                 engine_factory: Callable[[str], AsyncEngine], lag_probe=probe_replica_lag):
+        if strategy not in ("round_robin", "lag"):
+            raise ValueError(f"Unknown replica strategy: {strategy}")
+        self.urls = urls
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self._engine_factory = engine_factory
+        self._lag_probe = lag_probe
+        self._engines: Optional[List[AsyncEngine]] = None
+        self._lags: List[Optional[float]] = [None] * len(urls)
+        self._counter = itertools.count()
+        self._checked_at = float("-inf")
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    @property
+    def engines(self) -> List[AsyncEngine]:
+        if self._engines is None:
+            self._engines = [self._engine_factory(url) for url in self.urls]
+        return self._engines
+
+    def choose(self) -> Optional[AsyncEngine]:
+        if not self.urls:
+            return None
+        engines = self.engines
+        if self.strategy == "round_robin":
+            return engines[next(self._counter) % len(engines)]
+        self._schedule_lag_check()
+        eligible = [(lag, index) for index, lag in enumerate(self._lags) if lag is not None and lag <= self.max_lag]
+        if not eligible:
+            return None
+        least = min(lag for lag, _ in eligible)
+        tied = [index for lag, index in eligible if lag == least]
+        return engines[tied[next(self._counter) % len(tied)]]
+
+    def status(self) -> List[dict]:
+        return [
+            {"replica": index, "lag_seconds": lag, "eligible": self.strategy == "round_robin" or (lag is not None and lag <= self.max_lag)}
+            for index, lag in enumerate(self._lags)
+        ]
+
+    def _schedule_lag_check(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.lag_check_interval or (self._refresh_task is not None and not self._refresh_task.done()):
+            return
+        self._checked_at = now
+        self._refresh_task = asyncio.get_running_loop().create_task(self.check_lag())
+
+    async def check_lag(self) -> None:
+        async def measure(index: int, engine: AsyncEngine) -> None:
+            try:
+                async with engine.connect() as connection:
+                    self._lags[index] = await asyncio.wait_for(self._lag_probe(connection), self.lag_check_interval)
+            except Exception as e:
+                logger.warning("Replica %d lag check failed, not reading from it: %s", index, e)
+                self._lags[index] = None
+        await asyncio.gather(*(measure(index, engine) for index, engine in enumerate(self.engines)))
+
+    async def dispose(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self._engines is not None:
+            for engine in self._engines:
+                await engine.dispose()
+            self._engines = None
+        self._lags = [None] * len(self.urls)
+        self._checked_at = float("-inf")
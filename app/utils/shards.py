@@ -0,0 +1,75 @@
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, List, Optional
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+def shard_for_owner(owner_id: int, shards: int) -> int:
+    # A real hash rather than owner_id % shards or hash(): stable across processes and
+    # Python versions, and sequential user ids spread evenly for any shard count
+    digest = hashlib.blake2b(str(owner_id).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+class ShardSet:
+    """Async engines of the contact shards; every owner's contacts live on exactly one.
+
+    The owner -> shard mapping depends on the number of shards, so changing
+    CONTACT_SHARD_URLS means moving data. Engines are created on first use.
+    """
+
+    def __init__(self, urls: List[str], engine_factory: Callable[[str], AsyncEngine]):
+        self.urls = urls
+        self._engine_factory = engine_factory
+        self._engines: List[Optional[AsyncEngine]] = [None] * len(urls)
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def shard_for(self, owner_id: int) -> int:
+        return shard_for_owner(owner_id, len(self.urls)) if self.urls else 0
+
+    def engine(self, shard: int) -> AsyncEngine:
+        if self._engines[shard] is None:
+            self._engines[shard] = self._engine_factory(self.urls[shard])
+        return self._engines[shard]
+
+    async def dispose(self) -> None:
+        for engine in self._engines:
+            if engine is not None:
+                await engine.dispose()
+        self._engines = [None] * len(self.urls)
+
+
+class IdBlockAllocator:
+    """Hands out ids from blocks reserved in one shared row (hi/lo).
+
+    Rows on different shards cannot share one AUTO_INCREMENT, so sharded inserts
+    take their ids from here; a block is reserved with one atomic UPDATE on the
+    primary every `block_size` ids, so concurrent processes never overlap.
+    """
+
+    def __init__(self, block_size: int, reserve: Callable[[int], Awaitable[int]]):
+        self.block_size = block_size
+        # reserve(n) advances the shared counter by n and returns the first id of the reserved range
+        self._reserve = reserve
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def allocate(self, count: int) -> List[int]:
+        async with self._lock:
+            ids = []
+            while len(ids) < count:
+                if self._next >= self._end:
+                    size = max(self.block_size, count - len(ids))
+                    self._next = await self._reserve(size)
+                    self._end = self._next + size
+                take = min(count - len(ids), self._end - self._next)
+                ids.extend(range(self._next, self._next + take))
+                self._next += take
+            return ids
+
+    def reset(self) -> None:
+        # Ids left in the current block are skipped, never reused
+        self._next = self._end = 0
@@ -0,0 +1,98 @@
+"""Concurrent-request throughput of the blocking vs. the async session path.
+
+Every query is slowed down by a SQLite function that sleeps inside the driver,
+standing in for a slow MySQL round-trip. On the blocking path the sleep runs on
+the event loop thread; on the async path it runs in the aiosqlite worker thread.
+
+    python -m benchmarks.async_db --requests 200 --concurrency 10 --delay-ms 20
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import use_sqlite_database
+
+use_sqlite_database()
+
+import httpx
+from fastapi import Depends
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.context.main import app
+from app.models import AsyncSessionLocal, Contacts, DB_async_writer_session, get_engine, get_async_engine
+
+DELAY_MS = 20
+
+
+def _register_sleep(dbapi_connection, connection_record):
+    dbapi_connection.create_function("bench_sleep", 1, lambda ms: time.sleep(ms / 1000) or 0)
+
+
+event.listen(get_engine(), "connect", _register_sleep)
+event.listen(get_async_engine().sync_engine, "connect", _register_sleep)
+# Drop connections opened by the migrations, before the function was registered
+get_engine().dispose()
+
+
+def _blocking_session():
+    # The app has no sync sessions any more; this one only stands in for the path it replaced
+    with Session(get_engine()) as db:
+        yield db
+
+
+@app.get("/bench/blocking/{contact_id}")
+async def blocking_probe(contact_id: int, db: Session = Depends(_blocking_session)):
+    contact = db.query(Contacts).filter(Contacts.id == contact_id, func.bench_sleep(DELAY_MS) == 0).first()
+    return {"id": contact.id}
+
+
+@app.get("/bench/async/{contact_id}")
+async def async_probe(contact_id: int, db: AsyncSession = Depends(DB_async_writer_session)):
+    result = await db.execute(select(Contacts).where(Contacts.id == contact_id, func.bench_sleep(DELAY_MS) == 0))
+    contact = result.scalars().first()
+    return {"id": contact.id}
+
+
+async def _seed(rows: int) -> None:
+    async with AsyncSessionLocal() as db:
+        db.add_all(Contacts(owner_id=1, name=f"Contact {i}", email=f"contact{i}@example.com") for i in range(rows))
+        await db.commit()
+    await get_async_engine().dispose()
+
+
+async def _run(path: str, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int) -> None:
+            async with semaphore:
+                response = await client.get(f"{path}/{i % 100 + 1}")
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+    # Pooled aiosqlite connections are bound to this event loop
+    await get_async_engine().dispose()
+    return requests / elapsed
+
+
+def main() -> None:
+    global DELAY_MS
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--delay-ms", type=int, default=DELAY_MS)
+    args = parser.parse_args()
+    DELAY_MS = args.delay_ms
+
+    asyncio.run(_seed(100))
+    for name, path in (("blocking", "/bench/blocking"), ("async", "/bench/async")):
+        throughput = asyncio.run(_run(path, args.requests, args.concurrency))
+        print(f"{name:>8}: {throughput:8.1f} req/s ({args.requests} requests, concurrency {args.concurrency}, {DELAY_MS} ms/query)")
+
+
+if __name__ == "__main__":
+    main()
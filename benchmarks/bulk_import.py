@@ -0,0 +1,71 @@
+"""Streaming bulk import throughput and memory.
+
+Streams a generated NDJSON body of --rows contacts into POST /contacts/bulk
+on a SQLite stand-in and reports rows/s and peak RSS. Peak RSS should not
+grow with --rows.
+
+    python -m benchmarks.bulk_import --rows 100000 --batch-size 1000
+"""
+import argparse
+import asyncio
+import json
+import resource
+import time
+
+from benchmarks.common import use_sqlite_database
+
+use_sqlite_database()
+
+import httpx
+
+from app.context.main import app
+from app.models import get_async_engine
+from app.utils.auth import create_access_token
+
+
+async def _body(rows: int, rows_per_chunk: int = 1000):
+    for start in range(0, rows, rows_per_chunk):
+        yield "".join(
+            json.dumps({"name": f"Contact {i}", "email": f"contact{i}@example.com", "phone": f"+1 555 {i:07d}"}) + "\n"
+            for i in range(start, min(start + rows_per_chunk, rows))
+        ).encode()
+
+
+async def _run(rows: int, batch_size: int) -> dict:
+    from app.application_services.users.users import principal_cache
+    from app.application_services.users.schemas.response import UserResponse
+    from datetime import datetime
+
+    # Skip registration: seed the principal cache for a synthetic user
+    now = datetime.now()
+    principal_cache.set(1, UserResponse(id=1, username="bench", email="bench@example.com", role="user", is_active=True, created_at=now, updated_at=now))
+    token = create_access_token({"sub": "1", "username": "bench", "email": "bench@example.com", "role": "user"})
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        response = await client.post(
+            f"/contacts/bulk?batch_size={batch_size}",
+            content=_body(rows),
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/x-ndjson"},
+        )
+        elapsed = time.perf_counter() - started
+    await get_async_engine().dispose()
+    response.raise_for_status()
+    return {**response.json(), "seconds": elapsed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    report = asyncio.run(_run(args.rows, args.batch_size))
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"accepted {report['accepted']} rejected {report['rejected']} in {report['seconds']:.1f}s "
+          f"({report['accepted'] / report['seconds']:.0f} rows/s), peak RSS {peak_rss_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import os
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def use_sqlite_database(path: str = None) -> str:
+    """Point the app at a throwaway SQLite file and migrate it; must run before anything imports app.models."""
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="contactnest-bench-"), "bench.db")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{path}")
+    os.environ.setdefault("ASYNC_DATABASE_URL", f"sqlite+aiosqlite:///{path}")
+    migrate()
+    return path
+
+
+def migrate() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
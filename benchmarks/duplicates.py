@@ -0,0 +1,94 @@
+"""Duplicate detection cost at --rows contacts of one owner, about --duplicate-rate of them repeated.
+
+Duplicates differ from their original in email case and whitespace, phone
+formatting, or are only a name with a dropped letter. Reports the full first scan, an
+incremental scan after --changed updates, and the exact and near-match
+cluster listings, all through the service functions on a SQLite stand-in.
+
+    python -m benchmarks.duplicates --rows 100000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import use_sqlite_database
+
+use_sqlite_database()
+
+from sqlalchemy import insert, update
+
+from app.application_services.contacts.duplicates import get_duplicate_clusters, scan_duplicates
+from app.models import AsyncSessionLocal, Contacts, dispose_engines, get_engine
+SYLLABLES = ["an", "bel", "cor", "da", "el", "fin", "gar", "hol", "is", "jor", "ka", "lin", "mor", "nor", "os",
+             "pet", "quin", "ros", "sal", "tor", "ul", "val", "wes", "xan", "yor", "zel", "bri", "cha", "dre", "ste"]
+
+
+def synthetic_contact(i: int, rng: random.Random) -> tuple:
+    # Names made of syllables: as varied as real ones, so only a few per name block are similar
+    first, last = "".join(rng.choice(SYLLABLES) for _ in range(2)), "".join(rng.choice(SYLLABLES) for _ in range(3))
+    return first.title(), last.title(), f"{first}.{last}{i}@example.com", f"+1 555 {i:07d}"
+
+
+def seed(rows: int, duplicate_rate: float) -> int:
+    rng = random.Random(42)
+    epoch = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    values, duplicates = [], 0
+    for i in range(1, rows + 1):
+        first, last, email, phone = synthetic_contact(i, rng)
+        name = f"{first} {last}"
+        if i > 1 and rng.random() < duplicate_rate:
+            # A variant of an earlier contact
+            original = values[rng.randint(1, i - 1) - 1]
+            variant = rng.randrange(3)
+            if variant == 0:
+                name, email, phone = original["name"], f"  {original['email'].upper()} ", original["phone"]
+            elif variant == 1:
+                name, email = original["name"], original["email"]
+                phone = original["phone"].replace(" ", "-").replace("+1-", "(+1) ")
+            else:
+                # Only the (misspelled) name gives this one away
+                name = original["name"][:2] + original["name"][3:]
+            duplicates += 1
+        stamp = epoch + timedelta(seconds=i)
+        values.append({"owner_id": 1, "name": name, "email": email, "phone": phone, "created_at": stamp, "updated_at": stamp})
+    with get_engine().begin() as connection:
+        for start in range(0, rows, 10_000):
+            connection.execute(insert(Contacts), values[start:start + 10_000])
+    return duplicates
+
+
+async def timed(label: str, coroutine):
+    started = time.perf_counter()
+    result = await coroutine
+    print(f"{label:>28}: {time.perf_counter() - started:8.3f}s")
+    return result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--changed", type=int, default=1000)
+    args = parser.parse_args()
+
+    duplicates = seed(args.rows, args.duplicate_rate)
+    print(f"seeded {args.rows} contacts, {duplicates} of them duplicates")
+    async with AsyncSessionLocal() as db:
+        result = await timed("first scan", scan_duplicates(db))
+        print(f"{'':>28}  {result.scanned} contacts keyed")
+        await db.execute(
+            update(Contacts).where(Contacts.id <= args.changed).values(updated_at=datetime.now(timezone.utc))
+        )
+        await db.commit()
+        result = await timed(f"incremental scan ({args.changed} changed)", scan_duplicates(db))
+        print(f"{'':>28}  {result.scanned} contacts keyed")
+        for near in (False, True):
+            page = await timed(f"clusters, near={near}", get_duplicate_clusters(1, db, limit=100, near=near))
+            print(f"{'':>28}  first page: {len(page.items)} clusters, e.g. {[contact['name'] for contact in page.items[0].contacts] if page.items else []}")
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
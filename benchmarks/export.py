@@ -0,0 +1,96 @@
+"""Streaming export memory and time to first byte.
+
+Seeds --rows contacts into a SQLite stand-in, then streams GET /contacts/export
+and reports time to first byte, total time and peak RSS. Compare runs at
+different --rows: peak RSS should stay flat.
+
+    python -m benchmarks.export --rows 100000 --format csv
+"""
+import argparse
+import asyncio
+import resource
+import time
+
+from benchmarks.common import use_sqlite_database
+
+use_sqlite_database()
+
+from sqlalchemy import insert
+
+from app.context.main import app
+from app.models import Contacts, get_async_engine, get_engine
+from app.utils.auth import create_access_token
+
+
+def seed_contacts(rows: int, batch: int = 10_000, owner_id: int = 1) -> None:
+    with get_engine().begin() as connection:
+        for start in range(0, rows, batch):
+            connection.execute(
+                insert(Contacts),
+                [{"owner_id": owner_id, "name": f"Contact {i}", "email": f"contact{i}@example.com", "phone": f"+1 555 {i:07d}"} for i in range(start, min(start + batch, rows))],
+            )
+
+
+async def _run(format: str) -> dict:
+    from datetime import datetime
+    from app.application_services.users.users import principal_cache
+    from app.application_services.users.schemas.response import UserResponse
+
+    now = datetime.now()
+    principal_cache.set(1, UserResponse(id=1, username="bench", email="bench@example.com", role="user", is_active=True, created_at=now, updated_at=now))
+    token = create_access_token({"sub": "1", "username": "bench", "email": "bench@example.com", "role": "user"})
+
+    # Drive the ASGI app directly: httpx's ASGI transport buffers the whole body before returning
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/contacts/export", "raw_path": b"/contacts/export", "root_path": "",
+        "query_string": f"format={format}".encode(), "server": ("bench", 80), "client": ("127.0.0.1", 1),
+        "headers": [(b"host", b"bench"), (b"authorization", f"Bearer {token}".encode())],
+    }
+    stats = {"first_byte": None, "bytes": 0, "status": None}
+    started = time.perf_counter()
+
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            stats["status"] = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            if stats["first_byte"] is None:
+                stats["first_byte"] = time.perf_counter() - started
+            stats["bytes"] += len(message["body"])
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            response_done.set()
+
+    await app(scope, receive, send)
+    elapsed = time.perf_counter() - started
+    assert stats["status"] == 200, stats
+    await get_async_engine().dispose()
+    return {"first_byte": stats["first_byte"], "seconds": elapsed, "bytes": stats["bytes"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    args = parser.parse_args()
+
+    seed_contacts(args.rows)
+    rss_before_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    report = asyncio.run(_run(args.format))
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{args.rows} rows, {report['bytes'] / 1e6:.1f} MB {args.format}: first byte {report['first_byte'] * 1000:.1f} ms, "
+          f"total {report['seconds']:.1f}s, peak RSS {peak_rss_mb:.0f} MB (after seeding {rss_before_mb:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
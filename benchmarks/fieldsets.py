@@ -0,0 +1,72 @@
+"""Bytes on the wire and CPU per contact list page: full rows vs. ?fields=id,name, with and without gzip.
+
+Pages of --limit contacts are fetched in-process through the ASGI app, so
+the CPU time is the app's (SQL through aiosqlite, serialization, compression)
+plus a constant httpx share that is the same in every configuration.
+
+    python -m benchmarks.fieldsets --rows 10000 --limit 100 --pages 300
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from benchmarks.common import use_sqlite_database
+
+use_sqlite_database()
+
+import httpx
+
+from app.application_services.users.schemas.response import UserResponse
+from app.application_services.users.users import principal_cache
+from app.context.main import app
+from app.models import dispose_engines
+from app.utils.auth import create_access_token
+from benchmarks.export import seed_contacts
+
+CONFIGURATIONS = {
+    "full": ({}, {}),
+    "fields=id,name": ({"fields": "id,name"}, {}),
+    "full, gzip": ({}, {"Accept-Encoding": "gzip"}),
+    "fields=id,name, gzip": ({"fields": "id,name"}, {"Accept-Encoding": "gzip"}),
+}
+
+
+async def walk(client: httpx.AsyncClient, headers: dict, params: dict, limit: int, pages: int) -> tuple:
+    """Fetch `pages` pages, starting over at the end; returns (wire bytes, CPU seconds) per page."""
+    cursor, wire = None, 0
+    started = time.process_time()
+    for _ in range(pages):
+        response = await client.get("/contacts/", headers=headers, params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})})
+        response.raise_for_status()
+        wire += response.num_bytes_downloaded
+        cursor = response.json()["next_cursor"]
+    return wire / pages, (time.process_time() - started) / pages
+
+
+async def run(limit: int, pages: int) -> None:
+    now = datetime.now()
+    principal_cache.set(1, UserResponse(id=1, username="bench", email="bench@example.com", role="user", is_active=True, created_at=now, updated_at=now))
+    token = create_access_token({"sub": "1"})
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for label, (params, extra_headers) in CONFIGURATIONS.items():
+            headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "identity", **extra_headers}
+            await walk(client, headers, params, limit, max(1, pages // 10))
+            wire, cpu = await walk(client, headers, params, limit, pages)
+            print(f"{label:>22}: {wire:9.0f} bytes/page  {cpu * 1000:6.2f} ms CPU/page")
+    await dispose_engines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=300)
+    args = parser.parse_args()
+
+    seed_contacts(args.rows)
+    asyncio.run(run(args.limit, args.pages))
+
+
+if __name__ == "__main__":
+    main()
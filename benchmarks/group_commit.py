@@ -0,0 +1,77 @@
+"""Contact inserts/s at 1, 10 and 100 concurrent clients, with and without group commit.
+
+Each client is a task creating contacts back to back through add_contact with
+a writer session, exactly as POST /contacts/ does, spread over --owners
+owners. The app is driven in-process: with an HTTP client on the same box,
+connection handling at 100 clients costs more CPU than the inserts and hides
+what group commit changes. Each configuration writes to a fresh SQLite file.
+Point DATABASE_URL and ASYNC_DATABASE_URL at a MySQL server to measure
+commits that cost a network round-trip and a durable fsync.
+
+    python -m benchmarks.group_commit --requests 1000 --clients 1 10 100
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import use_sqlite_database
+
+use_sqlite_database()
+
+from app.application_services.contacts import contacts
+from app.application_services.contacts.schemas.request import ContactRequest
+from app.models import ContactSessionLocal, dispose_engines
+from benchmarks.suite import percentile
+
+
+async def create_contacts(requests: int, clients: int, owners: int, tag: str) -> dict:
+    latencies = []
+    sequence = iter(range(requests))
+
+    async def client() -> None:
+        for i in sequence:
+            owner_id = 1 + i % owners
+            started = time.perf_counter()
+            async with ContactSessionLocal(owner_id) as db:
+                await contacts.add_contact(ContactRequest(name=f"Group Contact {tag}-{i}", email=f"group{tag}-{i}@example.com"), owner_id, db)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {"rate": requests / elapsed, "p50": percentile(latencies, 0.5), "p99": percentile(latencies, 0.99)}
+
+
+async def run(requests: int, levels: list, owners: int, delays: list) -> None:
+    configurations = [("one commit per create", False, None)] + [(f"group commit, {delay:g} ms delay", True, delay) for delay in delays]
+    for label, enabled, delay in configurations:
+        print(label)
+        contacts.CONTACT_GROUP_COMMIT = enabled
+        if enabled:
+            contacts.contact_group_commit.max_delay = delay / 1000
+        for clients in levels:
+            before = contacts.contact_group_commit.stats()
+            result = await create_contacts(requests, clients, owners, f"{label}-{clients}")
+            after = contacts.contact_group_commit.stats()
+            batches = after["batches"] - before["batches"]
+            batch_size = f"  {(after['items'] - before['items']) / batches:5.1f} creates/commit" if batches else ""
+            print(f"  {clients:>3} clients: {result['rate']:8.1f} inserts/s  p50 {result['p50'] * 1000:7.2f} ms  "
+                  f"p99 {result['p99'] * 1000:7.2f} ms{batch_size}")
+    await dispose_engines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="creates per concurrency level")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--owners", type=int, default=10, help="owners the creates are spread over")
+    parser.add_argument("--delays", type=float, nargs="+", default=[0, contacts.CONTACT_GROUP_COMMIT_MAX_DELAY_MS],
+                        help="CONTACT_GROUP_COMMIT_MAX_DELAY_MS values to try")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.requests, args.clients, args.owners, args.delays))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Contact latency while /users/auth is flooded, with and without login admission control.
+
+Boots the app under uvicorn twice against one seeded SQLite file: once with
+login admission effectively off (unbounded concurrency and queue) and once
+with the defaults. Each run measures authenticated contact reads alone, then
+the same reads while logins arrive at --login-rate per second regardless of
+how fast they are answered, and reports read p50/p99 next to how the logins
+were answered. All traffic comes from one address, so the per-address
+bucket is disabled in both runs.
+
+    python -m benchmarks.login_admission --login-rate 50 --seconds 10
+"""
+import argparse
+import asyncio
+import collections
+import os
+import random
+import time
+from typing import Dict, List
+
+from benchmarks.common import use_sqlite_database
+
+use_sqlite_database()
+
+import httpx
+
+from benchmarks.suite import BENCH_PASSWORD, _free_port, _wait_ready, boot_server, percentile, seed
+
+CONFIGURATIONS = {
+    "no admission control": {
+        "LOGIN_MAX_CONCURRENCY": "100000", "LOGIN_QUEUE_SIZE": "100000", "LOGIN_QUEUE_TIMEOUT_SECONDS": "3600",
+        "PASSWORD_HASH_MAX_PENDING": "100000", "LOGIN_FAILURE_RATE": "0",
+    },
+    "admission control (defaults)": {},
+}
+
+
+async def read_contacts(client: httpx.AsyncClient, headers: dict, rows: int, stop: float, readers: int) -> List[float]:
+    latencies: List[float] = []
+    rng = random.Random(1)
+
+    async def reader() -> None:
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            response = await client.get(f"/contacts/{rng.randint(1, rows)}", headers=headers)
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(reader() for _ in range(readers)))
+    return sorted(latencies)
+
+
+async def flood_logins(client: httpx.AsyncClient, rows: int, stop: float, rate: float) -> tuple:
+    """Open-loop logins at `rate` per second until `stop`, like a stuffing tool that never waits for answers."""
+    statuses: Dict[int, int] = collections.Counter()
+    admitted: List[float] = []
+    rng = random.Random(2)
+
+    async def login() -> None:
+        started = time.perf_counter()
+        try:
+            response = await client.post("/users/auth", json={"email": f"user{rng.randint(1, rows)}@bench.example.com", "password": BENCH_PASSWORD})
+        except httpx.HTTPError:
+            statuses[0] += 1
+            return
+        statuses[response.status_code] += 1
+        if response.status_code == 200:
+            admitted.append(time.perf_counter() - started)
+
+    tasks = []
+    while time.monotonic() < stop:
+        tasks.append(asyncio.create_task(login()))
+        await asyncio.sleep(1 / rate)
+    await asyncio.gather(*tasks)
+    return statuses, sorted(admitted)
+
+
+def _summary(latencies: List[float], noun: str = "reads") -> str:
+    if not latencies:
+        return f"no successful {noun}"
+    return f"p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  p99 {percentile(latencies, 0.99) * 1000:7.1f} ms  ({len(latencies)} {noun})"
+
+
+async def run(base_url: str, rows: int, seconds: float, readers: int, login_rate: float, server) -> None:
+    limits = httpx.Limits(max_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        await _wait_ready(client, server)
+        response = await client.post("/users/auth", json={"email": "user1@bench.example.com", "password": BENCH_PASSWORD})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await read_contacts(client, headers, rows, time.monotonic() + 1, readers)
+        quiet = await read_contacts(client, headers, rows, time.monotonic() + seconds, readers)
+        print(f"  contact reads, quiet:       {_summary(quiet)}")
+        stop = time.monotonic() + seconds
+        loud, (statuses, admitted) = await asyncio.gather(
+            read_contacts(client, headers, rows, stop, readers), flood_logins(client, rows, stop, login_rate)
+        )
+        print(f"  contact reads, login flood: {_summary(loud)}")
+        print(f"  logins answered: {dict(sorted(statuses.items()))}")
+        print(f"  successful logins:          {_summary(admitted, 'logins')}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--readers", type=int, default=10)
+    parser.add_argument("--login-rate", type=float, default=50, help="login attempts per second during the flood")
+    args = parser.parse_args()
+
+    seed(args.rows)
+    for label, env in CONFIGURATIONS.items():
+        print(label)
+        saved = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        port = _free_port()
+        server = boot_server(port)
+        try:
+            asyncio.run(run(f"http://127.0.0.1:{port}", args.rows, args.seconds, args.readers, args.login_rate, server))
+        finally:
+            server.terminate()
+            server.wait()
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Per-request cost of the metrics middleware, engine hooks, bcrypt timers and slow-request log.
+
+Runs the same workload in two fresh interpreters, one with METRICS_ENABLED=false,
+SLOW_REQUEST_SECONDS=0 and PROFILE_HEADER empty, one with the defaults, driving the ASGI app directly (no HTTP client in the measurement) on a
+SQLite stand-in: GET /health (no database) and GET /contacts/{id} (one query).
+Reports the mean time per request and the difference.
+
+    python -m benchmarks.metrics_overhead --requests 20000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import ROOT, use_sqlite_database
+
+_PROBE = r"""
+import asyncio, json, sys, time
+from datetime import datetime
+from app.context.main import app
+from app.models import dispose_engines
+from app.utils.auth import create_access_token
+from app.application_services.users.users import principal_cache
+from app.application_services.users.schemas.response import UserResponse
+from benchmarks.export import seed_contacts
+
+requests = int(sys.argv[1])
+now = datetime.now()
+principal_cache.set(1, UserResponse(id=1, username="bench", email="bench@example.com", role="user", is_active=True, created_at=now, updated_at=now))
+token = create_access_token({"sub": "1"})
+seed_contacts(100)
+
+async def call(path, headers):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "server": ("bench", 80), "client": ("127.0.0.1", 1), "headers": headers,
+    }
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+    await app(scope, receive, send)
+
+async def measure(path, headers):
+    for i in range(200):
+        await call(path.format(id=i % 100 + 1), headers)
+    started = time.perf_counter()
+    for i in range(requests):
+        await call(path.format(id=i % 100 + 1), headers)
+    return (time.perf_counter() - started) / requests
+
+async def main():
+    auth = [(b"host", b"bench"), (b"authorization", f"Bearer {token}".encode())]
+    result = {
+        "health": await measure("/health", [(b"host", b"bench")]),
+        "contact": await measure("/contacts/{id}", auth),
+    }
+    await dispose_engines()
+    return result
+
+print(json.dumps(asyncio.run(main())))
+"""
+
+
+def _run(enabled: bool, requests: int) -> dict:
+    env = dict(os.environ, METRICS_ENABLED="true", SLOW_REQUEST_SECONDS="1", PROFILE_HEADER="X-Profile")
+    if not enabled:
+        env.update(METRICS_ENABLED="false", SLOW_REQUEST_SECONDS="0", PROFILE_HEADER="")
+    output = subprocess.run([sys.executable, "-c", _PROBE, str(requests)], cwd=ROOT, env=env, capture_output=True, text=True)
+    if output.returncode:
+        sys.exit(output.stderr)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=3, help="best of N runs per setting")
+    args = parser.parse_args()
+
+    use_sqlite_database()
+    results = {}
+    # Alternate the settings so drift on the machine hits both alike
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            run = _run(enabled, args.requests)
+            best = results.setdefault(enabled, run)
+            for key, value in run.items():
+                best[key] = min(best[key], value)
+
+    for key in ("health", "contact"):
+        off, on = results[False][key] * 1e6, results[True][key] * 1e6
+        print(f"{key:>8}: off {off:7.1f} us  on {on:7.1f} us  overhead {on - off:+6.1f} us ({(on - off) / off * 100:+.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Password verifications per second through the bcrypt worker pool.
+
+Runs the same burst of verify_password_async calls with a thread pool and a
+process pool. With processes, throughput should grow with PASSWORD_HASH_WORKERS
+up to the number of cores.
+
+    python -m benchmarks.password_hashing --logins 64 --workers 4
+"""
+import argparse
+import asyncio
+import time
+
+from app.utils import auth
+
+
+async def _burst(logins: int, hashed: str) -> float:
+    started = time.perf_counter()
+    results = await asyncio.gather(*(auth.verify_password_async("secret", hashed) for _ in range(logins)))
+    assert all(results)
+    return logins / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=auth.PASSWORD_HASH_WORKERS)
+    args = parser.parse_args()
+
+    hashed = auth.get_password_hash("secret")
+    auth.PASSWORD_HASH_WORKERS = args.workers
+    auth.PASSWORD_HASH_MAX_PENDING = args.logins
+    for executor in ("thread", "process"):
+        auth.PASSWORD_HASH_EXECUTOR = executor
+        throughput = asyncio.run(_burst(args.logins, hashed))
+        auth.shutdown_password_executor()
+        print(f"{executor:>8}: {throughput:8.1f} verifications/s ({args.workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
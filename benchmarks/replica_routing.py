@@ -0,0 +1,118 @@
+"""Read-replica routing on SQLite stand-ins.
+
+Migrates and seeds a primary SQLite file, copies it to two "replica" files
+and relabels the contacts in each copy, so every read shows which database
+served it. Replicas are snapshots: nothing written afterwards reaches them,
+which makes replica reads of fresh writes visibly stale. The script checks
+that
+  - GET traffic alternates between the replicas (round_robin),
+  - the lag strategy skips a replica reported too far behind,
+  - a client that just wrote reads from the primary for
+    READ_YOUR_WRITES_SECONDS, while other clients keep reading replicas,
+
+    python -m benchmarks.replica_routing
+"""
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+
+WINDOW_SECONDS = 1.0
+
+directory = tempfile.mkdtemp(prefix="contactnest-replicas-")
+PRIMARY = os.path.join(directory, "primary.db")
+REPLICAS = [os.path.join(directory, f"replica{i}.db") for i in (1, 2)]
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{PRIMARY}")
+os.environ.setdefault("ASYNC_DATABASE_URL", f"sqlite+aiosqlite:///{PRIMARY}")
+os.environ["ASYNC_DATABASE_REPLICA_URLS"] = ",".join(f"sqlite+aiosqlite:///{path}" for path in REPLICAS)
+os.environ["READ_YOUR_WRITES_SECONDS"] = str(WINDOW_SECONDS)
+os.environ.setdefault("PASSWORD_HASH_EXECUTOR", "thread")
+
+from benchmarks.common import migrate
+
+import httpx
+
+from app.context.main import app
+from app.models import Contacts, Users, dispose_engines, get_engine, replica_set
+from app.utils.auth import get_password_hash
+
+
+def seed_and_replicate() -> None:
+    migrate()
+    engine = get_engine()
+    with engine.begin() as connection:
+        connection.execute(Users.__table__.insert(), [
+            {"username": name, "email": f"{name}@example.com", "password": get_password_hash("replica-pass"), "role": "user", "is_active": True}
+            for name in ("alice", "bob")
+        ])
+        # Contact 1 is alice's, contact 2 is bob's
+        connection.execute(Contacts.__table__.insert(), [
+            {"owner_id": owner_id, "name": "primary", "email": "contact@example.com"} for owner_id in (1, 2)
+        ])
+    engine.dispose()
+    # Snapshot the primary into the replicas, then tell the copies apart
+    for index, path in enumerate(REPLICAS, 1):
+        shutil.copyfile(PRIMARY, path)
+        with sqlite3.connect(path) as connection:
+            connection.execute("UPDATE contacts SET name = ?", (f"replica {index}",))
+
+
+async def _login(client: httpx.AsyncClient, name: str) -> dict:
+    response = await client.post("/users/auth", json={"email": f"{name}@example.com", "password": "replica-pass"})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def _name(client: httpx.AsyncClient, headers: dict, contact_id: int) -> str:
+    response = await client.get(f"/contacts/{contact_id}", headers=headers)
+    return response.json()["name"] if response.status_code == 200 else f"<{response.status_code}>"
+
+
+async def main() -> None:
+    try:
+        await check_routing()
+    finally:
+        # aiosqlite connection threads would otherwise keep the interpreter alive
+        await dispose_engines()
+    print("ok")
+
+
+async def check_routing() -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://replicas") as client:
+        # Logins are reads too, so they alternate between the replicas
+        alice = await _login(client, "alice")
+        bob = await _login(client, "bob")
+
+        served = [await _name(client, bob, 2) for _ in range(6)]
+        print(f"round_robin reads:       {served}")
+        assert served == ["replica 1", "replica 2"] * 3, served
+
+        replica_set.strategy = "lag"
+
+        async def fake_probe(connection):
+            return 30.0 if connection.engine.url.database == REPLICAS[1] else 0.0
+
+        replica_set._lag_probe = fake_probe
+        await replica_set.check_lag()
+        served = [await _name(client, bob, 2) for _ in range(4)]
+        print(f"lag reads (replica 2 30s behind): {served}")
+        assert served == ["replica 1"] * 4, served
+        replica_set.strategy = "round_robin"
+
+        response = await client.put("/contacts/1", headers=alice, json={"name": "written", "email": "contact@example.com"})
+        response.raise_for_status()
+        writer_read, other_read = await _name(client, alice, 1), await _name(client, bob, 2)
+        print(f"right after alice wrote: alice sees {writer_read!r}, bob sees {other_read!r}")
+        assert writer_read == "written" and other_read.startswith("replica"), (writer_read, other_read)
+        await asyncio.sleep(WINDOW_SECONDS + 0.1)
+        later_read = await _name(client, alice, 1)
+        print(f"{WINDOW_SECONDS}s later:             alice sees {later_read!r}")
+        assert later_read.startswith("replica"), later_read
+
+
+if __name__ == "__main__":
+    seed_and_replicate()
+    asyncio.run(main())
+    shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,64 @@
+"""Contact search latency over the in-process index at 1M contacts.
+
+Builds ContactSearchIndex from synthetic contacts (no database involved) and
+reports p50/p99 latency of name, email-prefix and phone queries. On MySQL the
+same queries go to the FULLTEXT index instead.
+
+    python -m benchmarks.search --rows 1000000 --queries 2000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.application_services.contacts.search import ContactSearchIndex
+
+FIRST_NAMES = ["james", "mary", "john", "patricia", "robert", "jennifer", "michael", "linda", "david", "elizabeth",
+               "william", "barbara", "richard", "susan", "joseph", "jessica", "thomas", "sarah", "charles", "karen"]
+LAST_NAMES = ["smith", "johnson", "williams", "brown", "jones", "garcia", "miller", "davis", "rodriguez", "martinez",
+              "hernandez", "lopez", "gonzalez", "wilson", "anderson", "thomas", "taylor", "moore", "jackson", "martin"]
+
+
+def synthetic_contact(i: int, rng: random.Random) -> tuple:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    # A thousand owners; the benchmark searches across all of them
+    return i, i % 1000 + 1, f"{first.title()} {last.title()} {i}", f"{first}.{last}{i}@example.com", f"+1 555 {i:07d}"
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    index = ContactSearchIndex()
+    started = time.perf_counter()
+    for i in range(1, args.rows + 1):
+        index.add(*synthetic_contact(i, rng))
+    index.finish_build()
+    print(f"indexed {len(index)} contacts in {time.perf_counter() - started:.1f}s")
+
+    query_kinds = {
+        "name": lambda: f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)[:4]}",
+        "email prefix": lambda: f"{rng.choice(FIRST_NAMES)}.{rng.choice(LAST_NAMES)}{rng.randint(1, args.rows)}"[:-1],
+        "phone": lambda: f"+1 555 {rng.randint(1, args.rows):07d}",
+    }
+    for kind, make_query in query_kinds.items():
+        latencies = []
+        for _ in range(args.queries):
+            query = make_query()
+            started = time.perf_counter()
+            index.search(query, args.limit)
+            latencies.append((time.perf_counter() - started) * 1000)
+        print(f"{kind:>12}: p50 {statistics.median(latencies):7.2f} ms  p99 {percentile(latencies, 0.99):7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
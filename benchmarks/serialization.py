@@ -0,0 +1,68 @@
+"""Rows/s of the ORM read path vs. the column-select fast path for list payloads.
+
+orm:  hydrate Contacts entities, ContactResponse.from_domain per row, then the
+      validate + jsonable_encoder + json.dumps round FastAPI runs for response_model
+fast: select plain columns and dump them in one pass with CONTACT_PAGE_ADAPTER
+
+    python -m benchmarks.serialization --rows 10000 --repeat 5
+"""
+import argparse
+import json
+import time
+from typing import List
+
+from benchmarks.common import use_sqlite_database
+
+use_sqlite_database()
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.application_services.contacts.contacts import CONTACT_COLUMNS
+from app.application_services.contacts.schemas.response import ContactResponse, ContactPageResponse, CONTACT_PAGE_ADAPTER
+from app.models import Contacts, get_engine
+from benchmarks.export import seed_contacts
+
+_PAGE_RESPONSE = TypeAdapter(ContactPageResponse)
+
+
+def orm_path(rows: int) -> bytes:
+    with Session(get_engine()) as db:
+        contacts = db.execute(select(Contacts).limit(rows)).scalars().all()
+        page = ContactPageResponse(items=[ContactResponse.from_domain(contact) for contact in contacts], next_cursor=None)
+        validated = _PAGE_RESPONSE.validate_python(page.model_dump())
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def fast_path(rows: int) -> bytes:
+    with get_engine().connect() as connection:
+        result = connection.execute(select(*CONTACT_COLUMNS).limit(rows)).all()
+        return CONTACT_PAGE_ADAPTER.dump_json({"items": [row._asdict() for row in result], "next_cursor": None})
+
+
+def measure(path, rows: int, repeat: int) -> List[float]:
+    path(rows)
+    rates = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        path(rows)
+        rates.append(rows / (time.perf_counter() - started))
+    return rates
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    seed_contacts(args.rows)
+    for name, path in (("orm", orm_path), ("fast", fast_path)):
+        rates = measure(path, args.rows, args.repeat)
+        print(f"{name:>5}: {max(rates):10.0f} rows/s (best of {args.repeat}, {args.rows} rows)")
+
+
+if __name__ == "__main__":
+    main()
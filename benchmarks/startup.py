@@ -0,0 +1,69 @@
+"""Import-to-ready time of the API.
+
+Each run starts a fresh interpreter that imports app.context.main, runs the
+ASGI lifespan startup and answers GET /health, and reports the time spent in
+each step. With --unreachable the database points at a closed port: import
+and startup must still succeed, since nothing connects until a request needs
+the database.
+
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --runs 10 --unreachable
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import ROOT, use_sqlite_database
+
+_PROBE = r"""
+import asyncio, json, time
+started = time.perf_counter()
+from app.context.main import app
+imported = time.perf_counter()
+
+async def main():
+    import httpx
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            response = await client.get("/health")
+        response.raise_for_status()
+        served = time.perf_counter()
+    return ready, served
+
+ready, served = asyncio.run(main())
+print(json.dumps({"import": imported - started, "ready": ready - started, "first_response": served - started}))
+"""
+
+
+def _run_once(env: dict) -> dict:
+    output = subprocess.run([sys.executable, "-c", _PROBE], cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--unreachable", action="store_true", help="point the app at a database that refuses connections")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.unreachable:
+        for name in ("DATABASE_URL", "ASYNC_DATABASE_URL"):
+            env.pop(name, None)
+        env.update(DB_HOST="127.0.0.1", DB_PORT="1")
+    else:
+        use_sqlite_database()
+        env.update(DATABASE_URL=os.environ["DATABASE_URL"], ASYNC_DATABASE_URL=os.environ["ASYNC_DATABASE_URL"])
+
+    runs = [_run_once(env) for _ in range(args.runs)]
+    for step in ("import", "ready", "first_response"):
+        values = sorted(run[step] for run in runs)
+        print(f"{step:>15}: p50 {statistics.median(values) * 1000:7.1f} ms  max {values[-1] * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
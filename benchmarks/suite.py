@@ -0,0 +1,344 @@
+"""End-to-end benchmark suite with a stored baseline.
+
+Seeds a database with --rows synthetic contacts and as many users, boots
+app.context.main:app under uvicorn against it and drives it over HTTP with
+--concurrency clients. For each scenario (login, get_current_user, contact
+create/read/update/delete, list, search) it records throughput and p50/p99
+latency, writes them to --output as JSON and, given --baseline, fails with
+exit code 1 when p99 latency grew or throughput fell by more than the
+thresholds. Baselines are machine-specific: record one per machine and
+database with --save-baseline.
+
+    python -m benchmarks.suite --rows 10000 --output results.json --baseline benchmarks/baselines/sqlite-10k.json
+    python -m benchmarks.suite --rows 100000 --sqlite-path /tmp/bench-100k.db      # seeded once, reused
+    python -m benchmarks.suite --rows 1000000 \\
+        --database-url "mysql+pymysql://root:pw@localhost/bench" --async-database-url "mysql+aiomysql://root:pw@localhost/bench"
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.common import ROOT, migrate
+
+BENCH_PASSWORD = "bench-password"
+# Requests per scenario at --scale 1; login is bcrypt-bound and kept short
+SCENARIO_REQUESTS = {
+    "login": 100,
+    "get_current_user": 2000,
+    "contact_create": 1000,
+    "contact_read": 2000,
+    "contact_update": 1000,
+    "contact_delete": 1000,
+    "list": 1000,
+    "search": 1000,
+    "lookup": 1000,
+}
+
+
+def _configure_database(args) -> str:
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+        os.environ["ASYNC_DATABASE_URL"] = args.async_database_url
+        return args.database_url
+    path = args.sqlite_path or os.path.join(tempfile.mkdtemp(prefix="contactnest-suite-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    return os.environ["DATABASE_URL"]
+
+
+def seed(rows: int, batch: int = 10_000) -> float:
+    """Insert `rows` contacts and `rows` users unless the database already holds exactly that; returns seconds spent."""
+    from sqlalchemy import func, insert, select
+    from app.models import Contacts, Users, get_engine
+    from app.utils.auth import get_password_hash
+    from benchmarks.search import synthetic_contact
+
+    engine = get_engine()
+    with engine.connect() as connection:
+        contacts = connection.scalar(select(func.count()).select_from(Contacts))
+        users = connection.scalar(select(func.count()).select_from(Users))
+    if contacts == rows and users == rows:
+        return 0.0
+    if contacts or users:
+        sys.exit(f"database holds {contacts} contacts and {users} users, expected 0 or {rows}; use a fresh database")
+
+    started = time.perf_counter()
+    rng = random.Random(42)
+    # One bcrypt hash shared by every seeded user; hashing a million passwords would take hours
+    password = get_password_hash(BENCH_PASSWORD)
+    epoch = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    with engine.begin() as connection:
+        for start in range(1, rows + 1, batch):
+            stop = min(start + batch, rows + 1)
+            stamps = [epoch + timedelta(seconds=i) for i in range(start, stop)]
+            connection.execute(insert(Contacts), [
+                # All owned by user1, the user the scenarios run as, so they cover the whole table
+                {"owner_id": 1, "name": name, "email": email, "phone": phone, "created_at": stamp, "updated_at": stamp}
+                for (_, _, name, email, phone), stamp in zip((synthetic_contact(i, rng) for i in range(start, stop)), stamps)
+            ])
+            connection.execute(insert(Users), [
+                {"username": f"user{i}", "email": f"user{i}@bench.example.com", "password": password, "role": "user",
+                 "is_active": True, "created_at": stamp, "updated_at": stamp}
+                for i, stamp in zip(range(start, stop), stamps)
+            ])
+    engine.dispose()
+    return time.perf_counter() - started
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def boot_server(port: int) -> subprocess.Popen:
+    command = [sys.executable, "-m", "uvicorn", "app.context.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    env = dict(os.environ)
+    # Every benchmark login comes from one address; keep the per-address login limit out of the measurement
+    env.setdefault("LOGIN_IP_RATE", "0")
+    return subprocess.Popen(command, cwd=ROOT, env=env)
+
+
+async def _wait_ready(client, server: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit("server exited during startup")
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.1)
+    sys.exit("server did not become ready")
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_scenario(requests: int, concurrency: int, call: Callable[[int], Awaitable[None]]) -> dict:
+    """Issue `requests` calls from `concurrency` workers; each call gets its sequence number."""
+    latencies: List[float] = []
+    errors = 0
+    sequence = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in sequence:
+            started = time.perf_counter()
+            try:
+                await call(i)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+    }
+
+
+def _checked(response) -> None:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path}: {response.status_code}")
+
+
+async def run_suite(base_url: str, rows: int, concurrency: int, login_concurrency: int, scale: float, only: Optional[List[str]], server=None) -> Dict[str, dict]:
+    import httpx
+    from benchmarks.search import FIRST_NAMES, LAST_NAMES
+
+    rng = random.Random(7)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        if server is not None:
+            await _wait_ready(client, server)
+        response = await client.post("/users/auth", json={"email": "user1@bench.example.com", "password": BENCH_PASSWORD})
+        _checked(response)
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        created: List[int] = []
+        cursors: List[Optional[str]] = [None] * concurrency
+
+        async def login(i):
+            user = rng.randint(1, rows)
+            _checked(await client.post("/users/auth", json={"email": f"user{user}@bench.example.com", "password": BENCH_PASSWORD}))
+
+        async def get_current_user(i):
+            _checked(await client.get("/users/profile", headers=headers))
+
+        async def contact_create(i):
+            response = await client.post("/contacts/", headers=headers, json={"name": f"Bench Contact {i}", "email": f"bench{i}@example.com", "phone": f"+1 555 {i:07d}"})
+            _checked(response)
+            created.append(response.json()["id"])
+
+        async def contact_read(i):
+            _checked(await client.get(f"/contacts/{rng.randint(1, rows)}", headers=headers))
+
+        async def contact_update(i):
+            contact_id = rng.randint(1, rows)
+            _checked(await client.put(f"/contacts/{contact_id}", headers=headers, json={"name": f"Updated Contact {contact_id}", "email": f"updated{contact_id}@example.com"}))
+
+        async def contact_delete(i):
+            # Deletes the contacts contact_create made, so the seeded table stays as it was
+            if i < len(created):
+                _checked(await client.delete(f"/contacts/{created[i]}", headers=headers))
+
+        async def list_page(i):
+            # Each worker walks forward through the listing, starting over at the end
+            slot = i % concurrency
+            params = {"limit": 20}
+            if cursors[slot]:
+                params["cursor"] = cursors[slot]
+            response = await client.get("/contacts/", headers=headers, params=params)
+            _checked(response)
+            cursors[slot] = response.json()["next_cursor"]
+
+        async def search(i):
+            query = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)[:4]}"
+            _checked(await client.get("/contacts/search", headers=headers, params={"query": query}))
+
+        async def lookup(i):
+            # Seeded contact i has phone "+1 555 <i>"; the lookup asks for the bare digits
+            _checked(await client.get("/contacts/lookup", headers=headers, params={"phone": f"1555{rng.randint(1, rows):07d}"}))
+
+        scenarios = {
+            "login": login,
+            "get_current_user": get_current_user,
+            "contact_create": contact_create,
+            "contact_read": contact_read,
+            "contact_update": contact_update,
+            "contact_delete": contact_delete,
+            "list": list_page,
+            "search": search,
+            "lookup": lookup,
+        }
+        results = {}
+        for name, call in scenarios.items():
+            if only and name not in only:
+                continue
+            requests = max(1, int(SCENARIO_REQUESTS[name] * scale))
+            clients = login_concurrency if name == "login" else concurrency
+            if name == "contact_delete":
+                requests = min(requests, len(created))
+            elif name != "contact_create":
+                # Untimed warm-up: connections, caches and the in-process search index
+                await run_scenario(min(requests, clients * 2), clients, call)
+            results[name] = await run_scenario(requests, clients, call)
+            print(f"{name:>17}: {results[name]['throughput_rps']:9.1f} req/s  p50 {results[name]['p50_ms']} ms  "
+                  f"p99 {results[name]['p99_ms']} ms  errors {results[name]['errors']}")
+        return results
+
+
+def compare(results: dict, baseline: dict, max_latency_regression: float, max_throughput_regression: float) -> List[str]:
+    """Scenarios whose p99 grew or whose throughput fell past the thresholds (fractions of the baseline)."""
+    if baseline["meta"]["rows"] != results["meta"]["rows"]:
+        print(f"warning: baseline was recorded at {baseline['meta']['rows']} rows, this run used {results['meta']['rows']}")
+    regressions = []
+    print(f"\n{'scenario':>17}  {'p99 ms':>9} {'baseline':>9} {'change':>8}  {'req/s':>9} {'baseline':>9} {'change':>8}")
+    for name, current in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if not previous or not previous.get("p99_ms") or not current.get("p99_ms"):
+            continue
+        latency_change = current["p99_ms"] / previous["p99_ms"] - 1
+        throughput_change = current["throughput_rps"] / previous["throughput_rps"] - 1 if previous["throughput_rps"] else 0.0
+        failed = latency_change > max_latency_regression or -throughput_change > max_throughput_regression or current["errors"] > previous["errors"]
+        if failed:
+            regressions.append(name)
+        print(f"{name:>17}  {current['p99_ms']:9.2f} {previous['p99_ms']:9.2f} {latency_change:+8.1%}  "
+              f"{current['throughput_rps']:9.1f} {previous['throughput_rps']:9.1f} {throughput_change:+8.1%}  {'REGRESSION' if failed else 'ok'}")
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000, help="seeded contacts and users, e.g. 10000, 100000, 1000000")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--login-concurrency", type=int, default=2,
+                        help="clients for the bcrypt-bound login scenario; above PASSWORD_HASH_MAX_PENDING logins are refused with 503")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for the requests per scenario")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIO_REQUESTS), help="run only these (repeatable)")
+    parser.add_argument("--sqlite-path", help="SQLite file to seed once and reuse across runs")
+    parser.add_argument("--database-url", help="sync SQLAlchemy URL of a MySQL stand-in (used for migrations and seeding)")
+    parser.add_argument("--async-database-url", help="async URL of the same database, used by the app")
+    parser.add_argument("--url", help="benchmark an already running server instead of booting one (seed it first)")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    parser.add_argument("--save-baseline", help="also write the results here, to serve as the next baseline")
+    parser.add_argument("--max-latency-regression", type=float, default=0.25, help="allowed p99 growth, as a fraction")
+    parser.add_argument("--max-throughput-regression", type=float, default=0.20, help="allowed throughput drop, as a fraction")
+    args = parser.parse_args()
+    if args.database_url and not args.async_database_url:
+        parser.error("--database-url needs --async-database-url")
+
+    database_url = _configure_database(args)
+    migrate()
+    seeded = seed(args.rows)
+    print(f"seeded {args.rows} contacts and users in {seeded:.1f}s" if seeded else f"reusing {args.rows} seeded rows")
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        port = _free_port()
+        server = boot_server(port)
+        base_url = f"http://127.0.0.1:{port}"
+    try:
+        scenarios = asyncio.run(run_suite(base_url, args.rows, args.concurrency, args.login_concurrency, args.scale, args.scenario, server))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    results = {
+        "meta": {
+            "rows": args.rows,
+            "concurrency": args.concurrency,
+            "login_concurrency": args.login_concurrency,
+            "scale": args.scale,
+            "database": database_url.split(":", 1)[0],
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.node(),
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "scenarios": scenarios,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_latency_regression, args.max_throughput_regression)
+        if regressions:
+            sys.exit(f"regressions: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
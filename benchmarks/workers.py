@@ -0,0 +1,112 @@
+"""Requests/s of python -m app.context.server at 1, 2, 4, ... workers.
+
+Seeds --rows contacts, then for each worker count boots the server against
+them and drives it for --seconds with --client-processes load generators of
+--connections keep-alive connections each, all fetching contact pages as
+user1. The load generators are separate processes so the client side scales
+with the cores too; they share the machine with the server, so on N cores
+expect the server to plateau below N workers' worth. Compare the rows
+against the single-worker row: close to linear means the workers share
+nothing but the database.
+
+    python -m benchmarks.workers --rows 10000 --workers 1 2 4 --seconds 10
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import ROOT, migrate
+from benchmarks.suite import _free_port, percentile, seed
+
+
+def _generate_load(base_url: str, token: str, connections: int, seconds: float) -> list:
+    import httpx
+
+    async def connection(client: httpx.AsyncClient, deadline: float, latencies: list) -> None:
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = await client.get("/contacts/", params={"limit": 20})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    async def run() -> list:
+        latencies = []
+        limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+        async with httpx.AsyncClient(base_url=base_url, headers={"Authorization": f"Bearer {token}"}, limits=limits, timeout=30) as client:
+            deadline = time.monotonic() + seconds
+            await asyncio.gather(*(connection(client, deadline, latencies) for _ in range(connections)))
+        return latencies
+
+    return asyncio.run(run())
+
+
+def measure(workers: int, client_processes: int, connections: int, seconds: float, token: str) -> dict:
+    port = _free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}", LOG_LEVEL="WARNING")
+    server = subprocess.Popen([sys.executable, "-m", "app.context.server"], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        _wait_healthy(base_url, server)
+        with multiprocessing.Pool(client_processes) as pool:
+            # A short warm-up fills every worker's pools and caches
+            pool.starmap(_generate_load, [(base_url, token, connections, 1.0)] * client_processes)
+            started = time.perf_counter()
+            results = pool.starmap(_generate_load, [(base_url, token, connections, seconds)] * client_processes)
+            elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+    latencies = sorted(latency for result in results for latency in result)
+    return {"rate": len(latencies) / elapsed, "p50": percentile(latencies, 0.5), "p99": percentile(latencies, 0.99)}
+
+
+def _wait_healthy(base_url: str, server: subprocess.Popen, timeout: float = 60.0) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit("server exited during startup")
+        try:
+            if httpx.get(base_url + "/ready").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    sys.exit("server did not become ready")
+
+
+def main() -> None:
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, cores}))
+    parser.add_argument("--client-processes", type=int, default=cores)
+    parser.add_argument("--connections", type=int, default=16, help="keep-alive connections per load generator")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="contactnest-workers-"), "bench.db")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{path}")
+    os.environ.setdefault("ASYNC_DATABASE_URL", f"sqlite+aiosqlite:///{path}")
+    migrate()
+    seed(args.rows)
+    from app.utils.auth import create_access_token
+    token = create_access_token({"sub": "1"})
+
+    print(f"{cores} cores, {args.client_processes} load generators x {args.connections} connections")
+    single = None
+    for workers in args.workers:
+        result = measure(workers, args.client_processes, args.connections, args.seconds, token)
+        single = single or result["rate"]
+        print(f"  {workers:>2} workers: {result['rate']:8.1f} req/s  ({result['rate'] / single:4.2f}x)  "
+              f"p50 {result['p50'] * 1000:7.2f} ms  p99 {result['p99'] * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
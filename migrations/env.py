@@ -0,0 +1,51 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.models import Base, SQLALCHEMY_DATABASE_URL, get_engine
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Indexes declared with .ddl_if(dialect=...) (the MySQL FULLTEXT index) do not exist elsewhere
+    ddl_if = getattr(object, "_ddl_if", None)
+    if type_ == "index" and not reflected and ddl_if is not None and ddl_if.dialect:
+        return context.get_context().dialect.name == ddl_if.dialect
+    return True
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL without connecting (`alembic upgrade head --sql`)."""
+    context.configure(
+        url=SQLALCHEMY_DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    with get_engine().connect() as connection:
+        # SQLite cannot ALTER most things in place; batch mode recreates the table instead
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == "sqlite",
+            include_object=include_object,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
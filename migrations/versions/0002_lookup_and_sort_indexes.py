@@ -0,0 +1,56 @@
+"""Indexes for every lookup and sort order the services use; microsecond contact timestamps
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset pagination over active users, see app/utils/pagination.py
+    op.create_index("ix_users_active_id", "users", ["is_active", "id"])
+    op.create_index("ix_users_active_username_id", "users", ["is_active", "username", "id"])
+    op.create_index("ix_users_active_created_at_id", "users", ["is_active", "created_at", "id"])
+
+    op.create_index("ix_contacts_name_id", "contacts", ["name", "id"])
+    op.create_index("ix_contacts_created_at_id", "contacts", ["created_at", "id"])
+    op.create_index("ix_contacts_email", "contacts", ["email"])
+    op.create_index("ix_contacts_updated_at", "contacts", ["updated_at"])
+
+    if op.get_bind().dialect.name == "mysql":
+        # ETags are derived from updated_at, so keep microseconds
+        for column in ("created_at", "updated_at"):
+            op.alter_column("contacts", column, type_=mysql.DATETIME(fsp=6), existing_type=mysql.DATETIME(), existing_nullable=False)
+        op.create_index(
+            "ix_contacts_search", "contacts", ["name", "email", "phone"], mysql_prefix="FULLTEXT", mysql_with_parser="ngram"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "mysql":
+        op.drop_index("ix_contacts_search", table_name="contacts")
+        for column in ("created_at", "updated_at"):
+            op.alter_column("contacts", column, type_=mysql.DATETIME(), existing_type=mysql.DATETIME(fsp=6), existing_nullable=False)
+
+    op.drop_index("ix_contacts_updated_at", table_name="contacts")
+    op.drop_index("ix_contacts_email", table_name="contacts")
+    op.drop_index("ix_contacts_created_at_id", table_name="contacts")
+    op.drop_index("ix_contacts_name_id", table_name="contacts")
+
+    op.drop_index("ix_users_active_created_at_id", table_name="users")
+    op.drop_index("ix_users_active_username_id", table_name="users")
+    op.drop_index("ix_users_active_id", table_name="users")
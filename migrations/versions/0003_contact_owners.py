@@ -0,0 +1,60 @@
+"""Contacts belong to an owner; owner-leading indexes; id blocks for sharded contacts
+
+Existing contacts were shared by everyone; they go to the first admin (or,
+without one, the first user).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("contacts", sa.Column("owner_id", sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE contacts SET owner_id = COALESCE("
+        "(SELECT MIN(id) FROM users WHERE role = 'admin'), (SELECT MIN(id) FROM users), 0)"
+    )
+    with op.batch_alter_table("contacts") as batch_op:
+        batch_op.alter_column("owner_id", existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_index("ix_contacts_email")
+        batch_op.create_index("ix_contacts_owner_id_id", ["owner_id", "id"])
+        batch_op.create_index("ix_contacts_owner_name_id", ["owner_id", "name", "id"])
+        batch_op.create_index("ix_contacts_owner_created_at_id", ["owner_id", "created_at", "id"])
+        batch_op.create_index("ix_contacts_owner_email", ["owner_id", "email"])
+        batch_op.create_index("ix_contacts_owner_updated_at", ["owner_id", "updated_at"])
+
+    op.create_table(
+        "id_blocks",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("next_value", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    # Sharded contact ids continue after the ones this database handed out
+    op.execute("INSERT INTO id_blocks (name, next_value) SELECT 'contacts', COALESCE(MAX(id), 0) + 1 FROM contacts")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("id_blocks")
+    with op.batch_alter_table("contacts") as batch_op:
+        batch_op.drop_index("ix_contacts_owner_updated_at")
+        batch_op.drop_index("ix_contacts_owner_email")
+        batch_op.drop_index("ix_contacts_owner_created_at_id")
+        batch_op.drop_index("ix_contacts_owner_name_id")
+        batch_op.drop_index("ix_contacts_owner_id_id")
+        batch_op.create_index("ix_contacts_email", ["email"])
+        batch_op.drop_column("owner_id")
@@ -0,0 +1,66 @@
+"""Duplicate-detection keys, near-match pairs and scan state
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PreciseDateTime = sa.DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "contact_match_keys",
+        sa.Column("contact_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("email_key", sa.String(length=255), nullable=False),
+        sa.Column("phone_key", sa.String(length=20), nullable=True),
+        sa.Column("name_key", sa.String(length=20), nullable=False),
+        sa.PrimaryKeyConstraint("contact_id"),
+    )
+    op.create_index("ix_contact_match_keys_owner_email", "contact_match_keys", ["owner_id", "email_key"])
+    op.create_index("ix_contact_match_keys_owner_phone", "contact_match_keys", ["owner_id", "phone_key"])
+    op.create_index("ix_contact_match_keys_owner_name", "contact_match_keys", ["owner_id", "name_key"])
+    op.create_table(
+        "contact_near_matches",
+        sa.Column("contact_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("match_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("contact_id", "match_id"),
+    )
+    op.create_index("ix_contact_near_matches_owner_id", "contact_near_matches", ["owner_id"])
+    op.create_index("ix_contact_near_matches_match_id", "contact_near_matches", ["match_id"])
+    op.create_table(
+        "contact_dedup_state",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("watermark", PreciseDateTime, nullable=True),
+        sa.Column("scanned_at", PreciseDateTime, nullable=True),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("contact_dedup_state")
+    op.drop_index("ix_contact_near_matches_match_id", table_name="contact_near_matches")
+    op.drop_index("ix_contact_near_matches_owner_id", table_name="contact_near_matches")
+    op.drop_table("contact_near_matches")
+    op.drop_index("ix_contact_match_keys_owner_name", table_name="contact_match_keys")
+    op.drop_index("ix_contact_match_keys_owner_phone", table_name="contact_match_keys")
+    op.drop_index("ix_contact_match_keys_owner_email", table_name="contact_match_keys")
+    op.drop_table("contact_match_keys")
@@ -0,0 +1,60 @@
+"""Normalized email and phone columns for exact contact lookups
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.normalize import email_key, phone_key
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_CHUNK_ROWS = 5000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("contacts", sa.Column("email_normalized", sa.String(length=255), nullable=True))
+    op.add_column("contacts", sa.Column("phone_normalized", sa.String(length=20), nullable=True))
+    # The normal forms are computed in Python, so the lookup matches what the app writes on every database
+    contacts = sa.table("contacts", sa.column("id"), sa.column("email"), sa.column("phone"),
+                        sa.column("email_normalized"), sa.column("phone_normalized"))
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(contacts.c.id, contacts.c.email, contacts.c.phone)
+            .where(contacts.c.id > last_id).order_by(contacts.c.id).limit(BACKFILL_CHUNK_ROWS)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            contacts.update().where(contacts.c.id == sa.bindparam("row_id")),
+            [{"row_id": row.id, "email_normalized": email_key(row.email), "phone_normalized": phone_key(row.phone)} for row in rows],
+        )
+        last_id = rows[-1].id
+    with op.batch_alter_table("contacts") as batch_op:
+        batch_op.alter_column("email_normalized", existing_type=sa.String(length=255), nullable=False)
+        batch_op.drop_index("ix_contacts_owner_email")
+        batch_op.create_index("ix_contacts_owner_email_normalized", ["owner_id", "email_normalized"])
+        batch_op.create_index("ix_contacts_owner_phone_normalized", ["owner_id", "phone_normalized"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("contacts") as batch_op:
+        batch_op.drop_index("ix_contacts_owner_phone_normalized")
+        batch_op.drop_index("ix_contacts_owner_email_normalized")
+        batch_op.create_index("ix_contacts_owner_email", ["owner_id", "email"])
+        batch_op.drop_column("phone_normalized")
+        batch_op.drop_column("email_normalized")
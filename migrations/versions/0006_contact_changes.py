@@ -0,0 +1,51 @@
+"""Contact change log and per-owner feed state for incremental sync
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PreciseDateTime = sa.DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
+ChangeSequence = sa.BigInteger().with_variant(sa.Integer(), "sqlite")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "contact_changes",
+        sa.Column("seq", ChangeSequence, autoincrement=True, nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("contact_id", sa.Integer(), nullable=False),
+        sa.Column("op", sa.String(length=6), nullable=False),
+        sa.Column("changed_at", PreciseDateTime, nullable=False),
+        sa.PrimaryKeyConstraint("seq"),
+    )
+    op.create_index("ix_contact_changes_owner_seq", "contact_changes", ["owner_id", "seq"])
+    op.create_index("ix_contact_changes_changed_at", "contact_changes", ["changed_at"])
+    op.create_table(
+        "contact_feeds",
+        sa.Column("owner_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("pruned_seq", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("owner_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("contact_feeds")
+    op.drop_index("ix_contact_changes_changed_at", table_name="contact_changes")
+    op.drop_index("ix_contact_changes_owner_seq", table_name="contact_changes")
+    op.drop_table("contact_changes")
@@ -0,0 +1,86 @@
+"""Cached contact and user counts, contacts created per day
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PreciseDateTime = sa.DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("contact_feeds") as batch_op:
+        batch_op.add_column(sa.Column("contact_count", sa.BigInteger(), server_default="0", nullable=False))
+        batch_op.add_column(sa.Column("counted_at", PreciseDateTime, nullable=True))
+    op.create_table(
+        "contact_daily_counts",
+        sa.Column("owner_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("created", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("owner_id", "day"),
+    )
+    op.create_index("ix_contact_daily_counts_day", "contact_daily_counts", ["day"])
+    op.create_table(
+        "stat_counters",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("value", sa.BigInteger(), nullable=False),
+        sa.Column("counted_at", PreciseDateTime, nullable=True),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+    # Backfill: one GROUP BY per table, on the owner-leading and is_active-leading indexes
+    bind = op.get_bind()
+    now = datetime.now(timezone.utc)
+    contacts = sa.table("contacts", sa.column("owner_id"), sa.column("created_at"))
+    feeds = sa.table("contact_feeds", sa.column("owner_id"), sa.column("pruned_seq"), sa.column("contact_count"), sa.column("counted_at"))
+    counts = dict(bind.execute(sa.select(contacts.c.owner_id, sa.func.count()).group_by(contacts.c.owner_id)).all())
+    existing = set(bind.execute(sa.select(feeds.c.owner_id)).scalars())
+    for owner_id in existing:
+        bind.execute(feeds.update().where(feeds.c.owner_id == owner_id).values(contact_count=counts.get(owner_id, 0), counted_at=now))
+    missing = [{"owner_id": owner_id, "pruned_seq": 0, "contact_count": count, "counted_at": now} for owner_id, count in counts.items() if owner_id not in existing]
+    if missing:
+        bind.execute(feeds.insert(), missing)
+
+    day = sa.func.date(contacts.c.created_at)
+    daily = bind.execute(sa.select(contacts.c.owner_id, day, sa.func.count()).group_by(contacts.c.owner_id, day)).all()
+    if daily:
+        daily_counts = sa.table("contact_daily_counts", sa.column("owner_id"), sa.column("day", sa.Date()), sa.column("created"))
+        bind.execute(daily_counts.insert(), [
+            # SQLite's DATE() returns text
+            {"owner_id": owner_id, "day": value if not isinstance(value, str) else datetime.strptime(value, "%Y-%m-%d").date(), "created": count}
+            for owner_id, value, count in daily
+        ])
+
+    users = sa.table("users", sa.column("is_active"))
+    by_state = dict(bind.execute(sa.select(users.c.is_active, sa.func.count()).group_by(users.c.is_active)).all())
+    counters = sa.table("stat_counters", sa.column("name"), sa.column("value"), sa.column("counted_at"))
+    bind.execute(counters.insert(), [
+        # True == 1 as a dict key, so this holds whether the driver returns booleans or integers
+        {"name": "users_active", "value": by_state.get(True, 0), "counted_at": now},
+        {"name": "users_inactive", "value": by_state.get(False, 0), "counted_at": now},
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("stat_counters")
+    op.drop_index("ix_contact_daily_counts_day", table_name="contact_daily_counts")
+    op.drop_table("contact_daily_counts")
+    with op.batch_alter_table("contact_feeds") as batch_op:
+        batch_op.drop_column("counted_at")
+        batch_op.drop_column("contact_count")
@@ -0,0 +1,34 @@
+"""Cache generations polled by workers to keep in-process caches coherent
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "cache_generations",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("generation", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    op.execute("INSERT INTO cache_generations (name, generation) VALUES ('principals', 0)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("cache_generations")
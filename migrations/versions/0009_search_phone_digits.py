@@ -0,0 +1,36 @@
+"""Contact search FULLTEXT index over phone digits instead of the formatted phone
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, Sequence[str], None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "mysql":
+        # The ngram parser splits "+1 (555) 010-0199" at the punctuation; the digits-only column matches any run of digits
+        op.drop_index("ix_contacts_search", table_name="contacts")
+        op.create_index(
+            "ix_contacts_search", "contacts", ["name", "email", "phone_normalized"], mysql_prefix="FULLTEXT", mysql_with_parser="ngram"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "mysql":
+        op.drop_index("ix_contacts_search", table_name="contacts")
+        op.create_index(
+            "ix_contacts_search", "contacts", ["name", "email", "phone"], mysql_prefix="FULLTEXT", mysql_with_parser="ngram"
+        )
@@ -0,0 +1,34 @@
+"""Per-generation cache invalidations, so workers evict single entries
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, Sequence[str], None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "cache_invalidations",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("generation", sa.BigInteger(), nullable=False),
+        sa.Column("entry_key", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("name", "generation"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("cache_invalidations")
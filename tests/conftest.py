@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+import pytest
+
+# The app reads its configuration at import, so point it at a throwaway SQLite file before any test imports it
+_path = os.path.join(tempfile.mkdtemp(prefix="contactnest-test-"), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_path}"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{_path}"
+os.environ.setdefault("PASSWORD_HASH_EXECUTOR", "thread")
+os.environ.setdefault("SLOW_REQUEST_SECONDS", "0")
+# Bursts of logins wait for a verification slot instead of being turned away with 503
+os.environ.setdefault("LOGIN_QUEUE_SIZE", "100")
+os.environ.setdefault("LOGIN_QUEUE_TIMEOUT_SECONDS", "30")
+
+from benchmarks.common import migrate
+
+migrate()
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db_engines():
+    """Disposes the engines after the test: pooled aiosqlite connections belong to the test's event loop."""
+    from app.models import dispose_engines
+    yield
+    await dispose_engines()
+
+
+@pytest.fixture
+async def client(db_engines):
+    import httpx
+    from app.context.main import app
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def login():
+    """Headers for a user id, with the principal cached so no users row is needed; use an id no other test uses."""
+    from datetime import datetime
+    from app.application_services.users.schemas.response import UserResponse
+    from app.application_services.users.users import principal_cache
+    from app.utils.auth import create_access_token
+
+    def login(user_id: int, role: str = "user") -> dict:
+        now = datetime.now()
+        principal_cache.set(user_id, UserResponse(
+            id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com", role=role, is_active=True, created_at=now, updated_at=now))
+        return {"Authorization": "Bearer " + create_access_token({"sub": str(user_id), "role": role})}
+
+    return login
@@ -0,0 +1,23 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_all_owners_listing_rejects_the_name_sort(client, login):
+    headers = login(201, role="admin")
+    response = await client.get("/contacts/", params={"all_owners": "true", "sort": "name"}, headers=headers)
+    assert response.status_code == 400
+    for sort in ("id", "created_at"):
+        response = await client.get("/contacts/", params={"all_owners": "true", "sort": sort}, headers=headers)
+        assert response.status_code == 200
+    assert (await client.get("/contacts/", params={"sort": "name"}, headers=headers)).status_code == 200
+
+
+async def test_all_owners_total_follows_creates_and_deletes(client, login):
+    admin, owner = login(202, role="admin"), login(203)
+    params = {"all_owners": "true"}
+    before = int((await client.get("/contacts/", params=params, headers=admin)).headers["X-Total-Count"])
+    contact = (await client.post("/contacts/", json={"name": "Counted", "email": "counted@example.com"}, headers=owner)).json()
+    assert int((await client.get("/contacts/", params=params, headers=admin)).headers["X-Total-Count"]) == before + 1
+    await client.delete(f"/contacts/{contact['id']}", headers=owner)
+    assert int((await client.get("/contacts/", params=params, headers=admin)).headers["X-Total-Count"]) == before
@@ -0,0 +1,31 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_contact_list_is_revalidated_by_etag_only(client, login):
+    headers = login(101)
+    ids = []
+    for name in ("Older", "Newer"):
+        response = await client.post("/contacts/", json={"name": name, "email": f"{name.lower()}@example.com"}, headers=headers)
+        ids.append(response.json()["id"])
+    first = await client.get("/contacts/", headers=headers)
+    assert "Last-Modified" not in first.headers
+    assert (await client.get("/contacts/", headers={**headers, "If-None-Match": first.headers["ETag"]})).status_code == 304
+
+    # Deleting the older contact leaves the newest updated_at unchanged
+    await client.delete(f"/contacts/{ids[0]}", headers=headers)
+    response = await client.get("/contacts/", headers={**headers, "If-None-Match": first.headers["ETag"], "If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"})
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "1"
+    assert [contact["id"] for contact in response.json()["items"]] == [ids[1]]
+    response = await client.get("/contacts/", headers={**headers, "If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"})
+    assert response.status_code == 200
+
+
+async def test_single_contact_still_honours_if_modified_since(client, login):
+    headers = login(102)
+    contact = (await client.post("/contacts/", json={"name": "Solo", "email": "solo@example.com"}, headers=headers)).json()
+    response = await client.get(f"/contacts/{contact['id']}", headers=headers)
+    response = await client.get(f"/contacts/{contact['id']}", headers={**headers, "If-Modified-Since": response.headers["Last-Modified"]})
+    assert response.status_code == 304
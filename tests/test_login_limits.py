@@ -0,0 +1,21 @@
+import asyncio
+
+import pytest
+
+from app.application_services.users.users import LOGIN_FAILURE_BURST
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_bad_logins_stop_at_the_failure_burst(client):
+    account = {"username": "guarded", "email": "guarded@example.com", "password": "right-password"}
+    assert (await client.post("/users/register", json=account)).status_code == 201
+    attempts = int(LOGIN_FAILURE_BURST) * 3
+    responses = await asyncio.gather(*(
+        client.post("/users/auth", json={"email": account["email"], "password": f"guess-{i}"}) for i in range(attempts)
+    ))
+    codes = [response.status_code for response in responses]
+    assert codes.count(401) == LOGIN_FAILURE_BURST
+    assert codes.count(429) == attempts - LOGIN_FAILURE_BURST
+    # The right password is refused too until the bucket refills
+    assert (await client.post("/users/auth", json={"email": account["email"], "password": account["password"]})).status_code == 429
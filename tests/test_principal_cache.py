@@ -0,0 +1,47 @@
+import pytest
+
+from app.application_services.users import users
+from app.models import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+
+async def _sync():
+    async with AsyncSessionLocal() as db:
+        await users._sync_principal_cache(db)
+
+
+async def _bump(*user_ids):
+    # Another worker's writes: only the generation and its invalidations reach this one
+    async with AsyncSessionLocal() as db:
+        for user_id in user_ids:
+            await users._bump_principal_generation(db, user_id)
+        await db.commit()
+
+
+async def test_another_workers_update_evicts_only_that_user(db_engines, login):
+    await _sync()
+    for user_id in (401, 402, 403):
+        login(user_id)
+    await _bump(401, 403)
+    await _sync()
+    assert users.principal_cache.get(401) is None
+    assert users.principal_cache.get(402) is not None
+    assert users.principal_cache.get(403) is None
+
+
+async def test_a_change_to_every_user_empties_the_cache(db_engines, login):
+    await _sync()
+    login(411), login(412)
+    await _bump(None)
+    await _sync()
+    assert users.principal_cache.get(411) is None and users.principal_cache.get(412) is None
+
+
+async def test_a_worker_behind_the_kept_invalidations_empties_the_cache(db_engines, login, monkeypatch):
+    monkeypatch.setattr(users, "PRINCIPAL_INVALIDATIONS_KEPT", 2)
+    await _sync()
+    login(421), login(422)
+    await _bump(423, 424, 425)
+    await _sync()
+    assert users.principal_cache.get(421) is None and users.principal_cache.get(422) is None
@@ -0,0 +1,25 @@
+from app.application_services.contacts.search import ContactSearchIndex, _boolean_mode_query, query_terms
+
+
+def _index() -> ContactSearchIndex:
+    index = ContactSearchIndex()
+    index.finish_build()
+    index.add(1, 1, "Ann Lee", "ann@example.com", "+1 (555) 010-0199")
+    index.add(2, 1, "Annabel", "bel@example.com", None)
+    index.add(3, 1, "A Bo", "abo@example.com", None)
+    return index
+
+
+def test_short_terms_match_whole_tokens_on_both_backends():
+    assert _boolean_mode_query(query_terms("a")) == "+a"
+    assert [contact_id for contact_id, _ in _index().search("a", 10, 1)] == [3]
+
+
+def test_longer_terms_match_as_prefixes_on_both_backends():
+    assert _boolean_mode_query(query_terms("ann le")) == "+ann* +le*"
+    assert [contact_id for contact_id, _ in _index().search("ann", 10, 1)] == [1, 2]
+
+
+def test_phone_digits_match_anywhere_in_the_number():
+    assert _boolean_mode_query(query_terms("(555) 010")) == "+555010*"
+    assert [contact_id for contact_id, _ in _index().search("(555) 010", 10, 1)] == [1]
@@ -0,0 +1,47 @@
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Contacts, DB_async_reader_session, DB_async_writer_session, get_async_engine
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("db_engines")]
+
+sessions = []
+app = FastAPI()
+
+
+@app.post("/contacts")
+async def create(db: AsyncSession = Depends(DB_async_writer_session)):
+    sessions.append(db)
+    db.add(Contacts(owner_id=1, name="Session Test", email="session@example.com"))
+    await db.commit()
+    return {"committed": db.info.get("committed", False)}
+
+
+@app.get("/contacts")
+async def read(db: AsyncSession = Depends(DB_async_reader_session)):
+    sessions.append(db)
+    return {"names": list(await db.scalars(select(Contacts.name).where(Contacts.email == "session@example.com")))}
+
+
+async def test_writer_session_commits_and_reader_session_sees_it():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/contacts")
+        assert response.json() == {"committed": True}
+        response = await client.get("/contacts")
+        assert response.json() == {"names": ["Session Test"]}
+
+
+async def test_sessions_are_async_and_closed_after_the_request():
+    sessions.clear()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await client.post("/contacts")
+        await client.get("/contacts")
+    assert len(sessions) == 2
+    for db in sessions:
+        assert isinstance(db, AsyncSession)
+        assert not db.in_transaction()
+    # Both connections went back to the pool when their requests ended
+    assert get_async_engine().pool.checkedout() == 0
@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import update
+
+from app.application_services.users.users import USERS_ACTIVE, USERS_INACTIVE, _count_user, get_user_counts
+from app.models import AsyncSessionLocal, Users
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_deleting_a_deactivated_user_moves_the_inactive_counter(client, login):
+    account = {"username": "retired", "email": "retired@example.com", "password": "a-password"}
+    user_id = (await client.post("/users/register", json=account)).json()["id"]
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Users).where(Users.id == user_id).values(is_active=False))
+        await _count_user(USERS_ACTIVE, -1, db)
+        await _count_user(USERS_INACTIVE, 1, db)
+        await db.commit()
+        before = await get_user_counts(db)
+
+    assert (await client.delete(f"/users/{user_id}", headers=login(301, role="admin"))).status_code == 204
+    async with AsyncSessionLocal() as db:
+        after = await get_user_counts(db)
+    assert (after.active, after.inactive) == (before.active, before.inactive - 1)